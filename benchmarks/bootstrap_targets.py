@@ -0,0 +1,186 @@
+"""
+Compares the bootstrap targets of the training engine on a toy MDP:
+
+    current     targets from the model being trained (the legacy update)
+    target      a target network, hard copy every --period updates
+    polyak      a target network, soft (Polyak) update with --tau at each update
+    double      Double DQN: the model picks the next action, the target network evaluates it
+
+The MDP is a corridor the agent walks along with the 24 head actions of the
+game (a head pointing right moves one cell right, pointing left one cell left,
+otherwise the agent stays). The exit door is at one end of the corridor, drawn
+at each episode and shown in the state: reaching it gives +1, leaving through
+the other end is out of bounds (-1), and every step costs 0.01. As in the
+game, a terminal experience targets the total episode reward.
+
+For each variant and seed, the agent trains with one batched update per
+environment step, and is evaluated greedily every --eval-every steps. The
+reported numbers are the environment steps and the wall-clock seconds needed
+to reach the --threshold success rate at two evaluations in a row, and the
+last success rate.
+
+Usage (from the repository root):
+
+    TF_USE_LEGACY_KERAS=1 python benchmarks/bootstrap_targets.py --steps 4000 --seeds 3
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..', 'flask-server'))
+
+from src.agent.dqn_agent import DQNAgent  # noqa: E402
+from src.settings import ACTION_POSSIBILITIES, STATE_SIZE  # noqa: E402
+
+VARIANTS = {
+    "current": dict(target_network=False),
+    "target": dict(target_network=True, target_update="HARD"),
+    "polyak": dict(target_network=True, target_update="SOFT"),
+    "double": dict(double_dqn=True, target_update="HARD"),
+}
+
+
+class Corridor:
+    """
+    A one-dimensional corridor of `length` cells, the exit door being at one of its ends.
+    """
+
+    def __init__(self, length: int = 10, step_limit: int = 30, seed: int = 0):
+        self.length = length
+        self.step_limit = step_limit
+        self.rng = random.Random(seed)
+        # x component of each head direction, rounded: +1 right, -1 left, 0 stay
+        self.moves = [round(math.cos(math.radians(15 * action)))
+                      for action in range(ACTION_POSSIBILITIES)]
+        self.position = 0
+        self.door_on_the_right = True
+        self.step_index = 0
+        self.total_reward = 0.0
+
+    def state(self) -> np.ndarray:
+        state = np.zeros(STATE_SIZE, dtype=np.float32)
+        state[self.position] = 1.0
+        state[self.length] = float(self.door_on_the_right)
+        state[self.length + 1] = self.step_index / self.step_limit
+        return state
+
+    def reset(self) -> np.ndarray:
+        self.position = self.rng.randrange(2, self.length - 2)
+        self.door_on_the_right = self.rng.random() < 0.5
+        self.step_index = 0
+        self.total_reward = 0.0
+        return self.state()
+
+    def step(self, action: int) -> tuple[np.ndarray, float, bool, bool]:
+        """
+        Returns the next state, the reward, whether the episode is over and
+        whether the exit door was reached.
+        """
+        self.position += self.moves[action]
+        self.step_index += 1
+
+        at_right_end, at_left_end = self.position >= self.length - 1, self.position <= 0
+        success = at_right_end if self.door_on_the_right else at_left_end
+        out_of_bounds = at_left_end if self.door_on_the_right else at_right_end
+        self.position = min(max(self.position, 0), self.length - 1)
+
+        reward = 1.0 if success else -1.0 if out_of_bounds else -0.01
+        self.total_reward += reward
+        done = success or out_of_bounds or self.step_index >= self.step_limit
+        return self.state(), reward, done, success
+
+
+def evaluate(agent: DQNAgent, env: Corridor, nb_episodes: int) -> float:
+    successes = 0
+    for _ in range(nb_episodes):
+        state, done, success = env.reset(), False, False
+        while not done:
+            action = agent.choose_action_for_training(state, 0.0)
+            state, _, done, success = env.step(action)
+        successes += success
+    return successes / nb_episodes
+
+
+def run(variant: str, seed: int, args) -> dict:
+    random.seed(seed)
+    np.random.seed(seed)
+    tf.random.set_seed(seed)
+
+    agent = DQNAgent(**VARIANTS[variant], target_update_period=args.period,
+                     target_tau=args.tau)
+    agent.batch_size = args.batch_size
+    agent.warm_up()
+    env, eval_env = Corridor(seed=seed), Corridor(seed=seed + 1000)
+
+    steps_to_threshold, seconds_to_threshold, success_rate = None, None, 0.0
+    previous_success_rate = 0.0
+    state = env.reset()
+    start = time.perf_counter()
+
+    for step in range(1, args.steps + 1):
+        epsilon = max(0.05, 1 - step / (args.steps / 2))
+        action = agent.choose_action_for_training(state, epsilon)
+        next_state, reward, done, _ = env.step(action)
+        agent.buffer.add((state, action, reward, next_state,
+                         done, env.total_reward))
+        agent.update_policy()
+        state = env.reset() if done else next_state
+
+        if step % args.eval_every == 0:
+            previous_success_rate, success_rate = success_rate, evaluate(
+                agent, eval_env, args.eval_episodes)
+            if steps_to_threshold is None and min(previous_success_rate, success_rate) >= args.threshold:
+                steps_to_threshold = step
+                seconds_to_threshold = round(time.perf_counter() - start, 2)
+
+    return {"variant": variant, "seed": seed, "steps_to_threshold": steps_to_threshold,
+            "seconds_to_threshold": seconds_to_threshold, "final_success_rate": success_rate,
+            "total_seconds": round(time.perf_counter() - start, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--variants", nargs="+",
+                        default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--steps", type=int, default=4000)
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--period", type=int, default=100)
+    parser.add_argument("--tau", type=float, default=0.01)
+    parser.add_argument("--eval-every", type=int, default=100)
+    parser.add_argument("--eval-episodes", type=int, default=20)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for variant in args.variants:
+        for seed in range(args.seeds):
+            result = run(variant, seed, args)
+            print(json.dumps(result))
+            results.append(result)
+
+    print(f"\n{'variant':<10}{'reached':>10}{'median steps':>15}{'median seconds':>17}{'final success':>16}")
+    for variant in args.variants:
+        runs = [result for result in results if result["variant"] == variant]
+        reached = [result for result in runs if result["steps_to_threshold"] is not None]
+        median_steps = np.median([result["steps_to_threshold"] for result in reached]) if reached else None
+        median_seconds = np.median([result["seconds_to_threshold"] for result in reached]) if reached else None
+        final_success = np.mean([result["final_success_rate"] for result in runs])
+        print(f"{variant:<10}{len(reached):>7}/{len(runs):<2}{str(median_steps):>15}"
+              f"{str(median_seconds):>17}{final_success:>16.2f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Microbenchmarks of the geometry kernels of the world, against their frozen
+references (tests/geometry_reference.py):
+
+    line_circle             World._line_circle_intersection
+    surface_intersection    World.find_nearest_intersection_point_to_surface
+    nearest_intersection    World.find_nearest_intersection
+    seen_position           Head.get_seen_position
+    is_inside               Surface.is_inside
+    direction_sensing       the vectorized sensing of all heads, against the
+                            scalar path composing the kernels above
+
+Each kernel is timed, reference and current, in nanoseconds per call (the
+fastest of --rounds rounds), for worlds of each of --counts collectibles. The
+surface grows with the number of collectibles so that they cover at most a
+fifth of it.
+
+The kernels must also compute exactly what their references compute: this is
+checked by tests/test_geometry_kernels.py and tests/test_sensing_parity.py.
+
+Usage (from the repository root):
+
+    python benchmarks/geometry_kernels.py
+    python benchmarks/geometry_kernels.py --counts 4 64 --seed 7
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'client', 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'tests'))
+
+from geometry_reference import random_line_circle_case, random_point, random_rays, random_surface_case, \
+    random_world, reference_find_nearest_intersection, reference_find_nearest_intersection_point_to_surface, \
+    reference_get_seen_position, reference_is_inside, reference_line_circle_intersection  # noqa: E402
+from world.head import Head  # noqa: E402
+from world.world import World  # noqa: E402
+
+
+def time_per_call(function, cases: list, rounds: int) -> float:
+    """
+    Returns the time per call in nanoseconds, the fastest of `rounds` passes over the cases.
+    """
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for case in cases:
+            function(*case)
+        best = min(best, time.perf_counter() - start)
+    return best / len(cases) * 1e9
+
+
+def benchmark(args) -> list[dict]:
+    rng = random.Random(args.seed)
+    world = World()
+    results = []
+
+    def record(kernel, nb_collectibles, cases, reference, current):
+        results.append({"kernel": kernel, "collectibles": nb_collectibles,
+                        "reference_ns": round(time_per_call(reference, cases, args.rounds), 1),
+                        "current_ns": round(time_per_call(current, cases, args.rounds), 1)})
+
+    cases = [random_line_circle_case(rng) for _ in range(args.calls)]
+    record("line_circle", None, cases,
+           reference_line_circle_intersection, world._line_circle_intersection)
+
+    cases = [random_surface_case(rng) for _ in range(args.calls)]
+    record("surface_intersection", None, cases,
+           reference_find_nearest_intersection_point_to_surface, World.find_nearest_intersection_point_to_surface)
+
+    heads = [Head(40, angle) for angle in range(0, 360, 15)]
+    cases = [(head, (rng.uniform(0, 800), rng.uniform(0, 800)))
+             for head in heads for _ in range(max(1, args.calls // len(heads)))]
+    record("seen_position", None, cases,
+           lambda head, center: reference_get_seen_position(head.distance_to_center, head.angle, center),
+           lambda head, center: head.get_seen_position(center))
+
+    surface = world.surface
+    surface_pos, radius = (surface.x_pos, surface.y_pos), surface.shape.radius
+    cases = [random_point(rng, 0, 800) for _ in range(args.calls)]
+    record("is_inside", None, cases,
+           lambda x, y: reference_is_inside(surface_pos, radius, x, y), surface.is_inside)
+
+    for nb_collectibles in args.counts:
+        world = random_world(rng, nb_collectibles)
+        cases = random_rays(rng, world, args.calls)
+        record("nearest_intersection", nb_collectibles, cases,
+               lambda start, end: reference_find_nearest_intersection(
+                   world.collectibles, world.exit_door, world.surface.shape.radius, start, end),
+               world.find_nearest_intersection)
+
+        # the agent is moved to random free positions of the world
+        positions = [world.get_free_random_position(world.agent.shape.radius)
+                     for _ in range(max(1, args.calls // 100))]
+
+        def sense(position, sensing):
+            world.agent.x_pos, world.agent.y_pos = position
+            return sensing()
+
+        record("direction_sensing", nb_collectibles, [(position,) for position in positions],
+               lambda position: sense(position, world.get_agent_direction_sensing_scalar),
+               lambda position: sense(position, lambda: world.sensing.get_agent_direction_sensing(world)))
+
+    print(f"\n{'kernel':<24}{'collectibles':>13}{'reference ns':>15}{'current ns':>13}{'speedup':>10}")
+    for result in results:
+        collectibles = "-" if result["collectibles"] is None else result["collectibles"]
+        print(f"{result['kernel']:<24}{collectibles:>13}{result['reference_ns']:>15.1f}"
+              f"{result['current_ns']:>13.1f}{result['reference_ns'] / result['current_ns']:>9.2f}x")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=2000, help="random inputs timed per kernel")
+    parser.add_argument("--rounds", type=int, default=5, help="timed passes over the inputs, the fastest is kept")
+    parser.add_argument("--counts", type=int, nargs="+", default=[4, 16, 64, 256],
+                        help="collectibles of the worlds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the timings to this JSON file")
+    args = parser.parse_args()
+
+    results = benchmark(args)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
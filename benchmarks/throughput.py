@@ -0,0 +1,359 @@
+"""
+Measures the main throughput numbers of the project, end to end:
+
+    world           World steps per second, and GameState.get_state encodings
+                    per second, over the episodes of a random agent
+    payload         cost of an update_model payload of --transitions
+                    transitions: client serialization, server parsing and
+                    size, as JSON and as a binary frame
+    get_action      latency percentiles of /get_action (training mode, greedy,
+                    JSON and binary frame) against a local Flask server
+                    started in a subprocess on a free port
+    update_policy   experiences sampled per second by DQNAgent.update_policy
+                    at BATCH_SIZE
+
+Throughputs and payload costs keep the fastest of several rounds, the least
+disturbed by the other processes of the machine; latencies are percentiles
+over every request. Everything runs headless and on the CPU. The results are printed, written to
+--output as JSON, and compared with a stored baseline (--baseline): a metric
+worse than its baseline by more than --tolerance is flagged as a regression
+and the script exits with status 1. --update-baseline stores the results as
+the new baseline instead. Timings depend on the machine: the baseline is only
+meaningful on the machine it was recorded on (its description is stored with
+it).
+
+Usage (from the repository root):
+
+    TF_USE_LEGACY_KERAS=1 python benchmarks/throughput.py --output /tmp/throughput.json
+    TF_USE_LEGACY_KERAS=1 python benchmarks/throughput.py --only world payload
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import cycle
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SERVER_ROOT = os.path.join(ROOT, 'flask-server')
+sys.path.insert(0, SERVER_ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'client', 'src'))
+
+from api.requests import ApiClient, serialize_experience  # noqa: E402
+from episodes.episode import Episode  # noqa: E402
+from settings import MAX_STEP_PER_EP  # noqa: E402
+from utils.game_states import TRAINING  # noqa: E402
+from utils.stage_profiler import StageProfiler  # noqa: E402
+from utils.wire_format import BIT_PACKED_ARRAYS, FRAME_CONTENT_TYPE, encode_frame, pack_experiences  # noqa: E402
+from src.utils.replay_buffer import to_flat_array  # noqa: E402
+from src.utils.wire_format import decode_frame, unpack_experiences  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), 'throughput_baseline.json')
+BENCHMARKS = ("world", "payload", "get_action", "update_policy")
+NB_ACTIONS = 24
+
+
+def metric(value: float, unit: str, higher_is_better: bool) -> dict:
+    return {"value": round(value, 4), "unit": unit, "higher_is_better": higher_is_better}
+
+
+def play_random_episodes(nb_steps: int, seed: int) -> tuple[StageProfiler, list]:
+    """
+    Steps the worlds of random-action episodes (as the episode loop does,
+    without the server) for `nb_steps` steps.
+
+    Returns:
+        tuple[StageProfiler, list]: The time spent in each stage of the steps,
+        and the (state, action, reward, next_state, done, total_reward) transitions.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    profiler = StageProfiler()
+    transitions = []
+    ep_number = 0
+    while len(transitions) < nb_steps:
+        episode = Episode(ep_number, None, 1.0, TRAINING, profiler=profiler)
+        episode.timer.start()
+        state, done = episode.game_state.get_state(), False
+        while not done and episode.step_index < MAX_STEP_PER_EP and len(transitions) < nb_steps:
+            action = random.randrange(NB_ACTIONS)
+            next_state, reward, done = episode.step(action)
+            transitions.append((state, action, reward, next_state,
+                                done, round(episode.total_reward, 3)))
+            state = next_state
+        episode.timer.end()
+        ep_number += 1
+    return profiler, transitions
+
+
+def bench_world(args, transitions: list) -> dict:
+    steps_per_sec, states_per_sec = [], []
+    # the same episodes are played in each round, the fastest round is kept
+    for _ in range(args.rounds):
+        profiler, played = play_random_episodes(args.steps, args.seed)
+        stages = profiler.summary()
+        steps_per_sec.append(
+            stages["world_step"]["count"] / stages["world_step"]["total_s"])
+        states_per_sec.append(
+            stages["state_encoding"]["count"] / stages["state_encoding"]["total_s"])
+    transitions.extend(played)
+    return {
+        "world_steps_per_sec": metric(max(steps_per_sec), "steps/s", True),
+        "get_state_per_sec": metric(max(states_per_sec), "states/s", True),
+    }
+
+
+def time_per_call(function, repeats: int) -> float:
+    """
+    Returns the duration of the fastest call, in milliseconds: the least
+    disturbed by the other processes of the machine.
+    """
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations) * 1000
+
+
+def bench_payload(args, transitions: list) -> dict:
+    experiences = [transitions[idx % len(transitions)]
+                   for idx in range(args.transitions)]
+
+    # as api.requests.post_experiences and the update_model route do
+    def serialize_json():
+        return json.dumps([serialize_experience((experience[:5], experience[5]))
+                           for experience in experiences]).encode()
+
+    def parse_json(body=serialize_json()):
+        return [(to_flat_array(exp["state"]), exp["action"], exp["reward"],
+                 to_flat_array(exp["next_state"]), exp["done"], exp["total_reward"])
+                for exp in json.loads(body)]
+
+    def serialize_frame():
+        return encode_frame({}, pack_experiences(experiences), BIT_PACKED_ARRAYS)
+
+    def parse_frame(body=serialize_frame()):
+        return unpack_experiences(decode_frame(body)[1])
+
+    return {
+        "update_model_json_serialize_ms": metric(time_per_call(serialize_json, args.repeats), "ms", False),
+        "update_model_json_parse_ms": metric(time_per_call(parse_json, args.repeats), "ms", False),
+        "update_model_json_bytes": metric(len(serialize_json()), "bytes", False),
+        "update_model_frame_serialize_ms": metric(time_per_call(serialize_frame, args.repeats), "ms", False),
+        "update_model_frame_parse_ms": metric(time_per_call(parse_frame, args.repeats), "ms", False),
+        "update_model_frame_bytes": metric(len(serialize_frame()), "bytes", False),
+    }
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workdir: str, timeout: float = 120) -> subprocess.Popen:
+    """
+    Starts the Flask server in a subprocess and waits until it answers.
+
+    The server writes its logs relatively to its working directory: it runs in
+    a subdirectory of `workdir` so that nothing is written outside of it.
+    """
+    cwd = os.path.join(workdir, "run")
+    os.makedirs(cwd)
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(SERVER_ROOT))
+    server = subprocess.Popen([sys.executable, "-m", "flask", "--app", "src.main", "run",
+                               "--host", "127.0.0.1", "--port", str(port)],
+                              cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    client = ApiClient(f"http://127.0.0.1:{port}", max_retries=0)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"The server exited with status {server.returncode}")
+        try:
+            if client.get("/queue_size").status_code == 200:
+                client.close()
+                return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"The server did not answer within {timeout} seconds")
+
+
+def latency_percentiles(send, nb_requests: int, nb_warm_up: int) -> dict:
+    for _ in range(nb_warm_up):
+        send()
+    latencies = []
+    for _ in range(nb_requests):
+        start = time.perf_counter()
+        response = send()
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"/get_action answered {response.status_code}")
+    return {percentile: float(np.percentile(latencies, percentile)) * 1000
+            for percentile in (50, 95, 99)}
+
+
+def bench_get_action(args, transitions: list) -> dict:
+    states = cycle([transition[0] for transition in transitions])
+    meta = {"mode": TRAINING, "epsilon": 0.0, "modelname": None}
+
+    # as api.requests.get_action does, for each wire format
+    def send_json(client):
+        return client.post("/get_action", json={"state": next(states).tolist(), **meta})
+
+    def send_frame(client):
+        return client.post("/get_action", data=encode_frame(meta, {"state": next(states)}),
+                           headers={"Content-Type": FRAME_CONTENT_TYPE})
+
+    port = get_free_port()
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        server = start_server(port, workdir)
+        client = ApiClient(f"http://127.0.0.1:{port}")
+        try:
+            for wire_format, send in (("json", send_json), ("frame", send_frame)):
+                percentiles = latency_percentiles(
+                    lambda: send(client), args.requests, args.warm_up)
+                for percentile, latency in percentiles.items():
+                    results[f"get_action_{wire_format}_p{percentile}_ms"] = metric(
+                        latency, "ms", False)
+        finally:
+            client.close()
+            server.terminate()
+            server.wait()
+    return results
+
+
+def bench_update_policy(args, transitions: list) -> dict:
+    import tensorflow as tf
+    from src.agent.dqn_agent import DQNAgent
+    from src.settings import BATCH_SIZE
+
+    tf.random.set_seed(args.seed)
+    agent = DQNAgent()
+    agent.warm_up()
+    for idx in range(BATCH_SIZE * 4):
+        state, action, reward, next_state, done, total_reward = transitions[idx % len(
+            transitions)]
+        agent.buffer.add((to_flat_array(state), action, reward,
+                         to_flat_array(next_state), done, total_reward))
+
+    for _ in range(args.warm_up):
+        agent.update_policy()
+    elapsed = []
+    for _ in range(args.rounds):
+        start = time.perf_counter()
+        for _ in range(args.updates):
+            agent.update_policy()
+        elapsed.append(time.perf_counter() - start)
+    return {"update_policy_samples_per_sec": metric(args.updates * BATCH_SIZE / min(elapsed), "samples/s", True)}
+
+
+def describe_machine() -> dict:
+    return {"platform": platform.platform(), "processor": platform.processor(),
+            "cpu_count": os.cpu_count(), "python": platform.python_version()}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Prints the results next to the baseline.
+
+    Returns:
+        list[str]: The metrics worse than their baseline by more than `tolerance`.
+    """
+    if baseline["machine"] != results["machine"]:
+        print(f"Warning: the baseline was recorded on another machine ({baseline['machine']})")
+
+    regressions = []
+    print(f"\n{'metric':<36}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, current in results["metrics"].items():
+        if name not in baseline["metrics"]:
+            print(f"{name:<36}{'-':>14}{current['value']:>14.4g}{'new':>10}")
+            continue
+        reference = baseline["metrics"][name]["value"]
+        change = (current["value"] - reference) / reference if reference else 0.0
+        worse = -change if current["higher_is_better"] else change
+        status = ""
+        if worse > tolerance:
+            regressions.append(name)
+            status = "  REGRESSION"
+        print(f"{name:<36}{reference:>14.4g}{current['value']:>14.4g}{change:>+10.1%}{status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", nargs="+", default=list(BENCHMARKS), choices=BENCHMARKS,
+                        help="the benchmarks to run (the world episodes are always played)")
+    parser.add_argument("--steps", type=int, default=3000, help="world steps played per round")
+    parser.add_argument("--transitions", type=int, default=MAX_STEP_PER_EP,
+                        help="transitions of the update_model payload")
+    parser.add_argument("--repeats", type=int, default=50,
+                        help="serializations timed per payload format, the fastest is kept")
+    parser.add_argument("--requests", type=int, default=500, help="/get_action requests timed per wire format")
+    parser.add_argument("--updates", type=int, default=30, help="update_policy calls timed per round")
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="rounds of the world and update_policy benchmarks, the fastest is kept")
+    parser.add_argument("--warm-up", type=int, default=5,
+                        help="untimed /get_action requests and update_policy calls")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="relative degradation of a metric flagged as a regression")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store the results as the new baseline instead of comparing them")
+    args = parser.parse_args()
+
+    benchmarks = {"world": bench_world, "payload": bench_payload,
+                  "get_action": bench_get_action, "update_policy": bench_update_policy}
+    # the played transitions feed the payloads, the requests and the replay memory
+    transitions = []
+    if "world" not in args.only:
+        transitions.extend(play_random_episodes(args.steps, args.seed)[1])
+
+    results = {"machine": describe_machine(), "metrics": {}}
+    for name in BENCHMARKS:
+        if name in args.only:
+            start = time.perf_counter()
+            results["metrics"].update(benchmarks[name](args, transitions))
+            print(f"{name}: {time.perf_counter() - start:.1f}s")
+    print(json.dumps(results["metrics"], indent=2))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline to store one")
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nNo regression above {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
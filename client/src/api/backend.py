@@ -0,0 +1,93 @@
+"""
+Selects, at runtime, which backend serves the API calls of the episodes:
+
+    HTTP        api.requests, a Flask server reached over HTTP (default)
+    IN_PROCESS  api.in_process, a learner running inside the client process
+
+The functions below forward each call to the selected backend, so episode code
+imports them from here whatever the backend is.
+"""
+import importlib
+from settings import API_BACKEND
+
+HTTP = "HTTP"
+IN_PROCESS = "IN_PROCESS"
+
+BACKEND_MODULES = {
+    HTTP: "api.requests",
+    IN_PROCESS: "api.in_process",
+}
+
+_backend_name = API_BACKEND
+
+
+def set_backend(name: str) -> None:
+    global _backend_name
+    if name not in BACKEND_MODULES:
+        raise ValueError(
+            f"Backend must be one of {', '.join(BACKEND_MODULES)}")
+    _backend_name = name
+
+
+def get_backend_name() -> str:
+    return _backend_name
+
+
+def get_backend():
+    return importlib.import_module(BACKEND_MODULES[_backend_name])
+
+
+def get_action(state, mode, epsilon, modelname=None):
+    return get_backend().get_action(state, mode, epsilon, modelname)
+
+
+def get_actions(states, mode, epsilon, modelname=None):
+    return get_backend().get_actions(states, mode, epsilon, modelname)
+
+
+def update_model(training_data):
+    return get_backend().update_model(training_data)
+
+
+def open_stream():
+    return get_backend().open_stream()
+
+
+def append_to_stream(stream_id: str, experiences: list):
+    return get_backend().append_to_stream(stream_id, experiences)
+
+
+def commit_stream(stream_id: str, experiences: list):
+    return get_backend().commit_stream(stream_id, experiences)
+
+
+def discard_stream(stream_id: str):
+    return get_backend().discard_stream(stream_id)
+
+
+def set_model_name(modelname: str = None):
+    return get_backend().set_model_name(modelname)
+
+
+def start_training(modelname: str):
+    return get_backend().start_training(modelname)
+
+
+def end_training():
+    return get_backend().end_training()
+
+
+def get_queue_size():
+    return get_backend().get_queue_size()
+
+
+def log_client_profile(mode: str, summary: dict):
+    return get_backend().log_client_profile(mode, summary)
+
+
+def is_model_saved(modelname: str):
+    return get_backend().is_model_saved(modelname)
+
+
+def save_model(modelname: str):
+    return get_backend().save_model(modelname)
@@ -0,0 +1,63 @@
+from api.backend import append_to_stream, commit_stream, open_stream
+from settings import STREAM_CHUNK_SIZE
+
+
+class ExperienceStreamer:
+    """
+    Episode buffer sending its experiences to the server in chunks while the episode runs.
+
+    It is used in place of the episode ReplayBuffer: experiences are added the
+    same way, but every `chunk_size` experiences are appended to a server-side
+    stream, and `commit` sends the rest and ends the episode. The server keeps
+    the last transitions of the episode and applies the fail/success balancing
+    at commit, as for a whole buffer sent with update_model.
+
+    Attributes:
+        chunk_size (int): The number of experiences sent per request.
+        stream_id (str): The server stream, opened with the first chunk.
+        pending (list): The experiences not sent yet.
+    """
+
+    def __init__(self, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.stream_id = None
+        self.pending = []
+        self.nb_experiences = 0
+
+    def add(self, experience, total_game_reward: float):
+        """
+        Add a new experience, sending a chunk once enough are pending.
+
+        Args:
+            experience (tuple): A tuple representing an experience
+                                (state, action, reward, next_state, done).
+        """
+        self.pending.append((*experience, total_game_reward))
+        self.nb_experiences += 1
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def sends_on_next_add(self) -> bool:
+        """
+        Tells whether the next `add` completes a chunk, and so makes a blocking request.
+        """
+        return len(self.pending) + 1 >= self.chunk_size
+
+    def flush(self):
+        if self.stream_id is None:
+            self.stream_id = open_stream()
+        append_to_stream(self.stream_id, self.pending)
+        self.pending = []
+
+    def commit(self):
+        """
+        Sends the pending experiences and ends the episode on the server.
+        """
+        if self.stream_id is None:
+            self.stream_id = open_stream()
+        commit_stream(self.stream_id, self.pending)
+        self.pending = []
+        self.stream_id = None
+
+    def __len__(self):
+        return self.nb_experiences
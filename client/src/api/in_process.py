@@ -0,0 +1,145 @@
+"""
+In-process backend: the same functions as api.requests, served by a learner
+(DQNAgentManager and ModelUpdaterThread of the flask-server package) running
+inside the client process, without HTTP or serialization.
+
+Only meant for single-process training: every process importing this module
+owns its own agent.
+"""
+import os
+import sys
+import importlib
+from utils.wire_format import pack_experiences, to_flat_array
+from utils.game_states import RANDOM, TESTING, TRAINING
+
+SERVER_ROOT = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', '..', '..', 'flask-server'))
+
+
+class InProcessServer:
+    """
+    Holds the agent manager and the model updater thread normally owned by the Flask app.
+    """
+
+    def __init__(self, server_root: str = SERVER_ROOT):
+        if server_root not in sys.path:
+            sys.path.insert(0, server_root)
+
+        server_settings = importlib.import_module('src.settings')
+        agent_manager_module = importlib.import_module(
+            'src.agent.agent_manager')
+        model_updater_module = importlib.import_module(
+            'src.agent.model_updater_thread')
+        client_profile_module = importlib.import_module(
+            'src.logger.client_profile')
+
+        os.makedirs(server_settings.MODELS_PATH, exist_ok=True)
+
+        self.agent_manager = agent_manager_module.DQNAgentManager()
+        self.thread = model_updater_module.ModelUpdaterThread(
+            self.agent_manager)
+        self.thread.check_and_restart_thread()
+        self.client_profile_logger = client_profile_module.ClientProfileLogger()
+
+
+_server = None
+
+
+def get_server() -> InProcessServer:
+    global _server
+    if _server is None:
+        _server = InProcessServer()
+    return _server
+
+
+def get_action(state, mode, epsilon, modelname=None):
+    agent = get_server().agent_manager.agent
+
+    if mode == TRAINING:
+        return agent.choose_action_for_training(state, epsilon)
+    elif mode == TESTING:
+        return agent.choose_action_with_model(state, modelname)
+    elif mode == RANDOM:
+        return agent.choose_random_action()
+    else:
+        raise ValueError("Invalid mode")
+
+
+def get_actions(states, mode, epsilon, modelname=None):
+    agent = get_server().agent_manager.agent
+
+    if mode == TRAINING:
+        return agent.choose_actions_for_training(states, epsilon)
+    elif mode == TESTING:
+        return agent.choose_actions_with_model(states, modelname)
+    elif mode == RANDOM:
+        return [agent.choose_random_action() for _ in states]
+    else:
+        raise ValueError("Invalid mode")
+
+
+def update_model(training_data):
+    agent_manager = get_server().agent_manager
+
+    experiences = []
+    for (state, action, reward, next_state, done), total_reward in training_data.buffer:
+        experiences.append((to_flat_array(state), action, reward,
+                            to_flat_array(next_state), done, total_reward))
+
+    # the client thread waits for the learner instead of being refused
+    agent_manager.commit_episode(experiences, block=True)
+
+
+def open_stream() -> str:
+    return get_server().agent_manager.experience_streams.open()
+
+
+def append_to_stream(stream_id: str, experiences: list):
+    get_server().agent_manager.experience_streams.append(
+        stream_id, pack_experiences(experiences))
+
+
+def commit_stream(stream_id: str, experiences: list):
+    agent_manager = get_server().agent_manager
+    if experiences:
+        append_to_stream(stream_id, experiences)
+    stream = agent_manager.experience_streams.close(stream_id)
+    agent_manager.commit_episode(stream.experiences(), block=True)
+
+
+def discard_stream(stream_id: str):
+    get_server().agent_manager.experience_streams.close(stream_id)
+
+
+def set_model_name(modelname: str = None):
+    # a single agent lives in the process, there are no sessions to choose from
+    pass
+
+
+def start_training(modelname: str):
+    server = get_server()
+    # as on the server: the previous training stops before the agent is reset
+    server.thread.wait_until_stopped()
+    server.agent_manager.reset_agent(modelname)
+    server.thread.on_training_started(modelname)
+    server.thread.check_and_restart_thread()
+
+
+def end_training():
+    get_server().thread.stop()
+
+
+def get_queue_size():
+    return get_server().agent_manager.update_queue.qsize()
+
+
+def log_client_profile(mode: str, summary: dict):
+    get_server().client_profile_logger.log(summary, mode)
+
+
+def is_model_saved(modelname: str):
+    return get_server().agent_manager.agent.is_model_saved(modelname)
+
+
+def save_model(modelname: str):
+    return get_server().agent_manager.agent.save_model(modelname)
@@ -1,64 +1,255 @@
+import os
 import json
+import time
 import requests
+import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from settings import API_BACKOFF_FACTOR, API_MAX_QUEUE_WAIT, API_MAX_RETRIES, API_POOL_SIZE, API_TIMEOUT, \
+    USE_BINARY_WIRE_FORMAT
+from utils.wire_format import BIT_PACKED_ARRAYS, FRAME_CONTENT_TYPE, decode_frame, encode_frame, pack_experiences, to_flat_array
 
 API_URL = "http://127.0.0.1:5000"
+# names the training session of the requests on a multi-session server
+SESSION_HEADER = "X-Model-Name"
+
+
+class ApiClient:
+    """
+    HTTP client keeping its connections to the server alive between calls.
+
+    Connection failures are retried for every method since the request never
+    reached the server; 502/503/504 answers are only retried for GET requests,
+    which do not modify the server state.
+
+    Attributes:
+        base_url (str): The URL of the server.
+        timeout (tuple): The (connect, read) timeouts, in seconds.
+        session (requests.Session): The session holding the connection pool.
+    """
+
+    def __init__(self, base_url: str = API_URL, pool_size: int = API_POOL_SIZE, timeout: tuple = API_TIMEOUT,
+                 max_retries: int = API_MAX_RETRIES, backoff_factor: float = API_BACKOFF_FACTOR):
+        self.base_url = base_url
+        self.timeout = timeout
+
+        retries = Retry(total=max_retries, connect=max_retries, read=0, status=max_retries,
+                        backoff_factor=backoff_factor, status_forcelist=(502, 503, 504),
+                        allowed_methods=frozenset({"GET"}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              max_retries=retries)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.session.get(f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.session.post(f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client = None
+_client_pid = None
+_model_name = None
+
+
+def get_client() -> ApiClient:
+    """
+    Returns the API client of the current process.
+
+    A new client is created after a fork, so training processes never share
+    pooled sockets with their parent.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = ApiClient()
+        _client_pid = os.getpid()
+        set_model_name(_model_name)
+    return _client
+
+
+def set_model_name(modelname: str = None):
+    """
+    Sends the next requests of this process to the training session of `modelname`,
+    or to the default session of the server if None.
+    """
+    global _model_name
+    _model_name = modelname
+    if _client is None:
+        return
+    if modelname is None:
+        _client.session.headers.pop(SESSION_HEADER, None)
+    else:
+        _client.session.headers[SESSION_HEADER] = modelname
+
+
+def post_frame(path: str, meta: dict, arrays: dict, bit_packed: tuple = (), **kwargs) -> requests.Response:
+    return get_client().post(path, data=encode_frame(meta, arrays, bit_packed),
+                             headers={"Content-Type": FRAME_CONTENT_TYPE, **kwargs.pop("headers", {})}, **kwargs)
+
+
+def to_json_value(value):
+    return value.tolist() if isinstance(value, np.ndarray) else value
 
 
 def get_action(state, mode, epsilon, modelname=None):
-    url = f"{API_URL}/get_action"
-    data = {"state": state, "mode": mode,
-            "epsilon": epsilon, "modelname": modelname}
-    response = requests.post(url, json=data)
+    if USE_BINARY_WIRE_FORMAT:
+        meta = {"mode": mode, "epsilon": epsilon, "modelname": modelname}
+        response = post_frame("/get_action", meta,
+                              {"state": to_flat_array(state)})
+    else:
+        data = {"state": to_json_value(state), "mode": mode,
+                "epsilon": epsilon, "modelname": modelname}
+        response = get_client().post("/get_action", json=data)
     if response.status_code == 200:
         return response.json()["action"]
     else:
         raise Exception("Failed to get action from server")
 
 
+def get_actions(states, mode, epsilon, modelname=None):
+    """
+    Requests one action per state with a single call; epsilon may be one value or one per state.
+    """
+    if USE_BINARY_WIRE_FORMAT:
+        meta = {"mode": mode, "epsilon": to_json_value(epsilon),
+                "modelname": modelname}
+        states = np.stack([to_flat_array(state) for state in states])
+        response = post_frame("/get_actions", meta, {"states": states},
+                              headers={"Accept": FRAME_CONTENT_TYPE})
+    else:
+        data = {"states": [to_json_value(state) for state in states], "mode": mode,
+                "epsilon": to_json_value(epsilon), "modelname": modelname}
+        response = get_client().post("/get_actions", json=data)
+    if response.status_code == 200:
+        if response.headers.get("Content-Type") == FRAME_CONTENT_TYPE:
+            _, arrays = decode_frame(response.content)
+            return arrays["actions"].tolist()
+        return response.json()["actions"]
+    else:
+        raise Exception("Failed to get actions from server")
+
+
 def serialize_experience(experience):
     state, action, reward, next_state, done = experience[0]
     total_reward = experience[1]
     return {
-        "state": state,
+        "state": to_json_value(state),
         "action": action,
         "reward": reward,
-        "next_state": next_state,
+        "next_state": to_json_value(next_state),
         "done": done,
         "total_reward": total_reward
     }
 
 
-def update_model(training_data):
-    url = f"{API_URL}/update_model"
-    # preparing data
-    serialized_experiences = []
+def post_experiences(path: str, experiences: list) -> requests.Response:
+    """
+    Posts (state, action, reward, next_state, done, total_reward) tuples, as a frame or as JSON.
+    """
+    if USE_BINARY_WIRE_FORMAT:
+        return post_frame(path, {}, pack_experiences(experiences), bit_packed=BIT_PACKED_ARRAYS)
+
+    serialized_experiences = [serialize_experience((experience[:5], experience[5]))
+                              for experience in experiences]
+    return get_client().post(path, json=serialized_experiences)
+
+
+def send_until_accepted(send, max_wait: float = API_MAX_QUEUE_WAIT) -> requests.Response:
+    """
+    Sends an episode until the server accepts it.
+
+    A server whose update queue is full answers 429 with the delay to wait
+    before sending the episode again: the client is held back exactly as long
+    as the learner needs to catch up, but no longer than `max_wait` seconds.
+
+    Args:
+        send (Callable): Sends the request and returns the response.
+        max_wait (float): The seconds after which a refused episode is given up.
+
+    Raises:
+        Exception: If the server still refuses the episode after `max_wait` seconds.
+    """
+    deadline = time.monotonic() + max_wait
+    response = send()
+    while response.status_code == 429:
+        delay = retry_delay(response)
+        if time.monotonic() + delay > deadline:
+            raise Exception(
+                f"The update queue of the server stayed full for {max_wait} seconds")
+        time.sleep(delay)
+        response = send()
+    return response
 
-    for exp in training_data.buffer:
-        serialized_experiences.append(serialize_experience(exp))
 
-    response = requests.post(url, json=serialized_experiences)
+def retry_delay(response: requests.Response) -> float:
+    try:
+        return float(response.json()["retry_after"])
+    except (ValueError, KeyError):
+        return float(response.headers.get("Retry-After", 1))
+
+
+def update_model(training_data):
+    experiences = [(*exp[0], exp[1]) for exp in training_data.buffer]
+    response = send_until_accepted(
+        lambda: post_experiences("/update_model", experiences))
     if response.status_code != 200:
         raise Exception("Failed to update model on server")
 
 
+def open_stream() -> str:
+    response = get_client().post("/stream/open")
+    if response.status_code != 200:
+        raise Exception("Failed to open an experience stream on server")
+    return response.json()["stream_id"]
+
+
+def append_to_stream(stream_id: str, experiences: list):
+    response = post_experiences(f"/stream/{stream_id}/append", experiences)
+    if response.status_code != 200:
+        raise Exception("Failed to append experiences to the stream on server")
+
+
+def commit_stream(stream_id: str, experiences: list):
+    """
+    Ends the episode of a stream, sending its last experiences if any.
+    """
+    if experiences:
+        response = send_until_accepted(lambda: post_experiences(
+            f"/stream/{stream_id}/commit", experiences))
+    else:
+        response = send_until_accepted(
+            lambda: get_client().post(f"/stream/{stream_id}/commit"))
+    if response.status_code != 200:
+        raise Exception("Failed to commit the experience stream on server")
+
+
+def discard_stream(stream_id: str):
+    response = get_client().post(f"/stream/{stream_id}/discard")
+    if response.status_code != 200:
+        raise Exception("Failed to discard the experience stream on server")
+
+
 def start_training(modelname: str):
-    url = f"{API_URL}/start_training"
     data = {"modelname": modelname}
-    response = requests.post(url, json=data)
+    response = get_client().post("/start_training", json=data)
     if response.status_code != 200:
         raise Exception("Failed to end training on server")
 
 
 def end_training():
-    url = f"{API_URL}/end_training"
-    response = requests.get(url)
+    response = get_client().get("/end_training")
     if response.status_code != 200:
         raise Exception("Failed to end training on server")
 
 
 def get_queue_size():
-    url = f"{API_URL}/queue_size"
-    response = requests.get(url)
+    response = get_client().get("/queue_size")
     if response.status_code == 200:
         response_data = response.json()
         queue_size = response_data.get("queue_size")
@@ -68,10 +259,20 @@ def get_queue_size():
             f"Failed to retrieve queue size, status code: {response.status_code}")
 
 
+def log_client_profile(mode: str, summary: dict):
+    """
+    Sends the time spent per stage of the episode loop, to be logged to TensorBoard by the server.
+    """
+    data = {"mode": mode, "stages": summary}
+    response = get_client().post("/log_client_profile", json=data)
+    if response.status_code != 200:
+        print(
+            f"Failed to send the client profile, status code: {response.status_code}")
+
+
 def is_model_saved(modelname: str):
-    url = f"{API_URL}/is_model_saved"
     data = {"modelname": modelname}
-    response = requests.post(url, json=data)
+    response = get_client().post("/is_model_saved", json=data)
     if response.status_code == 200:
         response_data = response.json()
         is_model_saved = response_data.get("is_model_saved")
@@ -82,9 +283,8 @@ def is_model_saved(modelname: str):
 
 
 def save_model(modelname: str):
-    url = f"{API_URL}/save_model"
     data = {"modelname": modelname}
-    response = requests.post(url, json=data)
+    response = get_client().post("/save_model", json=data)
     if response.status_code == 200:
         response_data = response.json()
         is_model_saved = response_data.get("is_model_saved")
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from functools import partial
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+from api.backend import get_action, log_client_profile
+from api.experience_streamer import ExperienceStreamer
+from logger.logging import start_queue_logging, stop_queue_logging
+from .episode import STEP_LIMIT, Episode
+from utils.game_states import TRAINING
+from settings import ASYNC_CONCURRENT_EPISODES, ASYNC_MAX_PENDING_UPLOADS
+
+app_logger = logging.getLogger('app_logger')
+
+
+class AsyncEpisodeRunner:
+    """
+    Runs the training episodes of an episode manager as pipelined asyncio tasks.
+
+    Compared to `Episode.process_game`:
+        - several episodes are played at the same time, each with its own action
+          request in flight, the blocking API calls running in a thread pool;
+        - the rendering and logging of a step happen while the action request of
+          the next step is in flight;
+        - the buffer of a finished episode is uploaded in the background while the
+          next episode starts, with at most `max_pending_uploads` uploads at once;
+          the chunks of streamed experiences and the profile reports are sent from
+          the thread pool too, so that they do not stall the other episodes;
+        - log records are written by a listener thread (see `start_queue_logging`).
+
+    Only the episodes of the first concurrent slot can be rendered, the display
+    showing the current episode of the manager.
+
+    Attributes:
+        episode_manager (EpisodeManager): The manager whose episodes are played.
+        concurrent_episodes (int): The number of episodes played at the same time.
+        max_pending_uploads (int): The maximum number of buffers being uploaded.
+    """
+
+    def __init__(self, episode_manager, concurrent_episodes: int = ASYNC_CONCURRENT_EPISODES,
+                 max_pending_uploads: int = ASYNC_MAX_PENDING_UPLOADS):
+        self.episode_manager = episode_manager
+        self.concurrent_episodes = concurrent_episodes
+        self.max_pending_uploads = max_pending_uploads
+        self.executor = None
+        self.uploads = set()
+        self.upload_slots = None
+        self.next_ep_idx = 1
+        self.nb_finished_episodes = 0
+
+    def run(self) -> None:
+        listener = start_queue_logging()
+        try:
+            asyncio.run(self.train())
+        finally:
+            stop_queue_logging(listener)
+
+    async def train(self) -> None:
+        self.upload_slots = asyncio.Semaphore(self.max_pending_uploads)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.concurrent_episodes + self.max_pending_uploads)
+        try:
+            await asyncio.gather(*[self.play_episodes(slot)
+                                   for slot in range(self.concurrent_episodes)])
+            # the last buffers must reach the learner before the training ends
+            await asyncio.gather(*self.uploads)
+        finally:
+            self.executor.shutdown(wait=True)
+
+    async def run_blocking(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def play_episodes(self, slot: int) -> None:
+        manager = self.episode_manager
+
+        while self.next_ep_idx <= manager.nb_episodes:
+            ep_idx = self.next_ep_idx
+            self.next_ep_idx += 1
+
+            callback = manager.get_episode_callback(ep_idx) if slot == 0 else None
+            episode = Episode(ep_idx, callback,
+                              manager.epsilon_for_episode(ep_idx), TRAINING, manager.profiler)
+            if slot == 0:
+                manager.current_running_ep_idx = ep_idx
+                manager.current_episode = episode
+                manager.epsilon = episode.ep_epsilon
+
+            start = perf_counter()
+            await self.play(episode)
+            manager.profiler.record("episode", perf_counter() - start)
+            manager.update_state_counters(episode.game_state.current_state)
+            self.nb_finished_episodes += 1
+            summary = manager.end_profile_period(self.nb_finished_episodes)
+            if summary is not None:
+                await self.run_blocking(log_client_profile, manager.mode, summary)
+
+            await self.upload_slots.acquire()
+            upload = asyncio.ensure_future(
+                self.run_blocking(episode.upload_experiences))
+            upload.add_done_callback(
+                partial(self.on_upload_done, perf_counter()))
+            self.uploads.add(upload)
+
+            # same throttling as the synchronous training, without blocking the other episodes
+            await self.run_blocking(manager.update_episode_timeout)
+            await asyncio.sleep(manager.episode_timeout)
+
+    def on_upload_done(self, started_at: float, upload: asyncio.Future) -> None:
+        self.episode_manager.profiler.record(
+            "upload", perf_counter() - started_at)
+        self.uploads.discard(upload)
+        self.upload_slots.release()
+        if not upload.cancelled() and upload.exception() is not None:
+            app_logger.error(f'Experiences upload failed: {upload.exception()}')
+
+    async def play(self, episode: Episode) -> None:
+        """
+        Plays one episode, like `Episode.process_game` without the final upload.
+        """
+        episode.timer.start()
+        state = episode.game_state.get_state()
+        done = episode.is_game_over()
+
+        while not done:
+            action_request = asyncio.ensure_future(self.run_blocking(
+                get_action, state, episode.mode, episode.ep_epsilon, episode.modelname))
+
+            episode.update_interface()
+            episode.log_ml_metrics()
+
+            # only the time left waiting once the rendering and logging are done
+            start = perf_counter()
+            action = await action_request
+            episode.profiler.record("action_request", perf_counter() - start)
+            new_state, reward, done = episode.step(action)
+
+            start = perf_counter()
+            if isinstance(episode.buffer, ExperienceStreamer) and episode.buffer.sends_on_next_add():
+                await self.run_blocking(episode.save_to_buffer, state, action, reward, new_state, done)
+            else:
+                episode.save_to_buffer(state, action, reward, new_state, done)
+            episode.profiler.record("buffer", perf_counter() - start)
+            state = new_state
+
+            if episode.step_index >= STEP_LIMIT:
+                done = True
+
+        episode.update_interface()
+        episode.log_ml_metrics()
+        episode.timer.end()
@@ -1,26 +1,33 @@
 import logging
-from typing import Callable
+from time import perf_counter
+from typing import Callable, Optional
 from utils.replay_buffer import ReplayBuffer
+from api.experience_streamer import ExperienceStreamer
 from utils.timer import Timer
+from utils.stage_profiler import StageProfiler
 from world.world import World
 from .game_state import GameState
 from .reward import get_step_reward
-from api.requests import get_action, update_model
+from api.backend import get_action, update_model
 from logger.data_recorder import create_gif
 from utils.game_states import OUT_OF_BOUNDS, ON_EXIT_DOOR, RANDOM, TESTING, TRAINING, UNSET
+from settings import STREAM_EXPERIENCES
 
 app_logger = logging.getLogger('app_logger')
 
+STEP_LIMIT = 1000  # an episode is ended after this many steps
+
 
 class Episode:
     """
     Equivalent to a game
     """
 
-    def __init__(self, ep_number: int, interface_update_callback: Callable, epsilon: float = None, mode: str = UNSET):
+    def __init__(self, ep_number: int, interface_update_callback: Optional[Callable], epsilon: float = None, mode: str = UNSET,
+                 profiler: StageProfiler = None):
         self.ep_number: int = ep_number
         self.world = World()
-        self.buffer = ReplayBuffer()
+        self.buffer = ExperienceStreamer() if STREAM_EXPERIENCES and mode == TRAINING else ReplayBuffer()
         self.game_state = GameState(self.world)
         self.step_index = 0
         self.total_reward = 0
@@ -31,13 +38,18 @@ class Episode:
         self.modelname = None
         # ----- metrics
         self.timer = Timer()
-        # ---- callback
+        # time spent per stage of the loop, usually shared with the episode manager
+        self.profiler = profiler if profiler is not None else StageProfiler()
+        # ---- callback, None when the episode is not rendered
         self.interface_update_callback = interface_update_callback
 
     def __del__(self):
+        sensing_cache = self.world.sensing_cache
         app_logger.info(
-            f'episode: {self.ep_number}, duration: {self.timer.get_formatted_duration()}')
-        if self.mode == TESTING:
+            f'episode: {self.ep_number}, duration: {self.timer.get_formatted_duration()}, '
+            f'sensing cache: {sensing_cache.hits} hits, {sensing_cache.misses} misses '
+            f'({sensing_cache.hit_rate():.0%})')
+        if self.mode == TESTING and self.interface_update_callback is not None:
             create_gif()
 
     def update_step_count(self):
@@ -49,38 +61,59 @@ class Episode:
         self.timer.start()
         state = self.game_state.get_state()
         done = self.is_game_over()
-        self.interface_update_callback()
+        self.update_interface()
         self.log_ml_metrics()
 
+        record = self.profiler.record
+
         while not done:
 
+            start = perf_counter()
             action = get_action(state,
                                 self.mode, self.ep_epsilon, self.modelname)
+            record("action_request", perf_counter() - start)
 
             new_state, reward, done = self.step(action)
 
             if self.mode == TRAINING:
+                start = perf_counter()
                 self.save_to_buffer(
                     state, action, reward, new_state, done)
+                record("buffer", perf_counter() - start)
 
             state = new_state
 
-            self.interface_update_callback()
+            self.update_interface()
             self.log_ml_metrics()
 
-            if self.step_index >= 1000:
+            if self.step_index >= STEP_LIMIT:
                 done = True
 
         if self.mode == TRAINING:
-            update_model(self.buffer)
+            start = perf_counter()
+            self.upload_experiences()
+            record("upload", perf_counter() - start)
 
         self.timer.end()
 
+    def upload_experiences(self) -> None:
+        if isinstance(self.buffer, ExperienceStreamer):
+            self.buffer.commit()
+        else:
+            update_model(self.buffer)
+
+    def update_interface(self) -> None:
+        if self.interface_update_callback is not None:
+            start = perf_counter()
+            self.interface_update_callback()
+            self.profiler.record("rendering", perf_counter() - start)
+
     def save_to_buffer(self, state_to_choose_an_action, action, reward, next_state, done):
         self.buffer.add(
             (state_to_choose_an_action, action, reward, next_state, done), round(self.total_reward, 3))
 
     def move_and_update(self, action: int) -> tuple[list, list]:
+        start = perf_counter()
 
         self.world.move_agent(action)
 
@@ -97,7 +130,12 @@ class Episode:
 
         self.game_state.update_collectibles_status(nb_collected)
 
-        return self.game_state.get_state()
+        encoding_start = perf_counter()
+        self.profiler.record("world_step", encoding_start - start)
+        # the direction sensing is computed here, as part of the state
+        state = self.game_state.get_state()
+        self.profiler.record("state_encoding", perf_counter() - encoding_start)
+        return state
 
     def is_game_over(self) -> bool:
 
@@ -172,13 +210,15 @@ class Episode:
         return props  # to draw
 
     def log_ml_metrics(self) -> None:
+        start = perf_counter()
         app_logger.info(
             f'episode: {self.ep_number}, \
                 current agent situation: {self.game_state.current_state}, \
-                current vision: {self.game_state.evaluate_next_states()}, \
+                current vision: {self.game_state.next_states}, \
                 current collection {self.game_state.nb_collected}/{self.game_state.num_collectibles} \
                 ended ? {self.game_state.current_state in [OUT_OF_BOUNDS, ON_EXIT_DOOR]}'
         )
+        self.profiler.record("logging", perf_counter() - start)
 
     def get_info(self) -> dict[str, int]:
         info = {
@@ -1,13 +1,20 @@
 import logging
-from time import sleep
-from api.requests import get_queue_size
+import random
+from time import perf_counter, sleep
+import numpy as np
+from api.backend import get_actions, get_queue_size, log_client_profile, update_model
 from utils.common import epsilon_decay
 from utils.timer import Timer
+from utils.stage_profiler import StageProfiler
 from typing import Any, Callable, Optional
 from .episode import Episode
+from .vector_env import VectorEnv
+from .async_runner import AsyncEpisodeRunner
+from utils.replay_buffer import ReplayBuffer
 from logger.logging import setup_loggers
 from utils.game_states import ON_EXIT_DOOR, OUT_OF_BOUNDS, RANDOM, TESTING, TRAINING
-from settings import EPSILON, EPSILON_DECAY, MIN_EPSILON, NB_OF_EPISODES
+from settings import EPSILON, EPSILON_DECAY, FLOW_CONTROL, MIN_EPSILON, NB_OF_EPISODES, NUM_ENVS_PER_PROCESS, \
+    PROFILE_EVERY_N_EPISODES, RENDER_EVERY_N_EPISODES, RENDER_SAMPLE_RATE
 
 
 setup_loggers()
@@ -17,17 +24,21 @@ app_logger = logging.getLogger('app_logger')
 class EpisodeManager:
     def __init__(self, nb_eps: int = NB_OF_EPISODES):
         self.mode = TRAINING
-        self.callback: Optional[Callable] = None
+        self.interface_update_callback: Optional[Callable] = None
+        self.render_every_n_episodes = RENDER_EVERY_N_EPISODES
+        self.render_sample_rate = RENDER_SAMPLE_RATE
         self.nb_episodes = nb_eps
         self.current_running_ep_idx = -1
         self.current_episode: Optional[Episode] = None
-        self.episode_timeout = 1
+        self.episode_timeout = 0 if FLOW_CONTROL else 1
         # personnal epsilon
         self.epsilon = EPSILON
         self.epsilon_decay = EPSILON_DECAY
         self.min_epsilon = MIN_EPSILON
         # --- logging
         self.timer = Timer()
+        self.profiler = StageProfiler()
+        self.profile_every_n_episodes = PROFILE_EVERY_N_EPISODES
         self.cummulative_exit_doors = 0
         self.cummulative_out_of_bouds = 0
 
@@ -41,6 +52,21 @@ class EpisodeManager:
     def set_callback(self, callback: Callable) -> None:
         self.interface_update_callback: Callable = callback
 
+    def get_episode_callback(self, ep_idx: int) -> Optional[Callable]:
+        """
+        Returns the interface callback if the episode should be rendered, None otherwise.
+
+        Without a callback (headless) no episode is rendered, otherwise one episode
+        out of `render_every_n_episodes` is, kept with a `render_sample_rate` probability.
+        """
+        if self.interface_update_callback is None:
+            return None
+        if (ep_idx - 1) % self.render_every_n_episodes != 0:
+            return None
+        if random.random() >= self.render_sample_rate:
+            return None
+        return self.interface_update_callback
+
     def train_model(self) -> None:
 
         app_logger.info('TRAINING: Start of a training')
@@ -50,16 +76,107 @@ class EpisodeManager:
         for idx in range(1, self.nb_episodes + 1):
             self.current_running_ep_idx = idx
             self.current_episode = Episode(
-                idx, self.interface_update_callback, self.epsilon, self.mode)
+                idx, self.get_episode_callback(idx), self.epsilon, self.mode, self.profiler)
             self.decay_exploration_rate()
+
+            start = perf_counter()
             self.update_episode_timeout()
+            throttle_duration = perf_counter() - start
+
+            start = perf_counter()
             self.current_episode.process_game()
+            self.profiler.record("episode", perf_counter() - start)
+
+            start = perf_counter()
             sleep(self.episode_timeout)
+            self.profiler.record(
+                "throttle", throttle_duration + perf_counter() - start)
+
             self.update_state_counters()
+            self.report_profile(idx)
         self.timer.end()
         app_logger.info(
             f'TRAINING: End of the training, duration: {self.timer.get_formatted_duration()}')
 
+    def train_model_vectorized(self, num_envs: int = NUM_ENVS_PER_PROCESS) -> None:
+        """
+        Trains on `num_envs` worlds stepped in lockstep, with one action request
+        per step for all of them. Nothing is rendered.
+
+        Each world keeps its own buffer, sent to the server when its episode ends,
+        and plays with the epsilon of the episode it is running.
+        """
+        app_logger.info(
+            f'TRAINING: Start of a vectorized training over {num_envs} worlds')
+        self.set_mode(TRAINING)
+        self.timer.start()
+
+        vector_env = VectorEnv(num_envs, profiler=self.profiler)
+        states = vector_env.reset()
+        buffers = [ReplayBuffer() for _ in range(num_envs)]
+        epsilons = np.empty(num_envs)
+        for env_idx in range(num_envs):
+            epsilons[env_idx] = self.epsilon_for_episode(env_idx + 1)
+
+        nb_finished_episodes = 0
+        while nb_finished_episodes < self.nb_episodes:
+            start = perf_counter()
+            actions = get_actions(states, self.mode, epsilons)
+            self.profiler.record("action_request", perf_counter() - start)
+            new_states, rewards, dones, infos = vector_env.step(actions)
+
+            for env_idx, done in enumerate(dones.tolist()):
+                if not done:
+                    buffers[env_idx].add((states[env_idx], int(actions[env_idx]), float(rewards[env_idx]),
+                                          new_states[env_idx], done), vector_env.total_reward(env_idx))
+                    continue
+
+                if nb_finished_episodes >= self.nb_episodes:
+                    continue
+
+                # the new state of a finished world is already the first one of its next episode
+                info = infos[env_idx]
+                buffers[env_idx].add((states[env_idx], int(actions[env_idx]), float(rewards[env_idx]),
+                                      info["final_state"], done), round(info["total_reward"], 3))
+
+                start = perf_counter()
+                update_model(buffers[env_idx])
+                self.profiler.record("upload", perf_counter() - start)
+                buffers[env_idx] = ReplayBuffer()
+
+                nb_finished_episodes += 1
+                self.current_running_ep_idx = nb_finished_episodes
+                self.update_state_counters(info["situation"])
+                self.report_profile(nb_finished_episodes)
+                epsilons[env_idx] = self.epsilon_for_episode(
+                    vector_env.nb_started_episodes)
+
+            if dones.any():
+                start = perf_counter()
+                self.update_episode_timeout()
+                sleep(self.episode_timeout)
+                self.profiler.record("throttle", perf_counter() - start)
+
+            states = new_states
+
+        self.timer.end()
+        app_logger.info(
+            f'TRAINING: End of the vectorized training, duration: {self.timer.get_formatted_duration()}')
+
+    def train_model_async(self) -> None:
+        """
+        Trains with the pipelined asyncio runner, see `AsyncEpisodeRunner`.
+        """
+        app_logger.info('TRAINING: Start of an asynchronous training')
+        self.set_mode(TRAINING)
+        self.timer.start()
+
+        AsyncEpisodeRunner(self).run()
+
+        self.timer.end()
+        app_logger.info(
+            f'TRAINING: End of the asynchronous training, duration: {self.timer.get_formatted_duration()}')
+
     def run_model(self, modelname) -> None:
         app_logger.info('TESTING: Start of inference')
         self.set_mode(TESTING)
@@ -69,10 +186,13 @@ class EpisodeManager:
         for idx in range(1, self.nb_episodes + 1):
             self.current_running_ep_idx = idx
             self.current_episode = Episode(
-                idx, self.interface_update_callback, self.epsilon, self.mode)
+                idx, self.get_episode_callback(idx), self.epsilon, self.mode, self.profiler)
             self.current_episode.modelname = modelname
+            start = perf_counter()
             self.current_episode.process_game()
+            self.profiler.record("episode", perf_counter() - start)
             self.update_state_counters()
+            self.report_profile(idx)
 
         self.timer.end()
         app_logger.info(
@@ -87,18 +207,54 @@ class EpisodeManager:
         for idx in range(1, self.nb_episodes + 1):
             self.current_running_ep_idx = idx
             self.current_episode = Episode(
-                idx, self.interface_update_callback, self.epsilon, self.mode)
+                idx, self.get_episode_callback(idx), self.epsilon, self.mode, self.profiler)
+            start = perf_counter()
             self.current_episode.process_game()
+            self.profiler.record("episode", perf_counter() - start)
             self.update_state_counters()
+            self.report_profile(idx)
 
         self.timer.end()
         app_logger.info(
             f'RANDOM: End of random play, duration: {self.timer.get_formatted_duration()}')
 
     def update_episode_timeout(self):
+        if FLOW_CONTROL:
+            # the server holds the uploads back itself when its learner is behind
+            self.episode_timeout = 0
+            return
         queue_size = get_queue_size()
         self.episode_timeout = queue_size / 6
 
+    def report_profile(self, nb_finished_episodes: int) -> None:
+        """
+        Every `profile_every_n_episodes` episodes, logs the time spent per stage,
+        sends it to the server for TensorBoard, and starts a new period.
+        """
+        summary = self.end_profile_period(nb_finished_episodes)
+        if summary is not None:
+            log_client_profile(self.mode, summary)
+
+    def end_profile_period(self, nb_finished_episodes: int) -> Optional[dict]:
+        """
+        Every `profile_every_n_episodes` episodes, logs the time spent per stage
+        and starts a new period.
+
+        Returns:
+            Optional[dict]: The summary of the period that ended, None if none did.
+        """
+        if nb_finished_episodes % self.profile_every_n_episodes != 0:
+            return None
+        summary = self.profiler.summary()
+        app_logger.info(
+            f'PROFILE: episodes {nb_finished_episodes - self.profile_every_n_episodes + 1}-{nb_finished_episodes}, '
+            f'{StageProfiler.format_summary(summary)}')
+        self.profiler.reset()
+        return summary
+
+    def epsilon_for_episode(self, ep_idx: int) -> float:
+        return epsilon_decay(min(ep_idx, self.nb_episodes), self.nb_episodes)
+
     def decay_exploration_rate(self):
         """
         Update the exploration rate (epsilon).
@@ -108,9 +264,11 @@ class EpisodeManager:
         self.epsilon = epsilon_decay(
             self.current_running_ep_idx, self.nb_episodes)
 
-    def update_state_counters(self):
-        self.cummulative_exit_doors += 1 if self.current_episode.game_state.current_state == ON_EXIT_DOOR else 0
-        self.cummulative_out_of_bouds += 1 if self.current_episode.game_state.current_state == OUT_OF_BOUNDS else 0
+    def update_state_counters(self, situation: str = None):
+        if situation is None:
+            situation = self.current_episode.game_state.current_state
+        self.cummulative_exit_doors += 1 if situation == ON_EXIT_DOOR else 0
+        self.cummulative_out_of_bouds += 1 if situation == OUT_OF_BOUNDS else 0
 
     def get_current_state_to_display(self) -> dict[str, dict]:
         current_episode: Episode = self.current_episode
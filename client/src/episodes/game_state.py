@@ -1,5 +1,6 @@
-from settings import MAX_STEP_PER_EP
+from settings import FLAT_STATE_ENCODER, MAX_STEP_PER_EP
 from utils.common import normalize_group, one_hot_encode
+from .state_encoder import StateEncoder
 from world.world import World
 from utils.game_states import ONTO_SURFACE
 
@@ -28,15 +29,10 @@ class GameState:
         self.max_step_count: int = MAX_STEP_PER_EP
         self.num_collectibles: int = len(self.world.collectibles)
         self.next_states: list = [0] * len(self.world.agent.heads)
+        self.encoder = StateEncoder(len(self.world.agent.heads))
 
     def evaluate_next_states(self) -> list:
-        agent_next_status = []
-
-        for idx, _ in enumerate(self.world.agent.heads):
-            status = self.world.evaluate_next_position_status(idx)
-            agent_next_status.append(status)
-
-        return agent_next_status
+        return self.world.evaluate_next_positions_status()
 
     def update_current_state(self, state_index: int) -> None:
         if 0 <= state_index <= 3:
@@ -53,6 +49,16 @@ class GameState:
             self.nb_collected = nb_collected
 
     def get_state(self):
+        """
+        Returns the state the agent learns from: a flat float32 array owned by
+        the caller (see `StateEncoder` for its layout), or the nested list
+        state when FLAT_STATE_ENCODER is off.
+        """
+        if FLAT_STATE_ENCODER:
+            return self.encoder.encode(self)
+        return self.get_nested_state()
+
+    def get_nested_state(self):
         default_distance = self.world.surface.shape.radius * 2
 
         normd_collection_progress = (self.nb_collected / self.num_collectibles
@@ -1,17 +1,27 @@
 import sys
 import pygame
 import multiprocessing
+from typing import Callable
 from pygame_module.game_display import GameDisplay
 from episodes.episode_manager import EpisodeManager
-from api.requests import end_training, save_model, start_training
+from api.backend import IN_PROCESS, end_training, get_backend_name, save_model, set_model_name, start_training
 from utils.common import distribute_episodes, generate_datetime_string
+from settings import ASYNC_RUNNER, HEADLESS, NAMED_SESSIONS, NUM_ENVS_PER_PROCESS
 
 
 def run_multicore_training(num_used_cores: int, num_episodes: int):
     modelname = generate_datetime_string() + "_model"
+    session_name = modelname if NAMED_SESSIONS else None
 
+    set_model_name(session_name)
     start_training(modelname)
 
+    if get_backend_name() == IN_PROCESS:
+        # the learner lives in this process, episodes cannot be spread over processes
+        run_training_client(0, num_episodes, session_name=session_name)
+        end_training()
+        return modelname
+
     total_num_cores = multiprocessing.cpu_count()
     if num_used_cores <= total_num_cores:
         episode_distribution = distribute_episodes(
@@ -22,7 +32,8 @@ def run_multicore_training(num_used_cores: int, num_episodes: int):
             for process_index in range(num_used_cores):
                 num_eps = episode_distribution[process_index]
                 p = multiprocessing.Process(
-                    target=run_training_client, args=(process_index, num_eps))
+                    target=run_training_client, args=(process_index, num_eps),
+                    kwargs={"session_name": session_name})
                 p.start()
                 processes.append(p)
 
@@ -38,36 +49,21 @@ def run_multicore_training(num_used_cores: int, num_episodes: int):
     return modelname
 
 
-def run_training_client(process_index, num_eps):
-    pygame.init()
-    game_display = GameDisplay()
-    episode_manager = EpisodeManager(nb_eps=num_eps)
-
-    def callback():
-        state = episode_manager.get_current_state_to_display()
-        info = episode_manager.get_episode_info()
-        mode = episode_manager.mode
-        game_display.update(state, info, mode)
-
-    episode_manager.set_callback(callback)
-
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-        episode_manager.train_model()
-
-        running = False
-
-    pygame.quit()
+def run_with_display(episode_manager: EpisodeManager, run: Callable, headless: bool = HEADLESS) -> None:
+    """
+    Runs episodes of the manager, drawn in a pygame window unless headless.
 
+    Args:
+        episode_manager (EpisodeManager): The manager running the episodes.
+        run (Callable): The manager method to call (train_model, run_random, ...).
+        headless (bool): If True, no window is opened and no episode is rendered.
+    """
+    if headless:
+        run()
+        return
 
-def run_random(num_eps):
     pygame.init()
     game_display = GameDisplay()
-    episode_manager = EpisodeManager(nb_eps=num_eps)
 
     def callback():
         state = episode_manager.get_current_state_to_display()
@@ -83,34 +79,33 @@ def run_random(num_eps):
             if event.type == pygame.QUIT:
                 running = False
 
-        episode_manager.run_random()
+        run()
 
         running = False
 
     pygame.quit()
 
 
-def run_trained_model(modelname, num_eps):
-    pygame.init()
-    game_display = GameDisplay()
+def run_training_client(process_index, num_eps, headless: bool = HEADLESS,
+                        num_envs: int = NUM_ENVS_PER_PROCESS, session_name: str = None):
+    # the session is set again in case the process was spawned rather than forked
+    set_model_name(session_name)
     episode_manager = EpisodeManager(nb_eps=num_eps)
+    if num_envs > 1:
+        episode_manager.train_model_vectorized(num_envs)
+        return
+    train = episode_manager.train_model_async if ASYNC_RUNNER else episode_manager.train_model
+    run_with_display(episode_manager, train, headless)
 
-    def callback():
-        state = episode_manager.get_current_state_to_display()
-        info = episode_manager.get_episode_info()
-        mode = episode_manager.mode
-        game_display.update(state, info, mode)
-
-    episode_manager.set_callback(callback)
 
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-        episode_manager.run_model(modelname)
+def run_random(num_eps, headless: bool = HEADLESS):
+    episode_manager = EpisodeManager(nb_eps=num_eps)
+    run_with_display(episode_manager, episode_manager.run_random, headless)
 
-        running = False
 
-    pygame.quit()
+def run_trained_model(modelname, num_eps, headless: bool = HEADLESS):
+    # saved models are loaded from the disk by the default session, whatever session trained them
+    set_model_name(None)
+    episode_manager = EpisodeManager(nb_eps=num_eps)
+    run_with_display(
+        episode_manager, lambda: episode_manager.run_model(modelname), headless)
@@ -0,0 +1,111 @@
+"""
+Encodes a game state into the flat float32 vector the agent learns from.
+
+Layout of the vector, for an agent with `nb_heads` heads (24 heads: 200 floats):
+
+    [0, 4)                          agent state, one-hot (OUT_OF_BOUNDS, ONTO_SURFACE,
+                                    STAR_COLLECTED, ON_EXIT_DOOR)
+    4                               collection progress, collected / total stars
+    5                               number of remaining stars
+    6                               exit door found (0 or 1)
+    7                               step index / max step count
+    [8, 8 + 4n)                     next position status of each head, one-hot over 4
+    [8 + 4n, 8 + 7n)                detection of each head, one-hot over 3
+                                    (nothing, collectible, exit door)
+    [8 + 7n, 8 + 8n)                distance sensed by each head / surface diameter
+
+This is the order in which `GameState.get_nested_state` nests the same
+features, so flattening the nested state gives the same vector.
+
+Each encoding is written into a new vector rather than into a buffer reused
+by the encoder and returned as a zero-copy view. Every state is kept by its
+caller: the episode buffer stores it as the state of one transition and the
+next state of the previous one, and the action request is sent before the next
+step. A reused buffer would therefore be copied at every step anyway, and a
+view handed out would be overwritten under its holder. Allocating the vector
+uninitialized (every feature is written) costs no more than that copy.
+"""
+import numpy as np
+
+NB_AGENT_STATES = 4
+NB_DETECTIONS = 3
+
+AGENT_STATE = slice(0, NB_AGENT_STATES)
+COLLECTION_PROGRESS_INDEX = 4
+REMAINING_STARS_INDEX = 5
+DOOR_FOUND_INDEX = 6
+STEP_PROGRESS_INDEX = 7
+HEADS_OFFSET = 8
+
+
+def state_size(nb_heads: int) -> int:
+    return HEADS_OFFSET + nb_heads * (NB_AGENT_STATES + NB_DETECTIONS + 1)
+
+
+class StateEncoder:
+    """
+    Writes the features of a game state into a new float32 vector.
+
+    Every encoded state is kept by its caller (the episode buffer stores it as
+    the state and the next state of two transitions), so each call allocates
+    its own vector, without initializing it as every feature is written.
+
+    Attributes:
+        nb_heads (int): The number of heads of the agent.
+        size (int): The number of features.
+        next_states (slice): The one-hot next position statuses of the heads.
+        detections (slice): The one-hot detections of the heads.
+        distances (slice): The normalized sensed distances of the heads.
+    """
+
+    def __init__(self, nb_heads: int):
+        self.nb_heads = nb_heads
+        self.size = state_size(nb_heads)
+        self.next_states = slice(
+            HEADS_OFFSET, HEADS_OFFSET + NB_AGENT_STATES * nb_heads)
+        self.detections = slice(self.next_states.stop,
+                                self.next_states.stop + NB_DETECTIONS * nb_heads)
+        self.distances = slice(self.detections.stop,
+                               self.detections.stop + nb_heads)
+        self.head_indices = np.arange(nb_heads)
+
+    def encode(self, game_state) -> np.ndarray:
+        """
+        Encodes a game state.
+
+        Args:
+            game_state (GameState): The state to encode.
+
+        Returns:
+            np.ndarray: The state, a float32 array of `size` floats owned by the caller.
+        """
+        state = np.empty(self.size, dtype=np.float32)
+        world = game_state.world
+        default_distance = world.surface.shape.radius * 2
+        head_detection, head_distance_to_collectible = world.get_agent_direction_sensing()
+
+        state[AGENT_STATE] = 0
+        state[game_state.current_state] = 1
+        state[COLLECTION_PROGRESS_INDEX] = (game_state.nb_collected / game_state.num_collectibles
+                                            if game_state.num_collectibles > 0 else 0)
+        state[REMAINING_STARS_INDEX] = game_state.num_collectibles - \
+            game_state.nb_collected
+        state[DOOR_FOUND_INDEX] = world.agent.door_found
+        state[STEP_PROGRESS_INDEX] = game_state.step_index / \
+            game_state.max_step_count
+
+        next_states = state[self.next_states].reshape(
+            self.nb_heads, NB_AGENT_STATES)
+        next_states[:] = 0
+        next_states[self.head_indices, game_state.next_states] = 1
+
+        detections = state[self.detections].reshape(
+            self.nb_heads, NB_DETECTIONS)
+        detections[:] = 0
+        detections[self.head_indices, head_detection] = 1
+
+        # normalized in float64 and then rounded, as the nested state is
+        state[self.distances] = np.asarray(
+            head_distance_to_collectible, dtype=np.float64) / default_distance
+        return state
+
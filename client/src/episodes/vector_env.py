@@ -0,0 +1,96 @@
+import numpy as np
+from .episode import STEP_LIMIT, Episode
+from utils.stage_profiler import StageProfiler
+from utils.wire_format import to_flat_array
+from utils.game_states import TRAINING
+
+
+class VectorEnv:
+    """
+    Steps several independent worlds in lockstep from one array of actions.
+
+    Each world is driven by its own Episode (with the same step, reward and
+    game over logic as a regular game), without any server call or rendering.
+    The worlds share the precomputed head offsets and ray directions of the
+    vectorized sensing. A finished episode is immediately replaced by a new one.
+
+    Attributes:
+        num_envs (int): The number of worlds.
+        step_limit (int): The number of steps after which an episode is ended.
+        episodes (list[Episode]): The running episode of each world.
+    """
+
+    def __init__(self, num_envs: int, step_limit: int = STEP_LIMIT, profiler: StageProfiler = None):
+        self.num_envs = num_envs
+        self.step_limit = step_limit
+        self.profiler = profiler if profiler is not None else StageProfiler()
+        self.episodes: list[Episode] = []
+        self.nb_started_episodes = 0
+
+    def new_episode(self) -> Episode:
+        self.nb_started_episodes += 1
+        episode = Episode(self.nb_started_episodes, None,
+                          mode=TRAINING, profiler=self.profiler)
+        episode.timer.start()
+        return episode
+
+    @staticmethod
+    def get_state(episode: Episode) -> np.ndarray:
+        return to_flat_array(episode.game_state.get_state())
+
+    def reset(self) -> np.ndarray:
+        """
+        Starts a new episode in every world.
+
+        Returns:
+            np.ndarray: The initial states, of shape (num_envs, state_size).
+        """
+        self.episodes = [self.new_episode() for _ in range(self.num_envs)]
+        return np.stack([self.get_state(episode) for episode in self.episodes])
+
+    def step(self, actions) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[dict]]:
+        """
+        Applies one action in each world.
+
+        Args:
+            actions (array): One action per world.
+
+        Returns:
+            tuple: The states, rewards and dones arrays, and one info dict per world.
+                   For a finished episode, the state is the first state of the new
+                   episode and the info holds the episode's "final_state",
+                   "situation", "total_reward" and "steps"; other infos are empty.
+        """
+        states = []
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        infos = []
+
+        for idx, action in enumerate(actions):
+            episode = self.episodes[idx]
+            new_state, reward, done = episode.step(int(action))
+            new_state = to_flat_array(new_state)
+
+            rewards[idx] = reward
+            dones[idx] = done or episode.step_index >= self.step_limit
+
+            if dones[idx]:
+                episode.timer.end()
+                infos.append({
+                    "final_state": new_state,
+                    "situation": episode.game_state.current_state,
+                    "total_reward": episode.total_reward,
+                    "steps": episode.step_index,
+                })
+                episode = self.new_episode()
+                self.episodes[idx] = episode
+                new_state = self.get_state(episode)
+            else:
+                infos.append({})
+
+            states.append(new_state)
+
+        return np.stack(states), rewards, dones, infos
+
+    def total_reward(self, env_idx: int) -> float:
+        return round(self.episodes[env_idx].total_reward, 3)
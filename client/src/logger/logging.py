@@ -8,8 +8,10 @@ logger.error("Error message for a major problem")
 logger.critical("Critical issue, program may not be able to continue")
 """
 import os
+import queue
 import logging
-from logging.handlers import RotatingFileHandler
+from typing import Optional
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 log_directory = '../data/logs'
 if not os.path.exists(log_directory):
@@ -31,4 +33,34 @@ def setup_loggers():
         app_logger.addHandler(app_log_handler)
 
 
+def start_queue_logging() -> Optional[QueueListener]:
+    """
+    Moves the handlers of the app logger behind a queue: logging a record only
+    enqueues it, and a listener thread formats and writes it to the handlers.
+
+    Returns:
+        QueueListener: The started listener, None if the logger already logs through a queue.
+    """
+    app_logger = logging.getLogger('app_logger')
+    if any(isinstance(handler, QueueHandler) for handler in app_logger.handlers):
+        return None
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *app_logger.handlers,
+                             respect_handler_level=True)
+    app_logger.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    return listener
+
+
+def stop_queue_logging(listener: Optional[QueueListener]) -> None:
+    """
+    Writes the queued records and gives its handlers back to the app logger.
+    """
+    if listener is None:
+        return
+    listener.stop()
+    logging.getLogger('app_logger').handlers = list(listener.handlers)
+
+
 setup_loggers()
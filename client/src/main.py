@@ -1,5 +1,5 @@
 from time import sleep
-from api.requests import is_model_saved
+from api.backend import is_model_saved
 from episodes.runners import run_multicore_training, run_random, run_trained_model
 
 from utils.timer import Timer
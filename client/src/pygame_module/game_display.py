@@ -15,6 +15,7 @@ class GameDisplay:
         self.window = pygame.display.set_mode((self.width, self.height))
         pygame.display.set_caption(GAME_TITLE)
         self.background_color = background_color
+        self.font = pygame.font.SysFont(None, 24)
 
     def update(self, game_state, episode_info, mode):
         self.reset_content()
@@ -88,13 +89,12 @@ class GameDisplay:
         pygame.image.save(self.window, filepath)
 
     def display_info(self, episode_info):
-        font = pygame.font.SysFont(None, 24)
         start_y = 10
         line_height = 30
 
         for key, value in episode_info.items():
             info_text = f"{key}: {value}"
-            text = font.render(info_text, True, WHITE)
+            text = self.font.render(info_text, True, WHITE)
             self.window.blit(text, (10, start_y))
             start_y += line_height  # Move to the next line
 
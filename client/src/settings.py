@@ -4,6 +4,18 @@ WINDOW_WIDTH = 700
 WINDOW_HEIGHT = 700
 FPS = 60
 
+# Rendering
+HEADLESS = False  # no window and no per-step interface update
+RENDER_EVERY_N_EPISODES = 1  # with a window, only render one episode out of N
+RENDER_SAMPLE_RATE = 1.0  # probability of rendering an episode selected above
+
+# World
+FLAT_STATE_ENCODER = True  # states encoded straight into a new flat float32 vector, False: nested lists
+VECTORIZED_SENSING = True  # compute the sensing of all heads in one NumPy pass
+SPATIAL_INDEX_CELL_SIZE = 70  # side of the grid cells indexing the collectibles
+SPATIAL_INDEX_MIN_COLLECTIBLES = 48  # below, the queries scan every collectible instead of the grid
+PLACEMENT_MAX_ATTEMPTS = 1000  # random positions tried before a world is considered full
+
 # Reinforcement Learning settings
 NB_OF_EPISODES = 3000
 
@@ -12,6 +24,24 @@ EPSILON_DECAY = 0.999
 MIN_EPSILON = EPSILON - EPSILON_DECAY
 
 MAX_STEP_PER_EP = 200  # before no efficiency
+NUM_ENVS_PER_PROCESS = 1  # above 1, each training process steps that many worlds in lockstep (headless)
+PROFILE_EVERY_N_EPISODES = 50  # episodes between two reports of the time spent per stage of the episode loop
+ASYNC_RUNNER = False  # pipelined asyncio training: concurrent episodes and background uploads
+ASYNC_CONCURRENT_EPISODES = 4  # episodes played at the same time by the async runner
+ASYNC_MAX_PENDING_UPLOADS = 2  # buffers being uploaded at the same time by the async runner
+
+# Server API
+API_BACKEND = "HTTP"  # "HTTP" or "IN_PROCESS" (learner inside the client process, no HTTP)
+API_POOL_SIZE = 4  # kept-alive connections per process
+API_TIMEOUT = (3.05, 60)  # (connect, read) in seconds
+API_MAX_RETRIES = 3
+API_BACKOFF_FACTOR = 0.2
+API_MAX_QUEUE_WAIT = 120  # seconds an episode refused by a full update queue is sent again before giving up
+FLOW_CONTROL = True  # the server refuses episodes with a retry delay when its learner is behind, False: sleep queue_size / 6 before each episode
+NAMED_SESSIONS = True  # train in a server session named after the model (X-Model-Name header), False: the default session
+USE_BINARY_WIRE_FORMAT = True  # packed float32 frames, False for nested JSON
+STREAM_EXPERIENCES = False  # send the transitions in chunks during the episode instead of all at its end
+STREAM_CHUNK_SIZE = 16  # transitions per streamed chunk
 
 # Directorioes
 FRAMES_PATH = "/tmp/frames"
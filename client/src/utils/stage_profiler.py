@@ -0,0 +1,96 @@
+import time
+from bisect import bisect_right
+
+# histogram bin edges, in seconds: 4 bins per decade from 1 microsecond to 100 seconds
+BIN_EDGES = [10 ** (exponent / 4) for exponent in range(-24, 9)]
+
+
+class StageHistogram:
+    """
+    Durations of one stage, accumulated into fixed logarithmic bins.
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BIN_EDGES) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration: float) -> None:
+        self.counts[bisect_right(BIN_EDGES, duration)] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Returns the upper edge of the bin holding the given percentile, in seconds.
+        """
+        rank = percentile / 100 * self.count
+        cumulative_count = 0
+        for idx, count in enumerate(self.counts):
+            cumulative_count += count
+            if cumulative_count >= rank and count:
+                return BIN_EDGES[idx] if idx < len(BIN_EDGES) else self.max
+        return self.max
+
+
+class StageProfiler:
+    """
+    Always-on accumulation of the time spent in each stage of the episode loop.
+
+    Stages are timed by the caller with `time.perf_counter` and recorded with
+    `record`, which only bins the duration: a few hundred nanoseconds per call.
+    `summary` turns the histograms into milliseconds statistics and `reset`
+    starts a new reporting period.
+
+    Example:
+        start = time.perf_counter()
+        action = get_action(...)
+        profiler.record("action_request", time.perf_counter() - start)
+    """
+
+    def __init__(self):
+        self.histograms: dict[str, StageHistogram] = {}
+        self.period_start = time.perf_counter()
+
+    def record(self, stage: str, duration: float) -> None:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = StageHistogram()
+        histogram.add(duration)
+
+    def summary(self) -> dict[str, dict]:
+        """
+        Returns, for each stage: the number of calls, the total time in seconds,
+        its share of the period wall time (above 1 when episodes run concurrently),
+        and the mean, p50, p95, p99 and max in milliseconds (percentiles are bin
+        upper edges, within a factor 1.8).
+        """
+        wall_time = max(time.perf_counter() - self.period_start, 1e-9)
+        summary = {}
+        for stage, histogram in self.histograms.items():
+            summary[stage] = {
+                "count": histogram.count,
+                "total_s": histogram.total,
+                "share": histogram.total / wall_time,
+                "mean_ms": histogram.total / histogram.count * 1000,
+                "p50_ms": histogram.percentile(50) * 1000,
+                "p95_ms": histogram.percentile(95) * 1000,
+                "p99_ms": histogram.percentile(99) * 1000,
+                "max_ms": histogram.max * 1000,
+            }
+        return summary
+
+    def reset(self) -> None:
+        self.histograms = {}
+        self.period_start = time.perf_counter()
+
+    @staticmethod
+    def format_summary(summary: dict[str, dict]) -> str:
+        return ", ".join(f"{stage}: {stats['count']} calls, {stats['share']:.1%} of wall time, "
+                         f"mean {stats['mean_ms']:.3f}ms, p95 {stats['p95_ms']:.3f}ms"
+                         for stage, stats in sorted(summary.items(), key=lambda item: -item[1]["total_s"]))
@@ -0,0 +1,217 @@
+"""
+Binary wire format used between the clients and the server, as an
+alternative to nested JSON that is cheap to encode and decode.
+
+A frame is laid out as:
+
+    MAGIC (4 bytes) | header length (uint32, little-endian) | header | array payloads
+
+The header is UTF-8 JSON, padded with spaces to keep the payloads 8-byte aligned:
+
+    {"meta": {...}, "arrays": [{"name": str, "dtype": str, "shape": list}, ...]}
+
+`meta` holds the small scalar fields of a request (mode, epsilon, ...) and the
+arrays follow in header order, as raw little-endian C-ordered buffers.
+
+Most features of a state are one-hot, so the state matrices of update_model
+and stream frames are bit-packed: their columns holding only 0 and 1 are sent
+as bits, the other columns as float32 (descriptor {"packing": "bits",
+"nb_bit_columns": b}). The payload of such an (n, f) array is, each part
+padded to a multiple of 8 bytes:
+
+    column mask: u1 (ceil(f / 8),) | bits: u1 (n, ceil(b / 8)) | floats: <f4 (n, f - b)
+
+The packing is exact. With 200-float states, a 200-transition update_model
+frame is about 55 kB, against 323 kB unpacked and 460 kB as JSON.
+
+Declared schemas (n is the number of states, STATE_SIZE floats each):
+
+    get_action request:     meta {mode, epsilon, modelname}, arrays {state: <f4 (STATE_SIZE,)}
+    get_actions request:    meta {mode, epsilon, modelname}, arrays {states: <f4 (n, STATE_SIZE)}
+    get_actions response:   arrays {actions: <i4 (n,)}
+    update_model request:   arrays {states: <f4 (n, STATE_SIZE), actions: <i4 (n,), rewards: <f4 (n,),
+                                    next_states: <f4 (n, STATE_SIZE), dones: u1 (n,), total_rewards: <f4 (n,)}
+"""
+import json
+import struct
+import numpy as np
+
+FRAME_CONTENT_TYPE = "application/vnd.star-collector.frame"
+JSON_CONTENT_TYPE = "application/json"
+
+MAGIC = b"SCW1"
+PREFIX = struct.Struct("<4sI")
+ALIGNMENT = 8
+
+# the state matrices of the experience frames, bit-packed by `encode_frame`
+BIT_PACKED_ARRAYS = ("states", "next_states")
+BITS = "bits"
+ONE_AS_BITS = np.float32(1).view(np.uint32)
+
+EXPERIENCE_DTYPES = {
+    "states": "<f4",
+    "actions": "<i4",
+    "rewards": "<f4",
+    "next_states": "<f4",
+    "dones": "u1",
+    "total_rewards": "<f4",
+}
+
+
+def pad(payload: bytes) -> bytes:
+    return payload + b"\0" * (-len(payload) % ALIGNMENT)
+
+
+def pack_bits(array: np.ndarray) -> tuple[dict, bytes]:
+    """
+    Bit-packs the 0/1 columns of a 2-D float32 array.
+
+    Returns:
+        tuple: The packing fields of the array descriptor and the payload.
+    """
+    raw = array.view(np.uint32)
+    is_bit_column = np.all((raw == 0) | (raw == ONE_AS_BITS), axis=0)
+    bits = np.packbits(array[:, is_bit_column].astype(np.uint8), axis=1)
+    floats = np.ascontiguousarray(array[:, ~is_bit_column], dtype="<f4")
+
+    payload = pad(np.packbits(is_bit_column).tobytes()) + \
+        pad(bits.tobytes()) + floats.tobytes()
+    return {"packing": BITS, "nb_bit_columns": int(is_bit_column.sum())}, payload
+
+
+def unpack_bits(frame: bytes, offset: int, shape: tuple, nb_bit_columns: int) -> tuple[np.ndarray, int]:
+    """
+    Rebuilds an array packed by `pack_bits`.
+
+    Returns:
+        tuple: The float32 array and the offset following its payload.
+    """
+    nb_rows, nb_columns = shape
+    mask_size = -(-nb_columns // 8)
+    row_size = -(-nb_bit_columns // 8)
+
+    is_bit_column = np.unpackbits(np.frombuffer(
+        frame, dtype=np.uint8, count=mask_size, offset=offset), count=nb_columns).astype(bool)
+    offset += mask_size + (-mask_size % ALIGNMENT)
+
+    bits_size = nb_rows * row_size
+    bits = np.frombuffer(frame, dtype=np.uint8, count=bits_size,
+                         offset=offset).reshape(nb_rows, row_size)
+    offset += bits_size + (-bits_size % ALIGNMENT)
+
+    nb_floats = nb_rows * (nb_columns - nb_bit_columns)
+    floats = np.frombuffer(frame, dtype="<f4", count=nb_floats, offset=offset)
+    offset += nb_floats * 4
+
+    array = np.empty(shape, dtype=np.float32)
+    array[:, is_bit_column] = np.unpackbits(
+        bits, axis=1, count=nb_bit_columns)
+    array[:, ~is_bit_column] = floats.reshape(
+        nb_rows, nb_columns - nb_bit_columns)
+    return array, offset
+
+
+def encode_frame(meta: dict, arrays: dict, bit_packed: tuple = ()) -> bytes:
+    """
+    Encodes scalar fields and named arrays into a single binary frame.
+
+    Args:
+        meta (dict): JSON-serializable scalar fields.
+        arrays (dict): Named numpy arrays.
+        bit_packed (tuple): The names of the 2-D float32 arrays whose 0/1 columns are sent as bits.
+
+    Returns:
+        bytes: The encoded frame.
+    """
+    descriptors, payloads = [], []
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        descriptor = {"name": name, "dtype": array.dtype.str,
+                      "shape": list(array.shape)}
+        if name in bit_packed:
+            packing, payload = pack_bits(array.astype(np.float32, copy=False))
+            descriptor.update(packing)
+            # the next payloads stay aligned
+            payloads.append(pad(payload))
+        else:
+            payloads.append(array.tobytes())
+        descriptors.append(descriptor)
+
+    header = json.dumps({"meta": meta, "arrays": descriptors}).encode("utf-8")
+    header += b" " * (-(PREFIX.size + len(header)) % ALIGNMENT)
+
+    return b"".join([PREFIX.pack(MAGIC, len(header)), header] + payloads)
+
+
+def decode_frame(frame: bytes) -> tuple[dict, dict]:
+    """
+    Decodes a binary frame. Arrays are read-only views over the frame, no data
+    is copied, except the bit-packed ones which are rebuilt.
+
+    Args:
+        frame (bytes): The encoded frame.
+
+    Returns:
+        tuple: The scalar fields and the named arrays.
+    """
+    magic, header_length = PREFIX.unpack_from(frame)
+    if magic != MAGIC:
+        raise ValueError("Not a star collector frame")
+
+    header = json.loads(frame[PREFIX.size:PREFIX.size + header_length])
+    offset = PREFIX.size + header_length
+
+    arrays = {}
+    for descriptor in header["arrays"]:
+        dtype = np.dtype(descriptor["dtype"])
+        shape = tuple(descriptor["shape"])
+        if descriptor.get("packing") == BITS:
+            start = offset
+            arrays[descriptor["name"]], offset = unpack_bits(
+                frame, offset, shape, descriptor["nb_bit_columns"])
+            offset += -(offset - start) % ALIGNMENT
+            continue
+
+        count = int(np.prod(shape))
+        arrays[descriptor["name"]] = np.frombuffer(
+            frame, dtype=dtype, count=count, offset=offset).reshape(shape)
+        offset += count * dtype.itemsize
+
+    return header["meta"], arrays
+
+
+def to_flat_array(state) -> np.ndarray:
+    """
+    Converts a state, nested list or array, into a flat float32 array.
+    """
+    if isinstance(state, np.ndarray):
+        return state.astype(np.float32, copy=False).ravel()
+
+    flat_state = []
+
+    def recursive_flatten(items):
+        for item in items:
+            if isinstance(item, list):
+                recursive_flatten(item)
+            else:
+                flat_state.append(item)
+
+    recursive_flatten(state)
+    return np.array(flat_state, dtype=np.float32)
+
+
+def pack_experiences(experiences: list) -> dict:
+    """
+    Stacks (state, action, reward, next_state, done, total_reward) tuples
+    into the arrays of an update_model frame.
+    """
+    states, actions, rewards, next_states, dones, total_rewards = zip(
+        *experiences)
+    return {
+        "states": np.stack([to_flat_array(state) for state in states]),
+        "actions": np.array(actions, dtype=EXPERIENCE_DTYPES["actions"]),
+        "rewards": np.array(rewards, dtype=EXPERIENCE_DTYPES["rewards"]),
+        "next_states": np.stack([to_flat_array(state) for state in next_states]),
+        "dones": np.array(dones, dtype=EXPERIENCE_DTYPES["dones"]),
+        "total_rewards": np.array(total_rewards, dtype=EXPERIENCE_DTYPES["total_rewards"]),
+    }
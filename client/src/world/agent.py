@@ -8,6 +8,9 @@ class Agent:
     update me
     """
 
+    __slots__ = ('x_pos', 'y_pos', 'door_found', 'step', 'shape',
+                 'heads', 'head_detection', 'head_distance_to_a_collectible')
+
     def __init__(self, radius: int = 30, color: str = BLUE, step: int = 40):
         self.x_pos = None
         self.y_pos = None
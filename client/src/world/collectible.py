@@ -15,9 +15,11 @@ class Collectible():
         color (str): The color of the collectible. Defaults to 'GOLD'.
         shape (Disk): The geometric shape of the collectible, represented as a disk.
     """
-    color = GOLD
+    DEFAULT_COLOR = GOLD
 
-    def __init__(self, color: tuple[int, int, int] = GOLD):
+    __slots__ = ('x_pos', 'y_pos', 'color', 'shape')
+
+    def __init__(self, color: tuple[int, int, int] = DEFAULT_COLOR):
         self.x_pos = None
         self.y_pos = None
         self.color = color
@@ -35,5 +37,7 @@ class ExitDoor(Collectible):
         color (str): The color of the exit door. Defaults to 'green'.
     """
 
+    __slots__ = ()
+
     def __init__(self, color: tuple[int, int, int] = GREEN):
         super().__init__(color)
@@ -0,0 +1,68 @@
+import numpy as np
+from .collectible import Collectible, ExitDoor
+
+
+class WorldCore:
+    """
+    Compact array representation of the items a world senses and collides with.
+
+    The x, y positions and radii of the collectibles are stored in NumPy arrays,
+    in the same order as `World.collectibles`, followed by the exit door. The
+    arrays are only rebuilt when an item is added or removed (a few times per
+    episode), so the sensing reads them directly at each step.
+
+    Attributes:
+        items_x (np.ndarray): X position of each collectible, then of the exit door.
+        items_y (np.ndarray): Y position of each collectible, then of the exit door.
+        items_radius (np.ndarray): Radius of each collectible, then of the exit door.
+        nb_collectibles (int): The number of collectibles in the arrays.
+        version (int): Incremented whenever a collectible is added or removed.
+    """
+
+    __slots__ = ('items_x', 'items_y', 'items_radius',
+                 'nb_collectibles', 'version')
+
+    def __init__(self, exit_door: ExitDoor):
+        self.items_x = np.array([exit_door.x_pos], dtype=np.float64)
+        self.items_y = np.array([exit_door.y_pos], dtype=np.float64)
+        self.items_radius = np.array(
+            [exit_door.shape.radius], dtype=np.float64)
+        self.nb_collectibles = 0
+        self.version = 0
+
+    def add_collectible(self, collectible: Collectible) -> None:
+        """
+        Appends a collectible after the ones already stored, before the exit door.
+        """
+        idx = self.nb_collectibles
+        self.items_x = np.insert(self.items_x, idx, collectible.x_pos)
+        self.items_y = np.insert(self.items_y, idx, collectible.y_pos)
+        self.items_radius = np.insert(
+            self.items_radius, idx, collectible.shape.radius)
+        self.nb_collectibles += 1
+        self.version += 1
+
+    def remove_collectible(self, idx: int) -> None:
+        """
+        Removes the collectible at the given index of `World.collectibles`.
+        """
+        if not 0 <= idx < self.nb_collectibles:
+            raise IndexError(f"No collectible at index {idx}")
+        self.items_x = np.delete(self.items_x, idx)
+        self.items_y = np.delete(self.items_y, idx)
+        self.items_radius = np.delete(self.items_radius, idx)
+        self.nb_collectibles -= 1
+        self.version += 1
+
+    def collectibles_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the x, y and radius arrays of the collectibles (views, no copy).
+        """
+        end = self.nb_collectibles
+        return self.items_x[:end], self.items_y[:end], self.items_radius[:end]
+
+    def items_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the x, y and radius arrays of the collectibles followed by the exit door.
+        """
+        return self.items_x, self.items_y, self.items_radius
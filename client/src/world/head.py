@@ -9,11 +9,18 @@ class Head:
     Attributes:
         distance_to_center (int): The distance from the center of the agent to the head.
         angle (int): The angle of the head relative to the agent's forward direction, in degrees.
+        cos (float): Cosine of the head angle, the x component of its unit vector.
+        sin (float): Sine of the head angle, the y component of its unit vector.
+        offset_x (float): X offset of the head from the agent center.
+        offset_y (float): Y offset of the head from the agent center.
 
     Methods:
         get_seen_position(agent_center_pos): Calculates the position of the head based on the agent's center position.
     """
 
+    __slots__ = ('distance_to_center', 'angle', 'color', 'radius', 'intersection_with_circle_pos',
+                 'is_within_surface', 'sensing_color', 'cos', 'sin', 'offset_x', 'offset_y')
+
     def __init__(self, distance_to_center: int, angle: int, color: tuple = BLUE, radius: int = 5):
         """
         Initializes a new instance of the Head class.
@@ -29,6 +36,12 @@ class Head:
         self.intersection_with_circle_pos = (None, None)
         self.is_within_surface = False
         self.sensing_color = PALE_GRAY
+        # the angle and distance of a head never change, its unit vector and offset are computed once
+        angle_rad = math.radians(angle)
+        self.cos = math.cos(angle_rad)
+        self.sin = math.sin(angle_rad)
+        self.offset_x = distance_to_center * self.cos
+        self.offset_y = distance_to_center * self.sin
 
     def get_seen_position(self, agent_center_pos: tuple[int, int]) -> tuple[int, int]:
         """
@@ -42,11 +55,4 @@ class Head:
         """
         x_center_pos, z_center_pos = agent_center_pos
 
-        angle_rad = math.radians(self.angle)
-
-        head_x_pos = x_center_pos + \
-            self.distance_to_center * math.cos(angle_rad)
-        head_y_pos = z_center_pos + \
-            self.distance_to_center * math.sin(angle_rad)
-
-        return (head_x_pos, head_y_pos)
+        return (x_center_pos + self.offset_x, z_center_pos + self.offset_y)
@@ -0,0 +1,266 @@
+import numpy as np
+from .head import Head
+from utils.colors import PALE_GRAY
+from .collectible import Collectible
+from utils.game_states import ON_EXIT_DOOR, ONTO_SURFACE, OUT_OF_BOUNDS, STAR_COLLECTED
+
+
+def square(values):
+    """
+    Squares like the scalar path does: Python's float ** 2 goes through libm pow,
+    which can differ from x * x by one ulp, and so does np.float_power.
+    """
+    return np.float_power(values, 2)
+
+
+class SensingCache:
+    """
+    Memoizes the sensing results of a world during one step.
+
+    Every entry is computed at most once for a given agent position and set of
+    collectibles: the world invalidates the cache when the agent moves or a
+    collectible is removed, and the key guards against any other change. The
+    cached values are shared by every consumer and must not be modified.
+
+    Attributes:
+        hits (int): The lookups served from the cache.
+        misses (int): The lookups that had to compute their value.
+    """
+
+    def __init__(self):
+        self.key = None
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, key: tuple, compute):
+        if key != self.key:
+            self.key = key
+            self.entries = {}
+        if name in self.entries:
+            self.hits += 1
+            return self.entries[name]
+
+        self.misses += 1
+        value = compute()
+        self.entries[name] = value
+        return value
+
+    def invalidate(self) -> None:
+        self.key = None
+        self.entries = {}
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class VectorizedSensing:
+    """
+    Computes what every head of an agent senses in a single NumPy pass.
+
+    This is the array counterpart of `World.evaluate_next_position_status` and
+    `World.get_agent_direction_sensing`: all head positions, ray/surface and
+    ray/circle intersections, distances and statuses are computed as arrays,
+    one row per head. The floating point operations are the same as the scalar
+    path, in the same order, so both return identical features.
+
+    Attributes:
+        heads (list[Head]): The heads of the agent.
+        cos (np.ndarray): Cosine of each head angle.
+        sin (np.ndarray): Sine of each head angle.
+        offset_x (np.ndarray): X offset of each head from the agent center.
+        offset_y (np.ndarray): Y offset of each head from the agent center.
+    """
+
+    # head geometries already computed, shared by every agent having the same heads
+    geometries: dict = {}
+
+    def __init__(self, heads: list[Head]):
+        self.heads = heads
+        self.cos, self.sin, self.offset_x, self.offset_y = self.get_geometry(
+            heads)
+
+    @classmethod
+    def get_geometry(cls, heads: list[Head]) -> tuple:
+        """
+        Returns the ray directions (cos, sin) and the offsets from the agent center
+        of the heads, computed once for all agents whose heads have the same
+        angles and distances to center.
+        """
+        key = tuple((head.angle, head.distance_to_center) for head in heads)
+        if key not in cls.geometries:
+            cls.geometries[key] = tuple(np.array([getattr(head, name) for head in heads])
+                                        for name in ('cos', 'sin', 'offset_x', 'offset_y'))
+        return cls.geometries[key]
+
+    def head_positions(self, agent_center_pos: tuple) -> tuple[np.ndarray, np.ndarray]:
+        x_center_pos, y_center_pos = agent_center_pos
+        return x_center_pos + self.offset_x, y_center_pos + self.offset_y
+
+    def head_geometry(self, world) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the head positions and whether each is within the surface,
+        computed once per step for both the next positions status and the sensing.
+        """
+        def compute():
+            xs, ys = self.head_positions(
+                (world.agent.x_pos, world.agent.y_pos))
+            return xs, ys, self.within_surface(world, xs, ys)
+
+        return world.sensing_cache.get("head_geometry", world.sensing_key(), compute)
+
+    @staticmethod
+    def within_surface(world, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        adjusted_x = xs - world.surface.x_pos
+        adjusted_y = ys - world.surface.y_pos
+        return square(adjusted_x) + square(adjusted_y) <= square(world.surface.shape.radius)
+
+    def evaluate_next_positions_status(self, world) -> np.ndarray:
+        """
+        Evaluates the status of the position each head leads to.
+
+        Returns:
+            np.ndarray: One status per head (OUT_OF_BOUNDS, ONTO_SURFACE, STAR_COLLECTED or ON_EXIT_DOOR).
+        """
+        radius = world.agent.shape.radius
+        xs, ys, within = self.head_geometry(world)
+
+        exit_door = world.exit_door
+        on_exit_door = np.sqrt(square(xs - exit_door.x_pos) + square(ys - exit_door.y_pos)) < \
+            radius + exit_door.shape.radius
+
+        items_x, items_y, items_radius = world.core.collectibles_arrays()
+        on_collectible = (np.sqrt(square(xs[:, None] - items_x) + square(ys[:, None] - items_y)) <
+                          radius + items_radius).any(axis=1)
+
+        return np.where(~within, OUT_OF_BOUNDS,
+                        np.where(on_exit_door, ON_EXIT_DOOR,
+                                 np.where(on_collectible, STAR_COLLECTED, ONTO_SURFACE)))
+
+    def surface_intersections(self, world, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds where the ray of each head, cast from the head position, leaves the surface.
+        """
+        cx, cy = world.surface.x_pos, world.surface.y_pos
+        radius = world.surface.shape.radius
+        dx, dy = self.cos, self.sin
+
+        a = square(dx) + square(dy)
+        b = 2 * (dx * (xs - cx) + dy * (ys - cy))
+        c = square(xs - cx) + square(ys - cy) - square(radius)
+
+        discriminant_sqrt = np.sqrt(np.maximum(square(b) - 4 * a * c, 0))
+        t1 = (-b + discriminant_sqrt) / (2 * a)
+        t2 = (-b - discriminant_sqrt) / (2 * a)
+
+        t = np.where(t1 >= 0, t1, t2)
+
+        return xs + t * dx, ys + t * dy
+
+    @staticmethod
+    def segments_circles_intersections(start_x, start_y, end_x, end_y, items_x, items_y, items_radius):
+        """
+        Intersects every segment (one per row) with every circle (one per column).
+
+        Returns:
+            tuple: The x, y coordinates of the intersection nearest to each segment
+                   start and its distance, inf where a segment misses a circle.
+        """
+        start_x, start_y = start_x[:, None], start_y[:, None]
+        dx = (end_x - start_x[:, 0])[:, None]
+        dy = (end_y - start_y[:, 0])[:, None]
+
+        fx = start_x - items_x
+        fy = start_y - items_y
+
+        a = square(dx) + square(dy)
+        b = 2 * (fx * dx + fy * dy)
+        c = square(fx) + square(fy) - square(items_radius)
+
+        discriminant = square(b) - 4 * a * c
+        has_solution = discriminant >= 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            discriminant_sqrt = np.sqrt(np.where(has_solution, discriminant, 0))
+            t1 = (-b + discriminant_sqrt) / (2 * a)
+            t2 = (-b - discriminant_sqrt) / (2 * a)
+
+        t1_valid = has_solution & (0 <= t1) & (t1 <= 1)
+        t2_valid = has_solution & (0 <= t2) & (t2 <= 1)
+
+        x1, y1 = start_x + t1 * dx, start_y + t1 * dy
+        x2, y2 = start_x + t2 * dx, start_y + t2 * dy
+        squared_distance1 = np.where(
+            t1_valid, square(x1 - start_x) + square(y1 - start_y), np.inf)
+        squared_distance2 = np.where(
+            t2_valid, square(x2 - start_x) + square(y2 - start_y), np.inf)
+
+        # on a tie the first candidate (t1) is kept, as min() does in the scalar path
+        use_first = squared_distance1 <= squared_distance2
+        nearest_x = np.where(use_first, x1, x2)
+        nearest_y = np.where(use_first, y1, y2)
+        distances = np.sqrt(np.minimum(squared_distance1, squared_distance2))
+
+        # degenerated segment (the head lies on the surface border)
+        if (a == 0).any():
+            degenerated = np.broadcast_to(a == 0, distances.shape)
+            start_inside = np.sqrt(square(fx) + square(fy)) <= items_radius
+            distances = np.where(degenerated, np.where(
+                start_inside, 0, np.inf), distances)
+            nearest_x = np.where(degenerated, start_x, nearest_x)
+            nearest_y = np.where(degenerated, start_y, nearest_y)
+
+        return nearest_x, nearest_y, distances
+
+    def get_agent_direction_sensing(self, world) -> tuple[list, list]:
+        """
+        Senses, along the ray of each head, the nearest collectible or exit door
+        before the surface border, and updates the heads drawing attributes.
+
+        Returns:
+            tuple: The detection (0: nothing, 1: collectible, 2: exit door) and the
+                   distance to the detected item of each head.
+        """
+        surface_radius = world.surface.shape.radius
+        xs, ys, within = self.head_geometry(world)
+        border_x, border_y = self.surface_intersections(world, xs, ys)
+
+        items_x, items_y, items_radius = world.core.items_arrays()
+        nearest_x, nearest_y, distances = self.segments_circles_intersections(
+            xs, ys, border_x, border_y, items_x, items_y, items_radius)
+
+        # the scalar path keeps a candidate only if it is nearer than the truncated
+        # distance of the current one, which selects the first item whose truncated
+        # distance equals the truncated minimum distance
+        found = np.isfinite(distances).any(axis=1)
+        truncated_distances = np.floor(distances)
+        min_truncated_distances = truncated_distances.min(axis=1)
+        nearest_items = np.argmax(
+            truncated_distances == min_truncated_distances[:, None], axis=1)
+
+        exit_door_index = world.core.nb_collectibles
+        head_detection = np.where(within & found,
+                                  np.where(nearest_items == exit_door_index, 2, 1), 0)
+        head_distance_to_a_collectible = np.where(within & found, min_truncated_distances,
+                                                  surface_radius * 4).astype(int)
+
+        within, found = within.tolist(), found.tolist()
+        nearest_items = nearest_items.tolist()
+        for idx, head in enumerate(self.heads):
+            head.is_within_surface = within[idx]
+            if not within[idx]:
+                continue
+
+            if found[idx]:
+                item_idx = nearest_items[idx]
+                head.intersection_with_circle_pos = (float(nearest_x[idx, item_idx]),
+                                                     float(nearest_y[idx, item_idx]))
+                head.sensing_color = world.exit_door.color if item_idx == exit_door_index else Collectible.DEFAULT_COLOR
+            else:
+                head.intersection_with_circle_pos = (float(border_x[idx]),
+                                                     float(border_y[idx]))
+                head.sensing_color = PALE_GRAY
+
+        return head_detection.tolist(), head_distance_to_a_collectible.tolist()
+
@@ -0,0 +1,108 @@
+import math
+from .collectible import Collectible
+
+
+class UniformGrid:
+    """
+    Uniform grid index over the collectibles of a world.
+
+    Each collectible is stored in the square cell containing its center. Circle
+    and segment queries only look at the cells that can hold an item touching
+    the query shape, so their cost depends on the local density of items rather
+    than on the total number of collectibles.
+
+    Candidates are returned in insertion order, which is the order of
+    `World.collectibles` (removals keep the relative order), so the callers
+    get the same results, tie-breaks included, as a scan of the list.
+
+    Attributes:
+        cell_size (float): The side of a cell.
+        max_radius (float): The largest radius of an indexed item, the margin of the queries.
+        cells (dict): The items of each non empty cell, by (column, row).
+    """
+
+    __slots__ = ('cell_size', 'max_radius', 'cells', 'order', 'next_order')
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.max_radius = 0
+        self.cells: dict[tuple[int, int], list[Collectible]] = {}
+        self.order: dict[int, int] = {}
+        self.next_order = 0
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def cell_of(self, x: float, y: float) -> tuple[int, int]:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, item: Collectible) -> None:
+        self.cells.setdefault(self.cell_of(
+            item.x_pos, item.y_pos), []).append(item)
+        self.order[id(item)] = self.next_order
+        self.next_order += 1
+        self.max_radius = max(self.max_radius, item.shape.radius)
+
+    def remove(self, item: Collectible) -> None:
+        cell = self.cell_of(item.x_pos, item.y_pos)
+        items = self.cells.get(cell, [])
+        for idx, cell_item in enumerate(items):
+            if cell_item is item:
+                del items[idx]
+                break
+        else:
+            raise ValueError("The specified item is not in the index.")
+
+        if not items:
+            del self.cells[cell]
+        del self.order[id(item)]
+
+    def sorted_items(self, cells) -> list[Collectible]:
+        items = [item for cell in cells for item in self.cells.get(cell, ())]
+        items.sort(key=lambda item: self.order[id(item)])
+        return items
+
+    def cells_around(self, x: float, y: float, half_width: float, cells: set) -> None:
+        """
+        Adds to `cells` every cell overlapping the square of the given half width centered on (x, y).
+        """
+        min_col, min_row = self.cell_of(x - half_width, y - half_width)
+        max_col, max_row = self.cell_of(x + half_width, y + half_width)
+        for col in range(min_col, max_col + 1):
+            for row in range(min_row, max_row + 1):
+                if (col, row) in self.cells:
+                    cells.add((col, row))
+
+    def query_circle(self, position: tuple, radius: float) -> list[Collectible]:
+        """
+        Returns the items that may overlap the circle, a superset of the colliding ones.
+        """
+        cells = set()
+        if self.cells:
+            self.cells_around(position[0], position[1],
+                              radius + self.max_radius, cells)
+        return self.sorted_items(cells)
+
+    def query_segment(self, starting_point: tuple, ending_point: tuple) -> list[Collectible]:
+        """
+        Returns the items that may intersect the segment, a superset of the intersected ones.
+
+        The segment is sampled every `cell_size`: any point of the segment is within
+        half a cell of a sample, so an item touching the segment has its center
+        within `max_radius + cell_size / 2` of a sample.
+        """
+        cells = set()
+        if not self.cells:
+            return []
+
+        x0, y0 = starting_point
+        dx, dy = ending_point[0] - x0, ending_point[1] - y0
+        nb_samples = max(1, math.ceil(
+            math.hypot(dx, dy) / self.cell_size))
+        half_width = self.max_radius + self.cell_size / 2
+
+        for idx in range(nb_samples + 1):
+            t = idx / nb_samples
+            self.cells_around(x0 + t * dx, y0 + t * dy, half_width, cells)
+
+        return self.sorted_items(cells)
@@ -15,6 +15,8 @@ class Shape(ABC):
         color (str): The color of the shape.
     """
 
+    __slots__ = ('color',)
+
     def __init__(self, color: tuple[int, int, int] = GRAY):
         self.color = color
 
@@ -51,6 +53,8 @@ class Disk(Shape):
         radius (float): The radius of the disk.
     """
 
+    __slots__ = ('radius',)
+
     def __init__(self, radius: int, color: tuple[int, int, int] = GRAY):
         super().__init__(color)
         self.radius = radius
@@ -75,6 +79,8 @@ class Surface:
         shape (Shape): The geometric shape defining the surface.
     """
 
+    __slots__ = ('shape', 'x_pos', 'y_pos')
+
     def __init__(self, shape: Shape = Disk(250), x_pos: int = 400, y_pos: int = 400):
         self.shape = shape
         self.x_pos = x_pos
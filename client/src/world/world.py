@@ -1,14 +1,24 @@
 import math
 from typing import Optional
 from .head import Head
+from .core import WorldCore
 from .agent import Agent
 from .surface import Surface
+from .sensing import SensingCache, VectorizedSensing
+from .spatial_index import UniformGrid
+from settings import PLACEMENT_MAX_ATTEMPTS, SPATIAL_INDEX_CELL_SIZE, SPATIAL_INDEX_MIN_COLLECTIBLES, VECTORIZED_SENSING
 from utils.common import distance
 from utils.colors import PALE_GRAY
 from .collectible import Collectible, ExitDoor
 from utils.game_states import ON_EXIT_DOOR, ONTO_SURFACE, OUT_OF_BOUNDS, STAR_COLLECTED
 
 
+class WorldFullError(Exception):
+    """
+    Raised when no free position can be found for a new element of the world.
+    """
+
+
 class World:
     """
     Represents the game world in a simulation environment.
@@ -17,8 +27,13 @@ class World:
     It provides methods to handle movements and interactions within the world, check for collisions, and draw the game state.
     """
 
-    def __init__(self, surface: Surface = Surface(), num_collectibles=4):
+    def __init__(self, surface: Surface = Surface(), num_collectibles=4, vectorized_sensing: bool = VECTORIZED_SENSING):
         self.surface: Surface = surface
+        self.vectorized_sensing = vectorized_sensing
+        self.sensing: Optional[VectorizedSensing] = None
+        self.sensing_cache = SensingCache()
+        self.core: Optional[WorldCore] = None
+        self.index = UniformGrid(SPATIAL_INDEX_CELL_SIZE)
         self.collectibles: list[Collectible] = []
         self.exit_door: ExitDoor = self.set_exit_door()
         self.agent: Optional[Agent] = self.set_agent()
@@ -46,30 +61,36 @@ class World:
         Returns:
             bool: True if there is a collision, False otherwise.
         """
-        for collectible in self.collectibles:
-            if distance(position, (collectible.x_pos, collectible.y_pos)) < radius + collectible.shape.radius:
-                return True
+        if self.is_collision_with_collectibles(position, radius):
+            return True
 
         if hasattr(self, 'exit_door') and isinstance(self.exit_door, ExitDoor):
             if distance(position, (self.exit_door.x_pos, self.exit_door.y_pos)) < radius + self.exit_door.shape.radius:
                 return True
         return False
 
-    def get_free_random_position(self, radius: int) -> tuple[int, int]:
+    def get_free_random_position(self, radius: int, max_attempts: int = PLACEMENT_MAX_ATTEMPTS) -> tuple[int, int]:
         """
         Finds a random position in the world that is not in collision with any game element.
 
         Args:
             radius (float): The radius to use for collision detection.
+            max_attempts (int): The number of random positions tried.
 
         Returns:
             tuple: A free random position (x, y) in the world.
+
+        Raises:
+            WorldFullError: If none of the tried positions is free.
         """
-        while True:
+        for _ in range(max_attempts):
             random_pos = self.surface.get_random_position()
             if not self.is_collision(random_pos, radius):
                 return random_pos
 
+        raise WorldFullError(
+            f"No free position of radius {radius} found in {max_attempts} attempts, the surface is full")
+
     def set_collectible(self, collectible: Collectible, x: int = None, y: int = None):
         """
         Places a collectible in the world at a specified position.
@@ -82,6 +103,8 @@ class World:
         collectible.x_pos = x
         collectible.y_pos = y
         self.collectibles.append(collectible)
+        self.core.add_collectible(collectible)
+        self.index.insert(collectible)
 
     def remove_collectible(self, collectible: Collectible):
         """
@@ -110,6 +133,8 @@ class World:
         exit_door.x_pos = exit_door_x
         exit_door.y_pos = exit_door_z
         self.exit_door = exit_door
+        self.core = WorldCore(exit_door)
+        self.sensing_cache.invalidate()
         return ExitDoor
 
     def set_agent(self) -> None:
@@ -125,10 +150,19 @@ class World:
         (x, y) = self.get_free_random_position(self.agent.shape.radius)
         self.agent.x_pos = x
         self.agent.y_pos = y
+        self.sensing = VectorizedSensing(self.agent.heads)
+        self.sensing_cache.invalidate()
         return self.agent
 
     def move_agent(self, action: int) -> None:
         self.agent.move(action)
+        self.sensing_cache.invalidate()
+
+    def sensing_key(self) -> tuple:
+        """
+        Identifies what the sensing depends on: the agent position and the collectibles.
+        """
+        return (self.agent.x_pos, self.agent.y_pos, self.core.version)
 
     def handle_collisions(self, agent_status: int, action: int):
         if agent_status in [STAR_COLLECTED, ON_EXIT_DOOR]:
@@ -145,9 +179,12 @@ class World:
         """
         Handles logic when the agent collides with a collectible.
         """
-        for collectible in self.collectibles:
+        for idx, collectible in enumerate(self.collectibles):
             if id(collectible) == id(collision):
-                self.collectibles.remove(collectible)
+                del self.collectibles[idx]
+                self.core.remove_collectible(idx)
+                self.index.remove(collectible)
+                self.sensing_cache.invalidate()
                 break
 
     def find_collisions_at_next_position(self, agent: Agent) -> list:
@@ -170,7 +207,7 @@ class World:
             current_head_collisions = []
 
             # Check collision with collectibles
-            for collectible in self.collectibles:
+            for collectible in self.collectibles_near_circle(position, radius):
                 if distance(position, (collectible.x_pos, collectible.y_pos)) < radius + collectible.shape.radius:
                     current_head_collisions.append(collectible)
 
@@ -229,6 +266,20 @@ class World:
         else:
             return OUT_OF_BOUNDS
 
+    def evaluate_next_positions_status(self) -> list[int]:
+        """
+        Evaluates the status of the next position of the agent for every head (action).
+
+        Returns:
+            list: One status per head, as returned by `evaluate_next_position_status`.
+        """
+        def compute():
+            if self.vectorized_sensing:
+                return self.sensing.evaluate_next_positions_status(self).tolist()
+            return [self.evaluate_next_position_status(idx) for idx in range(len(self.agent.heads))]
+
+        return self.sensing_cache.get("next_positions_status", self.sensing_key(), compute)
+
     def is_within_surface(self, position: tuple[int, int]) -> bool:
         """
         Checks if a given position is within the bounds of the world's surface.
@@ -243,6 +294,14 @@ class World:
         return self.surface.is_inside(x, y)
 
     def get_agent_direction_sensing(self):
+        def compute():
+            if self.vectorized_sensing:
+                return self.sensing.get_agent_direction_sensing(self)
+            return self.get_agent_direction_sensing_scalar()
+
+        return self.sensing_cache.get("direction_sensing", self.sensing_key(), compute)
+
+    def get_agent_direction_sensing_scalar(self):
         head_detection = []
         head_distance_to_a_collectible = []
 
@@ -274,7 +333,7 @@ class World:
                         head.sensing_color = self.exit_door.color
                     else:
                         head_detection.append(1)  # basic collectible
-                        head.sensing_color = Collectible.color
+                        head.sensing_color = Collectible.DEFAULT_COLOR
 
                     head_distance_to_a_collectible.append(
                         distance_to_collectible)
@@ -312,12 +371,32 @@ class World:
 
             return intersection_point
 
+    def collectibles_near_circle(self, position: tuple, radius: float) -> list[Collectible]:
+        """
+        Returns the collectibles that may touch a circle, in the order of `collectibles`.
+
+        Below SPATIAL_INDEX_MIN_COLLECTIBLES collectibles, scanning them all is
+        cheaper than looking up the cells of the grid.
+        """
+        if len(self.collectibles) < SPATIAL_INDEX_MIN_COLLECTIBLES:
+            return self.collectibles
+        return self.index.query_circle(position, radius)
+
+    def collectibles_near_segment(self, starting_point: tuple, ending_point: tuple) -> list[Collectible]:
+        """
+        Returns the collectibles that may touch a segment, in the order of `collectibles`.
+        """
+        if len(self.collectibles) < SPATIAL_INDEX_MIN_COLLECTIBLES:
+            return self.collectibles
+        return self.index.query_segment(starting_point, ending_point)
+
     def find_nearest_intersection(self, starting_point, ending_point):
         nearest_collectible = None
         nearest_intersection_point = None
         min_distance = float('inf')
 
-        collectibles_and_exit_door = self.collectibles + [self.exit_door]
+        collectibles_and_exit_door = self.collectibles_near_segment(
+            starting_point, ending_point) + [self.exit_door]
 
         for item in collectibles_and_exit_door:
             collectible_pos, collectible_radius = (item.x_pos,
@@ -393,7 +472,7 @@ class World:
         Returns:
             bool: True if a collision with a collectible is detected, False otherwise.
         """
-        for collectible in self.collectibles:
+        for collectible in self.collectibles_near_circle(position, radius):
             if distance(position, (collectible.x_pos, collectible.y_pos)) < radius + collectible.shape.radius:
                 return True
         return False
@@ -0,0 +1,158 @@
+import logging
+import queue
+import time
+from collections import deque
+from threading import Event, Lock, Thread
+import numpy as np
+from .agent_manager import DQNAgentManager
+from ..settings import MICRO_BATCH_MAX_SIZE, MICRO_BATCH_WINDOW
+
+app_logger = logging.getLogger('app_logger')
+
+
+class PendingAction:
+    """
+    A single-state action request waiting to be served by the micro-batcher.
+    """
+
+    def __init__(self, state, epsilon: float):
+        self.state = state
+        self.epsilon = epsilon
+        self.enqueued_at = time.perf_counter()
+        self.served = Event()
+        self.action = None
+        self.error = None
+
+
+class ActionBatchingMetrics:
+    """
+    Thread-safe statistics about the batches served by the micro-batcher.
+
+    Batch sizes and queue latencies (time between a request being enqueued and
+    its action being ready) are kept for the most recent requests.
+    """
+
+    def __init__(self, window: int = 10000):
+        self.lock = Lock()
+        self.nb_batches = 0
+        self.nb_requests = 0
+        self.batch_sizes = deque(maxlen=window)
+        self.queue_latencies = deque(maxlen=window)
+
+    def record(self, batch_size: int, queue_latencies: list) -> None:
+        with self.lock:
+            self.nb_batches += 1
+            self.nb_requests += batch_size
+            self.batch_sizes.append(batch_size)
+            self.queue_latencies.extend(queue_latencies)
+
+    def summary(self) -> dict:
+        with self.lock:
+            batch_sizes = np.array(self.batch_sizes)
+            latencies_ms = np.array(self.queue_latencies) * 1000
+            nb_batches, nb_requests = self.nb_batches, self.nb_requests
+
+        summary = {"batches": nb_batches, "requests": nb_requests}
+        if len(batch_sizes):
+            summary["batch_size_mean"] = float(batch_sizes.mean())
+            summary["batch_size_max"] = int(batch_sizes.max())
+            for percentile in (50, 95, 99):
+                summary[f"queue_latency_p{percentile}_ms"] = float(
+                    np.percentile(latencies_ms, percentile))
+        return summary
+
+
+class ActionMicroBatcher:
+    """
+    Merges concurrent single-state training action requests into one model call.
+
+    Each request is queued and its handler thread waits. A worker thread takes
+    the first queued request and the ones already queued behind it. It only
+    waits for more requests while the batch is smaller than the number of
+    active clients (estimated after each batch as its size plus the requests
+    queued while it was served), for at most the batching window. Then it
+    chooses all the actions with a single forward pass and wakes every waiting
+    handler. A single client is therefore served without waiting.
+
+    Attributes:
+        window (float): The maximum time, in seconds, a request waits for others.
+        max_batch_size (int): The maximum number of states per model call.
+        active_clients (int): The estimated number of clients requesting actions.
+    """
+
+    def __init__(self, agent_manager: DQNAgentManager, window: float = MICRO_BATCH_WINDOW,
+                 max_batch_size: int = MICRO_BATCH_MAX_SIZE):
+        self.agent_manager = agent_manager
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.active_clients = 1
+        self.pending = queue.Queue()
+        self.metrics = ActionBatchingMetrics()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def choose_action_for_training(self, state, epsilon: float) -> int:
+        request = PendingAction(state, epsilon)
+        self.pending.put(request)
+        request.served.wait()
+
+        if request.error is not None:
+            raise request.error
+        return request.action
+
+    def stop(self):
+        self.pending.put(None)
+
+    def collect_batch(self) -> list:
+        first_request = self.pending.get()
+        if first_request is None:
+            return None
+        batch = [first_request]
+        # counted from now: the first request may have waited for the previous batch
+        deadline = time.perf_counter() + self.window
+
+        while len(batch) < self.max_batch_size:
+            try:
+                request = self.pending.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.perf_counter()
+                if len(batch) >= self.active_clients or remaining <= 0:
+                    break
+                try:
+                    request = self.pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if request is None:
+                # stopped: the batch is served first
+                self.pending.put(None)
+                break
+            batch.append(request)
+
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.collect_batch()
+            if batch is None:
+                break
+
+            try:
+                actions = self.agent_manager.agent.choose_actions_for_training(
+                    [request.state for request in batch],
+                    [request.epsilon for request in batch])
+                for request, action in zip(batch, actions):
+                    request.action = action
+            except Exception as error:
+                app_logger.error(f'Batched action selection failed: {error}')
+                for request in batch:
+                    request.error = error
+
+            served_at = time.perf_counter()
+            self.metrics.record(
+                len(batch), [served_at - request.enqueued_at for request in batch])
+
+            for request in batch:
+                request.served.set()
+            # the clients just served step their world meanwhile, the other ones already wait
+            self.active_clients = min(
+                len(batch) + self.pending.qsize(), self.max_batch_size)
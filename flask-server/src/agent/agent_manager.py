@@ -1,12 +1,26 @@
 import queue
 import sys
 from .dqn_agent import DQNAgent
+from .experience_stream import ExperienceStreamManager
+from .replay_ratio import ReplayRatioScheduler
+from ..settings import PRIORITIZED_REPLAY, UPDATE_QUEUE_MAX_SIZE
+from ..utils.game_states import COLLECTION_PROGRESS_INDEX, ON_EXIT_DOOR, OUT_OF_BOUNDS
+
+
+class UpdateQueueFull(Exception):
+    """
+    Raised when an episode should be queued for the learner but the update queue is full.
+    """
 
 
 class DQNAgentManager:
-    def __init__(self):
-        self.agent = DQNAgent()
-        self.update_queue = queue.Queue()
+    def __init__(self, replay_memory: bool = True):
+        self.replay_memory = replay_memory
+        self.agent = DQNAgent(replay_memory=replay_memory)
+        self.agent.warm_up()
+        self.update_queue = queue.Queue(maxsize=UPDATE_QUEUE_MAX_SIZE)
+        self.experience_streams = ExperienceStreamManager()
+        self.scheduler = ReplayRatioScheduler()
 
         # fail/success episodes proportion control
         self.target_prop = 0.75
@@ -14,23 +28,114 @@ class DQNAgentManager:
         self.nb_suceeded_ep_count = 1  # to avoid 0 division
 
     def reset_agent(self, modelname: str):
-        self.agent = DQNAgent()
-        self.update_queue = queue.Queue()
+        # the agent is reset in place: its model stays built and warmed up
+        self.agent.reset()
+        self.update_queue = queue.Queue(maxsize=UPDATE_QUEUE_MAX_SIZE)
+        self.experience_streams = ExperienceStreamManager()
+        self.scheduler = ReplayRatioScheduler()
         self.agent.modelname = modelname
         self.nb_failed_ep_count = 0
         self.nb_suceeded_ep_count = 1
 
     def update_agent(self, experiences):
+        """
+        Ingests an episode, then performs the gradient steps it earned.
+        """
+        self.ingest(experiences)
+        while self.scheduler.pending_updates:
+            self.train_step()
+
+    def ingest(self, experiences):
         for experience in experiences:
             self.agent.buffer.add(experience)
+        self.scheduler.record_insertion(len(experiences))
+
+    def train_step(self) -> bool:
+        """
+        Performs one owed gradient step.
+
+        Returns:
+            bool: False if the replay memory is still too small to sample a batch,
+                  in which case the owed steps are dropped.
+        """
+        if len(self.agent.buffer) < self.agent.batch_size:
+            self.scheduler.drop_pending_updates()
+            return False
         self.agent.update_policy()
+        self.scheduler.record_update(self.agent.batch_size)
+        return True
 
-    def update_experience_replay(self, experiences: list, episode_failed: bool, force_update: bool = False):
-        if episode_failed:
+    @staticmethod
+    def evaluate_episode(experiences: list) -> tuple[list, bool, bool]:
+        """
+        Cuts an episode after its first terminal experience and tells how it ended.
+
+        Args:
+            experiences (list): (state, action, reward, next_state, done, total_reward)
+                                tuples, with flat states.
+
+        Returns:
+            tuple: The kept experiences, whether the episode failed, and whether it
+                   must be kept whatever the fail/success proportion (exit door
+                   reached with every star collected).
+        """
+        kept_experiences = []
+        episode_failed = True
+        force_update = False
+        for experience in experiences:
+            state, _, _, next_state, done, _ = experience
+            kept_experiences.append(experience)
+
+            if done and next_state[ON_EXIT_DOOR] == 1.0:
+                episode_failed = False
+                force_update = state[COLLECTION_PROGRESS_INDEX] == 1
+                break
+            elif done and next_state[OUT_OF_BOUNDS] == 1.0:
+                episode_failed = True
+                break
+
+        return kept_experiences, episode_failed, force_update
+
+    def capacity(self) -> int:
+        """
+        Returns the number of episodes the update queue can still take.
+        """
+        return max(self.update_queue.maxsize - self.update_queue.qsize(), 0)
+
+    def commit_episode(self, experiences: list, block: bool = False) -> None:
+        """
+        Evaluates a finished episode and queues it under the fail/success balancing rule.
+
+        Raises:
+            UpdateQueueFull: If the episode is kept but the update queue is full,
+                             unless `block` is set, in which case it waits for a free slot.
+        """
+        experiences, episode_failed, force_update = self.evaluate_episode(
+            experiences)
+        self.update_experience_replay(
+            experiences, episode_failed, force_update, block)
+
+    def update_experience_replay(self, experiences: list, episode_failed: bool, force_update: bool = False,
+                                 block: bool = False):
+        if PRIORITIZED_REPLAY:
+            # every transition is kept, the sampling priorities do the balancing
+            self.queue_episode(experiences, episode_failed, block)
+        elif episode_failed:
             if self.nb_failed_ep_count/self.nb_suceeded_ep_count <= self.target_prop or force_update:
-                self.nb_failed_ep_count += 1
-                self.update_queue.put(experiences)
+                self.queue_episode(experiences, episode_failed, block)
         else:  # success
             if self.nb_failed_ep_count/self.nb_suceeded_ep_count >= self.target_prop or force_update:
-                self.nb_suceeded_ep_count += 1
-                self.update_queue.put(experiences)
+                self.queue_episode(experiences, episode_failed, block)
+
+    def queue_episode(self, experiences: list, episode_failed: bool, block: bool):
+        # a refused episode must not count in the fail/success proportion
+        try:
+            self.update_queue.put(experiences, block=block)
+        except queue.Full:
+            raise UpdateQueueFull(
+                f"The update queue is full ({self.update_queue.maxsize} episodes)") from None
+
+        if episode_failed:
+            self.nb_failed_ep_count += 1
+        else:
+            self.nb_suceeded_ep_count += 1
@@ -1,36 +1,202 @@
 import logging
 import os
 import random
+import time
+import numpy as np
 import tensorflow as tf
 from ..utils.game_states import DOWN_LEFT, DOWN_RIGHT, UP, RIGHT, DOWN, LEFT, UP_LEFT, UP_RIGHT
-from ..settings import ACTION_POSSIBILITIES, BATCH_SIZE, BUFFER_MAX_LEN, DISCOUNT_FACTOR, \
-    LEARNING_RATE, MODELS_PATH, STATE_SIZE
+from ..settings import ACTION_POSSIBILITIES, ARRAY_REPLAY_BUFFER, BATCH_SIZE, BATCHED_UPDATE, BUFFER_MAX_LEN, \
+    COMPILE_TF_FUNCTIONS, DISCOUNT_FACTOR, DOUBLE_DQN, LEARNING_RATE, MODELS_PATH, PER_ALPHA, PER_BETA, \
+    PER_BETA_INCREMENT, PER_EPSILON, PRIORITIZED_REPLAY, STATE_SIZE, TARGET_NETWORK, TARGET_TAU, TARGET_UPDATE, \
+    TARGET_UPDATE_PERIOD, XLA_JIT_COMPILE
 
-from ..utils.replay_buffer import ReplayBuffer
+from ..utils.replay_buffer import ArrayReplayBuffer, PrioritizedReplayBuffer, ReplayBuffer
 from .dqn_network import DQNNetwork
 from ..utils.common import flatten_list
 
 app_logger = logging.getLogger('app_logger')
 
+HARD = "HARD"
+SOFT = "SOFT"
+
 
 class DQNAgent:
 
-    def __init__(self, state_size: int = STATE_SIZE, action_size: int = ACTION_POSSIBILITIES):
+    def __init__(self, state_size: int = STATE_SIZE, action_size: int = ACTION_POSSIBILITIES,
+                 replay_memory: bool = True, target_network: bool = TARGET_NETWORK,
+                 target_update: str = TARGET_UPDATE, target_update_period: int = TARGET_UPDATE_PERIOD,
+                 target_tau: float = TARGET_TAU, double_dqn: bool = DOUBLE_DQN):
         self.models_saving_path = MODELS_PATH
         self.modelname = None
+        self.state_size = state_size
         self.action_size = action_size
         self.model = DQNNetwork(state_size, action_size)
-        self.buffer = ReplayBuffer(buffer_size=BUFFER_MAX_LEN)
+        # an agent only serving actions (the learner being another process) has no replay memory
+        self.buffer = self.create_buffer() if replay_memory else None
         self.optimizer = tf.keras.optimizers.legacy.Adam(
             learning_rate=LEARNING_RATE)
         self.batch_size = BATCH_SIZE
+        self.batched_update = BATCHED_UPDATE
         self.gamma = DISCOUNT_FACTOR
 
+        # bootstrapping
+        if target_update not in (HARD, SOFT):
+            raise ValueError("Target update must be 'HARD' or 'SOFT'")
+        self.double_dqn = double_dqn
+        self.target_model = DQNNetwork(
+            state_size, action_size) if target_network or double_dqn else None
+        self.target_update = target_update
+        self.target_update_period = target_update_period
+        self.target_tau = target_tau
+        self.nb_updates = 0
+        # weights and optimizer state before any training, saved by warm_up
+        self.initial_model_weights = None
+        self.initial_optimizer_weights = None
+
         # logging metrics
         self.current_loss = 0
         self.current_grad_norm = 0
         self.current_reward = 0
 
+        self.compile_functions()
+
+    def create_buffer(self):
+        if PRIORITIZED_REPLAY:
+            buffer = PrioritizedReplayBuffer(buffer_size=BUFFER_MAX_LEN, state_size=self.state_size,
+                                             alpha=PER_ALPHA, beta=PER_BETA,
+                                             beta_increment=PER_BETA_INCREMENT, epsilon=PER_EPSILON)
+        elif ARRAY_REPLAY_BUFFER:
+            buffer = ArrayReplayBuffer(
+                buffer_size=BUFFER_MAX_LEN, state_size=self.state_size)
+        else:
+            return ReplayBuffer(buffer_size=BUFFER_MAX_LEN)
+
+        app_logger.info(
+            f'Replay buffer allocated: {buffer.nbytes} bytes ({buffer.nbytes / 1e6:.1f} MB)')
+        return buffer
+
+    def compile_functions(self, compile_tf_functions: bool = COMPILE_TF_FUNCTIONS, jit_compile: bool = XLA_JIT_COMPILE):
+        """
+        Builds the functions used for action selection and training.
+
+        With graph compilation enabled, each function is wrapped in a tf.function
+        with a fixed input signature (variable batch size) so it is traced only once.
+        """
+        state_spec = tf.TensorSpec(
+            shape=(None, self.state_size), dtype=tf.float32)
+        action_spec = tf.TensorSpec(shape=(None,), dtype=tf.int32)
+        target_spec = tf.TensorSpec(shape=(None,), dtype=tf.float32)
+        weight_spec = tf.TensorSpec(shape=(None,), dtype=tf.float32)
+
+        tau_spec = tf.TensorSpec(shape=(), dtype=tf.float32)
+
+        if compile_tf_functions:
+            self.greedy_actions_fn = tf.function(
+                self._greedy_actions, input_signature=[state_spec], jit_compile=jit_compile)
+            self.max_q_values_fn = tf.function(
+                self._max_q_values, input_signature=[state_spec], jit_compile=jit_compile)
+            self.bootstrap_values_fn = tf.function(
+                self._bootstrap_values, input_signature=[state_spec], jit_compile=jit_compile)
+            self.train_step_fn = tf.function(
+                self._train_step, input_signature=[state_spec, action_spec, target_spec, weight_spec],
+                jit_compile=jit_compile)
+            self.batched_update_fn = tf.function(
+                self._batched_update,
+                input_signature=[state_spec, action_spec, target_spec, state_spec, target_spec, target_spec,
+                                 weight_spec],
+                jit_compile=jit_compile)
+            self.sync_target_fn = tf.function(
+                self._sync_target, input_signature=[tau_spec], jit_compile=jit_compile)
+        else:
+            self.greedy_actions_fn = self._greedy_actions
+            self.max_q_values_fn = self._max_q_values
+            self.bootstrap_values_fn = self._bootstrap_values
+            self.train_step_fn = self._train_step
+            self.batched_update_fn = self._batched_update
+            self.sync_target_fn = self._sync_target
+
+    def warm_up(self) -> dict:
+        """
+        Runs every action selection and training function twice on dummy inputs,
+        so tracing and compilation happen now rather than on the first requests.
+
+        The weights and optimizer state are restored afterwards.
+
+        Returns:
+            dict: First call (trace + compile) and second call durations in seconds.
+        """
+        dummy_states = tf.zeros((self.batch_size, self.state_size), dtype=tf.float32)
+        dummy_actions = tf.zeros((self.batch_size,), dtype=tf.int32)
+        dummy_targets = tf.zeros((self.batch_size,), dtype=tf.float32)
+        dummy_weights = tf.ones((self.batch_size,), dtype=tf.float32)
+
+        # creates the model and optimizer variables before saving them
+        self.model(dummy_states[:1])
+        if self.target_model is not None:
+            self.target_model(dummy_states[:1])
+        self.optimizer.apply_gradients(
+            (tf.zeros_like(var), var) for var in self.model.trainable_variables)
+        model_weights = self.model.get_weights()
+        optimizer_weights = [var.numpy() for var in self.optimizer.variables()]
+        self.initial_model_weights = model_weights
+        self.initial_optimizer_weights = optimizer_weights
+
+        timings = {}
+        calls = {
+            "greedy_actions": lambda: self.greedy_actions_fn(dummy_states[:1]),
+            "max_q_values": lambda: self.max_q_values_fn(dummy_states),
+            "bootstrap_values": lambda: self.bootstrap_values_fn(dummy_states),
+            "train_step": lambda: self.train_step_fn(dummy_states, dummy_actions, dummy_targets, dummy_weights),
+            "batched_update": lambda: self.batched_update_fn(dummy_states, dummy_actions, dummy_targets,
+                                                             dummy_states, dummy_targets, dummy_targets,
+                                                             dummy_weights),
+        }
+        if self.target_model is not None:
+            calls["sync_target"] = lambda: self.sync_target_fn(
+                tf.constant(self.target_tau))
+        for name, call in calls.items():
+            start = time.perf_counter()
+            call()
+            compile_duration = time.perf_counter() - start
+
+            start = time.perf_counter()
+            call()
+            warm_duration = time.perf_counter() - start
+
+            timings[name] = {"compile": compile_duration,
+                             "warm": warm_duration}
+            app_logger.info(
+                f'Warm-up {name}: first call {compile_duration:.3f}s, warm call {warm_duration * 1000:.2f}ms')
+
+        self.restore_initial_weights()
+        return timings
+
+    def restore_initial_weights(self) -> None:
+        self.model.set_weights(self.initial_model_weights)
+        for var, value in zip(self.optimizer.variables(), self.initial_optimizer_weights):
+            var.assign(value)
+        if self.target_model is not None:
+            self.sync_target_fn(tf.constant(1.0))
+
+    def reset(self) -> None:
+        """
+        Brings a warmed up agent back to its state before any training, for a new
+        training: initial weights and optimizer state, empty replay memory.
+
+        The model and its compiled functions are kept, so nothing is traced again.
+        """
+        self.restore_initial_weights()
+        if self.buffer is not None:
+            self.buffer = self.create_buffer()
+        self.nb_updates = 0
+        self.current_loss = 0
+        self.current_grad_norm = 0
+        self.current_reward = 0
+        self.modelname = None
+        # the trained model loaded for the tests may have been saved again since
+        if hasattr(self, '_loaded_model'):
+            del self._loaded_model, self._loaded_model_greedy_actions_fn
+
     def get_model_path(self, modelname):
 
         if not os.path.exists(self.models_saving_path):
@@ -53,72 +219,242 @@ class DQNAgent:
                    DOWN, DOWN_LEFT, LEFT, UP_LEFT]
         return random.choice(actions)
 
-    def choose_action_with_model(self, state, modelname):
+    def load_trained_model(self, modelname):
         if not hasattr(self, '_loaded_model'):
             model_path = self.get_model_path(modelname)
             if os.path.exists(model_path):
                 self._loaded_model = tf.keras.models.load_model(model_path)
+                self._loaded_model_greedy_actions_fn = tf.function(
+                    lambda states: tf.argmax(
+                        self._loaded_model(states), axis=1, output_type=tf.int32),
+                    input_signature=[tf.TensorSpec(shape=(None, self.state_size), dtype=tf.float32)])
             else:
                 raise FileNotFoundError('Model not found')
 
-        flattened_state = flatten_list(state)
+    def choose_action_with_model(self, state, modelname):
+        self.load_trained_model(modelname)
 
-        state_tensor = tf.convert_to_tensor(
-            [flattened_state], dtype=tf.float32)
-        q_values = self._loaded_model(state_tensor)[0]
-        action = int(tf.argmax(q_values).numpy())
+        state_tensor = tf.convert_to_tensor(stack_states([state]))
+        action = int(self._loaded_model_greedy_actions_fn(state_tensor)[0])
         return action
 
-    def choose_action_for_training(self, state: list, epsilon: float) -> int:
-        flattened_state = flatten_list(state)
+    def choose_actions_with_model(self, states: list, modelname) -> list:
+        """
+        Chooses the greedy action of the trained model for several states in one forward pass.
+        """
+        self.load_trained_model(modelname)
+
+        actions = self._loaded_model_greedy_actions_fn(
+            tf.convert_to_tensor(stack_states(states)))
+        return actions.numpy().tolist()
 
+    def choose_action_for_training(self, state: list, epsilon: float) -> int:
         if random.random() < epsilon:
             return random.randint(0, self.action_size - 1)
         else:
-            state_tensor = tf.convert_to_tensor(
-                [flattened_state], dtype=tf.float32)
-            q_values = self.model(state_tensor)[0]
+            state_tensor = tf.convert_to_tensor(stack_states([state]))
 
-            action = int(tf.argmax(q_values).numpy())
+            action = int(self.greedy_actions_fn(state_tensor)[0])
 
             return action
 
+    def choose_actions_for_training(self, states: list, epsilons) -> list:
+        """
+        Epsilon-greedy action selection for several states, with a single forward
+        pass for all of them.
+
+        Args:
+            states (list): Nested or flat states.
+            epsilons (float | list): One exploration rate, or one per state.
+
+        Returns:
+            list: The chosen action for each state.
+        """
+        greedy_actions = self.greedy_actions_fn(
+            tf.convert_to_tensor(stack_states(states))).numpy()
+
+        explore = np.random.random(len(greedy_actions)) < np.asarray(epsilons)
+        random_actions = np.random.randint(
+            0, self.action_size, size=len(greedy_actions))
+
+        return np.where(explore, random_actions, greedy_actions).tolist()
+
     def update_policy(self):
         if len(self.buffer) >= self.batch_size:
+            if self.batched_update:
+                self.update_policy_batched()
+            else:
+                self.update_policy_per_sample()
+
+    def update_policy_batched(self):
+        """
+        Performs a single gradient step over a whole minibatch.
+
+        Every bootstrap target is computed with one forward pass over the
+        stacked next states (of the model, or of the target network when there
+        is one), in the same compiled call as the gradient step, and the loss
+        is the mean squared error over the batch. With a prioritized buffer, the squared errors are weighted
+        by the importance-sampling weights and the TD errors become the new
+        priorities of the sampled experiences.
+        """
+        prioritized = isinstance(self.buffer, PrioritizedReplayBuffer)
+
+        if prioritized:
+            batch, indices, weights = self.buffer.sample_prioritized_batch(
+                self.batch_size)
+        else:
+            batch = self.buffer.sample_batch(self.batch_size)
+            weights = np.ones(self.batch_size, dtype=np.float32)
+        (states, actions, rewards, next_states, dones, total_rewards) = batch
+
+        loss, grad_norm, td_errors = self.batched_update_fn(
+            *[tf.convert_to_tensor(array) for array in
+              (states, actions, rewards, next_states, dones, total_rewards, weights)])
+        self.update_target_network()
+
+        if prioritized:
+            self.buffer.update_priorities(indices, td_errors.numpy())
+
+        self.current_loss = loss
+        self.current_grad_norm = grad_norm
+        self.current_reward = rewards[-1]
+
+    def update_policy_per_sample(self):
+        """
+        Legacy update: one forward pass and one gradient step per experience
+        of the minibatch. Kept to compare learning curves with the batched update.
+        With a prioritized buffer, each step is weighted by the importance-sampling
+        weight of its experience and the TD errors become the new priorities.
+        """
+        prioritized = isinstance(self.buffer, PrioritizedReplayBuffer)
+
+        if prioritized:
+            batch, indices, weights = self.buffer.sample_prioritized_batch(
+                self.batch_size)
+            minibatch = list(zip(*batch))
+        else:
             minibatch = self.buffer.sample(self.batch_size)
+            weights = np.ones(len(minibatch), dtype=np.float32)
+        td_errors = np.zeros(len(minibatch), dtype=np.float32)
 
-            for (prev_state, action, reward, next_state, done, total_game_reward) in minibatch:
-                flattened_prev_state = flatten_list(prev_state)
-                flattened_next_state = flatten_list(next_state)
+        for idx, (prev_state, action, reward, next_state, done, total_game_reward) in enumerate(minibatch):
+            flattened_prev_state = flatten_list(prev_state)
+            flattened_next_state = flatten_list(next_state)
 
-                if not done:
-                    next_state_tensor = tf.convert_to_tensor(
-                        [flattened_next_state], dtype=tf.float32)
+            if not done:
+                next_state_tensor = tf.convert_to_tensor(
+                    [flattened_next_state], dtype=tf.float32)
 
-                    target = reward + self.gamma * \
-                        tf.reduce_max(self.model(next_state_tensor)[0])
-                else:
-                    target = total_game_reward
+                target = reward + self.gamma * \
+                    self.bootstrap_values_fn(next_state_tensor)[0]
+            else:
+                target = total_game_reward
 
-                with tf.GradientTape() as tape:
-                    state_tensor = tf.convert_to_tensor(
-                        [flattened_prev_state], dtype=tf.float32)
-                    q_values = self.model(state_tensor)[0]
+            loss, grad_norm, td_error = self.train_step(
+                np.array([flattened_prev_state], dtype=np.float32),
+                np.array([action], dtype=np.int32),
+                np.array([target], dtype=np.float32),
+                weights[idx:idx + 1])
+            td_errors[idx] = td_error.numpy()[0]
+        # one update of the target network per minibatch, as for the batched update
+        self.update_target_network()
 
-                    # Ensure both tensors are at least 1D
-                    target_tensor = tf.expand_dims(target, axis=0)
-                    q_value_tensor = tf.expand_dims(q_values[action], axis=0)
+        if prioritized:
+            self.buffer.update_priorities(indices, td_errors)
 
-                    # Mean square error computation
-                    loss = tf.keras.losses.MSE(target_tensor, q_value_tensor)
-                gradients = tape.gradient(loss, self.model.trainable_variables)
-                grad_norm = tf.linalg.global_norm(gradients)
-                self.optimizer.apply_gradients(
-                    zip(gradients, self.model.trainable_variables))
+        self.current_loss = loss
+        self.current_grad_norm = grad_norm
+        self.current_reward = reward
 
-            self.current_loss = loss
-            self.current_grad_norm = grad_norm
-            self.current_reward = reward
+    def train_step(self, states, actions, targets, weights):
+        return self.train_step_fn(tf.convert_to_tensor(states),
+                                  tf.convert_to_tensor(actions),
+                                  tf.convert_to_tensor(targets),
+                                  tf.convert_to_tensor(weights))
+
+    def _greedy_actions(self, states):
+        return tf.argmax(self.model(states), axis=1, output_type=tf.int32)
+
+    def _max_q_values(self, states):
+        return tf.reduce_max(self.model(states), axis=1)
+
+    def update_target_network(self):
+        """
+        Syncs the target network after an update: a full copy of the model every
+        `target_update_period` updates (hard), or a small step towards it at each
+        update (soft, Polyak averaging).
+        """
+        self.nb_updates += 1
+        if self.target_model is None:
+            return
+        if self.target_update == SOFT:
+            self.sync_target_fn(tf.constant(self.target_tau))
+        elif self.nb_updates % self.target_update_period == 0:
+            self.sync_target_fn(tf.constant(1.0))
+
+    def _sync_target(self, tau):
+        # every variable, including the normalization statistics, is blended
+        for target_var, var in zip(self.target_model.variables, self.model.variables):
+            target_var.assign(tau * var + (1.0 - tau) * target_var)
+
+    def _bootstrap_values(self, next_states):
+        """
+        Estimates the value of the next states used in the bootstrap targets.
+
+        Without a target network, this is the max Q-value of the model itself.
+        With one, the Q-values come from the target network: its max (DQN), or
+        its value of the action the model prefers (Double DQN), which reduces
+        the overestimation of the max.
+        """
+        if self.target_model is None:
+            return tf.reduce_max(self.model(next_states), axis=1)
+
+        target_q_values = self.target_model(next_states)
+        if self.double_dqn:
+            next_actions = tf.argmax(
+                self.model(next_states), axis=1, output_type=tf.int32)
+            return tf.gather(target_q_values, next_actions, axis=1, batch_dims=1)
+        return tf.reduce_max(target_q_values, axis=1)
+
+    def _batched_update(self, states, actions, rewards, next_states, dones, total_rewards, weights):
+        """
+        Computes the bootstrap targets of a minibatch and applies one gradient step,
+        in a single call. Terminal experiences target the total game reward.
+        """
+        bootstrap_values = self._bootstrap_values(next_states)
+        targets = tf.where(dones > 0, total_rewards,
+                           rewards + self.gamma * bootstrap_values)
+        return self._train_step(states, actions, targets, weights)
+
+    def _train_step(self, states, actions, targets, weights):
+        """
+        Applies one gradient step on the weighted mean squared error between
+        the targets and the Q-values of the taken actions.
+
+        Args:
+            states (Tensor): Float32 tensor of shape (batch, state_size).
+            actions (Tensor): Int32 tensor of shape (batch,).
+            targets (Tensor): Float32 tensor of shape (batch,).
+            weights (Tensor): Float32 importance-sampling weights of shape (batch,),
+                              all ones for uniform sampling.
+
+        Returns:
+            tuple: The loss, the global norm of the gradients and the TD errors.
+        """
+        with tf.GradientTape() as tape:
+            q_values = self.model(states)
+            action_q_values = tf.gather(
+                q_values, actions, axis=1, batch_dims=1)
+
+            td_errors = targets - action_q_values
+            # (weighted) mean square error computation
+            loss = tf.reduce_mean(weights * tf.square(td_errors))
+        gradients = tape.gradient(loss, self.model.trainable_variables)
+        grad_norm = tf.linalg.global_norm(gradients)
+        self.optimizer.apply_gradients(
+            zip(gradients, self.model.trainable_variables))
+
+        return loss, grad_norm, td_errors
 
     def save_model(self, modelname):
         model_path = self.get_model_path(modelname)
@@ -130,3 +466,11 @@ class DQNAgent:
         except Exception as error:
             app_logger.error(f'Saving model failed: {error}')
             return False
+
+
+def stack_states(states: list) -> np.ndarray:
+    """
+    Stacks nested or flat states into a float32 array of shape (n, state_size).
+    """
+    return np.array([flatten_list(state) if isinstance(state, list) else state
+                     for state in states], dtype=np.float32)
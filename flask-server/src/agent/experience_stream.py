@@ -0,0 +1,116 @@
+import time
+import uuid
+from threading import Lock
+from typing import Optional
+import numpy as np
+from ..settings import STATE_SIZE, STREAM_EPISODE_TAIL, STREAM_IDLE_TIMEOUT
+from ..utils.wire_format import EXPERIENCE_DTYPES, unpack_experiences
+
+
+class ExperienceStream:
+    """
+    Staging arrays receiving the transitions of one running episode.
+
+    Chunks are copied into preallocated arrays as they arrive. Like the client
+    buffer, only the last `tail_size` transitions of the episode are kept: the
+    arrays are a ring overwritten once full.
+
+    Attributes:
+        tail_size (int): The number of transitions kept.
+        position (int): The next slot written.
+        size (int): The number of transitions currently kept.
+        last_activity (float): The time of the last append, to evict abandoned streams.
+    """
+
+    def __init__(self, tail_size: int = STREAM_EPISODE_TAIL, state_size: int = STATE_SIZE):
+        self.tail_size = tail_size
+        self.arrays = {
+            "states": np.zeros((tail_size, state_size), dtype=EXPERIENCE_DTYPES["states"]),
+            "actions": np.zeros(tail_size, dtype=EXPERIENCE_DTYPES["actions"]),
+            "rewards": np.zeros(tail_size, dtype=EXPERIENCE_DTYPES["rewards"]),
+            "next_states": np.zeros((tail_size, state_size), dtype=EXPERIENCE_DTYPES["next_states"]),
+            "dones": np.zeros(tail_size, dtype=EXPERIENCE_DTYPES["dones"]),
+            "total_rewards": np.zeros(tail_size, dtype=EXPERIENCE_DTYPES["total_rewards"]),
+        }
+        self.position = 0
+        self.size = 0
+        self.last_activity = time.monotonic()
+
+    def append(self, chunk: dict) -> None:
+        """
+        Copies a chunk of transitions (arrays named as in an update_model frame).
+        """
+        # only the last transitions of a chunk longer than the tail can be kept
+        first = max(len(chunk["actions"]) - self.tail_size, 0)
+        nb_kept = len(chunk["actions"]) - first
+        slots = (self.position + np.arange(nb_kept)) % self.tail_size
+
+        for name, array in self.arrays.items():
+            array[slots] = chunk[name][first:]
+
+        self.position = (self.position + nb_kept) % self.tail_size
+        self.size = min(self.size + nb_kept, self.tail_size)
+        self.last_activity = time.monotonic()
+
+    def experiences(self, last_chunk: Optional[dict] = None) -> list:
+        """
+        Returns the kept transitions, oldest first, as experience tuples.
+
+        Args:
+            last_chunk (dict, optional): Transitions following the staged ones. They are
+                                         included as `append` would keep them, without
+                                         being staged, so that a refused commit can be sent again.
+        """
+        order = (self.position - self.size +
+                 np.arange(self.size)) % self.tail_size
+        experiences = unpack_experiences({name: array[order] for name, array in self.arrays.items()})
+        if last_chunk is None:
+            return experiences
+        return (experiences + unpack_experiences(last_chunk))[-self.tail_size:]
+
+
+class ExperienceStreamManager:
+    """
+    Thread-safe registry of the experience streams opened by the clients.
+
+    Streams idle for more than `idle_timeout` seconds (clients that crashed
+    mid-episode) are discarded when a new stream is opened.
+    """
+
+    def __init__(self, idle_timeout: float = STREAM_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.lock = Lock()
+        self.streams: dict[str, ExperienceStream] = {}
+
+    def open(self) -> str:
+        stream_id = uuid.uuid4().hex
+        with self.lock:
+            self.evict_idle_streams()
+            self.streams[stream_id] = ExperienceStream()
+        return stream_id
+
+    def get(self, stream_id: str) -> ExperienceStream:
+        with self.lock:
+            if stream_id not in self.streams:
+                raise KeyError(f"Unknown experience stream {stream_id}")
+            return self.streams[stream_id]
+
+    def append(self, stream_id: str, chunk: dict) -> None:
+        # a stream is only written by the client owning it, one chunk at a time
+        self.get(stream_id).append(chunk)
+
+    def close(self, stream_id: str) -> ExperienceStream:
+        with self.lock:
+            if stream_id not in self.streams:
+                raise KeyError(f"Unknown experience stream {stream_id}")
+            return self.streams.pop(stream_id)
+
+    def evict_idle_streams(self) -> None:
+        now = time.monotonic()
+        for stream_id in [stream_id for stream_id, stream in self.streams.items()
+                          if now - stream.last_activity > self.idle_timeout]:
+            del self.streams[stream_id]
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.streams)
@@ -0,0 +1,372 @@
+"""
+Learner running in its own process, so the training steps never compete with
+the request handlers for the GIL.
+
+    serving process                                   learner process
+    ---------------                                   ---------------
+    update_queue -> forwarder thread --(ring slots + descriptor)--> replay memory, optimizer
+    model <- subscriber thread <-------(weight snapshot, version)--- model
+
+Episodes are copied into a shared memory ring of transitions and announced with
+small descriptors on a multiprocessing queue. The learner publishes its weights
+into a shared memory snapshot every `publish_every` optimizer steps, and the
+serving process loads a snapshot whenever its version changes.
+"""
+import logging
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+from threading import Thread
+import numpy as np
+from .agent_manager import DQNAgentManager
+from ..logger.logging import setup_loggers
+from ..logger.tensorflow_logging import TensorFlowLogger
+from ..settings import STATE_SIZE, TRANSITION_RING_SIZE, WEIGHTS_POLL_INTERVAL, WEIGHTS_PUBLISH_EVERY
+from ..utils.game_states import TRAINING
+from ..utils.wire_format import EXPERIENCE_DTYPES, unpack_experiences
+
+app_logger = logging.getLogger('app_logger')
+
+THREAD = "THREAD"
+PROCESS = "PROCESS"
+
+
+class SharedTransitionRing:
+    """
+    Ring of transitions in shared memory, written by the serving process and read by the learner.
+
+    The arrays of an update_model frame (states, actions, ...) are laid out one
+    after the other in a single shared memory block. A transition counter shared
+    by both processes keeps the writer from overwriting slots the learner has not
+    read yet: the writer waits on a condition notified by each read.
+
+    Attributes:
+        capacity (int): The number of transitions of the ring.
+        arrays (dict): The named arrays, views over the shared memory.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, capacity: int, state_size: int, consumed, slots_freed):
+        self.memory = memory
+        self.capacity = capacity
+        self.state_size = state_size
+        self.consumed = consumed
+        self.slots_freed = slots_freed
+        self.written = 0
+        self.arrays = {}
+
+        offset = 0
+        for name, shape in self.layout(capacity, state_size):
+            dtype = np.dtype(EXPERIENCE_DTYPES[name])
+            self.arrays[name] = np.ndarray(
+                shape, dtype=dtype, buffer=memory.buf, offset=offset)
+            offset += int(np.prod(shape)) * dtype.itemsize
+
+    @staticmethod
+    def layout(capacity: int, state_size: int) -> list:
+        return [("states", (capacity, state_size)), ("actions", (capacity,)), ("rewards", (capacity,)),
+                ("next_states", (capacity, state_size)), ("dones", (capacity,)), ("total_rewards", (capacity,))]
+
+    @classmethod
+    def create(cls, capacity: int = TRANSITION_RING_SIZE, state_size: int = STATE_SIZE, context=None):
+        context = context or multiprocessing.get_context("spawn")
+        nbytes = sum(int(np.prod(shape)) * np.dtype(EXPERIENCE_DTYPES[name]).itemsize
+                     for name, shape in cls.layout(capacity, state_size))
+        memory = shared_memory.SharedMemory(create=True, size=nbytes)
+        # the counter is guarded by the lock of the condition
+        return cls(memory, capacity, state_size, context.Value("Q", 0, lock=False), context.Condition())
+
+    @property
+    def spec(self) -> tuple:
+        return (self.memory.name, self.capacity, self.state_size, self.consumed, self.slots_freed)
+
+    @classmethod
+    def attach(cls, spec: tuple):
+        name, capacity, state_size, consumed, slots_freed = spec
+        return cls(shared_memory.SharedMemory(name=name), capacity, state_size, consumed, slots_freed)
+
+    def write(self, experiences: list) -> tuple[int, int]:
+        """
+        Copies experience tuples into the ring, waiting for free slots if needed.
+
+        Returns:
+            tuple: The first slot and the number of transitions, the descriptor of the episode.
+        """
+        count = len(experiences)
+        start = self.written % self.capacity
+        if count == 0:
+            return start, 0
+        if count > self.capacity:
+            raise ValueError(
+                f"{count} transitions do not fit in a ring of {self.capacity}")
+
+        with self.slots_freed:
+            self.slots_freed.wait_for(
+                lambda: self.written + count - self.consumed.value <= self.capacity)
+
+        slots = (start + np.arange(count)) % self.capacity
+        states, actions, rewards, next_states, dones, total_rewards = zip(
+            *experiences)
+        self.arrays["states"][slots] = np.stack(states)
+        self.arrays["actions"][slots] = actions
+        self.arrays["rewards"][slots] = rewards
+        self.arrays["next_states"][slots] = np.stack(next_states)
+        self.arrays["dones"][slots] = dones
+        self.arrays["total_rewards"][slots] = total_rewards
+
+        self.written += count
+        return start, count
+
+    def read(self, start: int, count: int) -> list:
+        """
+        Copies the transitions of a descriptor out of the ring and frees their slots.
+        """
+        slots = (start + np.arange(count)) % self.capacity
+        experiences = unpack_experiences(
+            {name: array[slots] for name, array in self.arrays.items()})
+        with self.slots_freed:
+            self.consumed.value += count
+            self.slots_freed.notify_all()
+        return experiences
+
+    def close(self, unlink: bool = False) -> None:
+        self.arrays = {}
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+class WeightSnapshot:
+    """
+    Model weights in shared memory, with a version incremented at each publication.
+
+    Attributes:
+        shapes (list): The shape of each weight array of the model.
+        version (multiprocessing.Value): The number of published snapshots.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, shapes: list, version, lock):
+        self.memory = memory
+        self.shapes = shapes
+        self.version = version
+        self.lock = lock
+        self.size = sum(int(np.prod(shape)) for shape in shapes)
+        self.values = np.ndarray(
+            (self.size,), dtype=np.float32, buffer=memory.buf)
+
+    @classmethod
+    def create(cls, weights: list, context=None):
+        context = context or multiprocessing.get_context("spawn")
+        shapes = [weight.shape for weight in weights]
+        size = sum(weight.size for weight in weights)
+        memory = shared_memory.SharedMemory(
+            create=True, size=size * np.dtype(np.float32).itemsize)
+        return cls(memory, shapes, context.Value("Q", 0, lock=False), context.Lock())
+
+    @property
+    def spec(self) -> tuple:
+        return (self.memory.name, self.shapes, self.version, self.lock)
+
+    @classmethod
+    def attach(cls, spec: tuple):
+        name, shapes, version, lock = spec
+        return cls(shared_memory.SharedMemory(name=name), shapes, version, lock)
+
+    def publish(self, weights: list) -> None:
+        flat_weights = np.concatenate(
+            [np.ravel(weight) for weight in weights]).astype(np.float32, copy=False)
+        with self.lock:
+            self.values[:] = flat_weights
+            self.version.value += 1
+
+    def read(self) -> tuple[int, list]:
+        """
+        Returns the version and a copy of the weights of the last snapshot.
+        """
+        with self.lock:
+            version = self.version.value
+            flat_weights = self.values.copy()
+
+        weights, offset = [], 0
+        for shape in self.shapes:
+            size = int(np.prod(shape))
+            weights.append(flat_weights[offset:offset + size].reshape(shape))
+            offset += size
+        return version, weights
+
+    def close(self, unlink: bool = False) -> None:
+        self.values = None
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+def run_learner(ring_spec: tuple, snapshot_spec: tuple, messages, publish_every: int) -> None:
+    """
+    Main loop of the learner process.
+
+    Messages:
+        ("episode", start, count, fail_success_proportion): transitions to learn from.
+        ("reset", modelname): starts a new training, resetting the agent.
+        ("end", modelname): publishes the weights and saves the model.
+        ("stop",): ends the process.
+    """
+    setup_loggers()
+    ring = SharedTransitionRing.attach(ring_spec)
+    snapshot = WeightSnapshot.attach(snapshot_spec)
+
+    agent_manager = DQNAgentManager()
+    # a TensorBoard run per training, opened when it starts
+    tf_logger = TensorFlowLogger()
+    snapshot.publish(agent_manager.agent.model.get_weights())
+    # optimizer steps of the agent at the last snapshot, an episode may earn several or none
+    published_at = agent_manager.agent.nb_updates
+
+    while True:
+        message = messages.get()
+        kind = message[0]
+
+        if kind == "episode":
+            _, start, count, fail_success_proportion = message
+            agent_manager.update_agent(ring.read(start, count))
+            agent = agent_manager.agent
+            if agent.nb_updates - published_at >= publish_every:
+                snapshot.publish(agent.model.get_weights())
+                published_at = agent.nb_updates
+
+            if tf_logger.summary_writer is None:  # episodes sent without starting a training
+                tf_logger.set_tensorflow_logger(TRAINING, agent.modelname)
+            tf_logger.log({
+                "Queue size": messages.qsize(),
+                "Buffer size": len(agent.buffer),
+                "Gradient norm": agent.current_grad_norm,
+                "Loss": agent.current_loss,
+                "Fail/success proportion inside experience pool": fail_success_proportion,
+                **agent_manager.scheduler.throughput()
+            })
+            tf_logger.step_count += 1
+        elif kind == "reset":
+            agent_manager.reset_agent(message[1])
+            tf_logger.set_tensorflow_logger(TRAINING, message[1])
+            tf_logger.step_count = 0
+            snapshot.publish(agent_manager.agent.model.get_weights())
+            published_at = agent_manager.agent.nb_updates
+        elif kind == "end":
+            snapshot.publish(agent_manager.agent.model.get_weights())
+            if message[1] is not None:  # no training was started
+                agent_manager.agent.save_model(message[1])
+        elif kind == "stop":
+            break
+
+    ring.close()
+    snapshot.close()
+
+
+class LearnerProcess:
+    """
+    Drop-in replacement of ModelUpdaterThread training in a spawned learner process.
+
+    The serving agent only selects actions: a forwarder thread moves the
+    episodes of the update queue to the learner, and a subscriber thread loads
+    the weight snapshots into the serving model. Like with the updater thread,
+    the weights change under the action requests without a lock.
+
+    Attributes:
+        agent_manager (DQNAgentManager): The serving agent manager.
+        publish_every (int): The optimizer steps of the learner between two weight snapshots.
+        poll_interval (float): The seconds between two checks for a new snapshot.
+    """
+
+    def __init__(self, agent_manager: DQNAgentManager, ring_size: int = TRANSITION_RING_SIZE,
+                 publish_every: int = WEIGHTS_PUBLISH_EVERY, poll_interval: float = WEIGHTS_POLL_INTERVAL):
+        self.agent_manager = agent_manager
+        self.publish_every = publish_every
+        self.poll_interval = poll_interval
+        self.thread = None
+        self.is_running = False
+        self.training_finished = False
+
+        context = multiprocessing.get_context("spawn")
+        self.ring = SharedTransitionRing.create(
+            ring_size, agent_manager.agent.state_size, context)
+        self.snapshot = WeightSnapshot.create(
+            agent_manager.agent.model.get_weights(), context)
+        self.messages = context.Queue()
+        self.process = context.Process(target=run_learner, daemon=True,
+                                       args=(self.ring.spec, self.snapshot.spec, self.messages, publish_every))
+        self.process.start()
+
+        self.loaded_version = 0
+        self.subscriber = Thread(target=self.load_snapshots, daemon=True)
+        self.subscriber.start()
+
+    def start(self):
+        def run():
+            while True:
+                try:
+                    experiences = self.agent_manager.update_queue.get(
+                        timeout=1)
+                    start, count = self.ring.write(experiences)
+                    if count == 0:
+                        continue
+                    proportion = self.agent_manager.nb_failed_ep_count / \
+                        self.agent_manager.nb_suceeded_ep_count
+                    self.messages.put(("episode", start, count, proportion))
+                except queue.Empty:
+                    if self.training_finished:
+                        self.is_running = False
+                        break
+                except Exception as error:
+                    # the next training restarts the thread, instead of queuing for a dead one
+                    app_logger.error(f'Forwarding an episode to the learner failed: {error}')
+                    self.is_running = False
+                    raise
+
+            self.messages.put(("end", self.agent_manager.agent.modelname))
+
+        self.training_finished = False
+        self.thread = Thread(target=run, daemon=True)
+        self.thread.start()
+        self.is_running = True
+
+    def stop(self):
+        self.training_finished = True
+
+    def wait_until_stopped(self):
+        """
+        Ends the running training and waits until the forwarder has sent the learner
+        all of its episodes and the message that saves the model.
+
+        The learner handles its messages in order, so a reset sent afterwards only
+        happens once it has trained on every episode of the previous training.
+        """
+        if self.thread is None:
+            return
+        self.training_finished = True
+        self.thread.join()
+
+    def check_and_restart_thread(self):
+        self.training_finished = False
+        if not self.is_running:
+            self.start()
+
+    def on_training_started(self, modelname: str):
+        self.messages.put(("reset", modelname))
+
+    def load_snapshots(self):
+        while True:
+            time.sleep(self.poll_interval)
+            if self.snapshot.version.value == self.loaded_version:
+                continue
+            version, weights = self.snapshot.read()
+            self.agent_manager.agent.model.set_weights(weights)
+            self.loaded_version = version
+
+    def shutdown(self):
+        """
+        Stops the learner process and releases the shared memory.
+        """
+        self.messages.put(("stop",))
+        self.process.join()
+        self.ring.close(unlink=True)
+        self.snapshot.close(unlink=True)
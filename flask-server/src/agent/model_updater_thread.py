@@ -12,23 +12,31 @@ class ModelUpdaterThread:
         self.thread = None
         self.is_running = False
         self.training_finished = False
+        # a TensorBoard run per training, opened when it starts
         self.tf_logger = TensorFlowLogger()
-        self.tf_logger.set_tensorflow_logger(TRAINING)
 
     def start(self):
         def run():
             while True:
-                try:
-                    data = self.agent_manager.update_queue.get(timeout=1)
-                    self.agent_manager.update_agent(data)
-                    self.tf_log()
-                except queue.Empty:
-                    if self.training_finished:
-                        self.is_running = False
-                        break
-
-            self.agent_manager.agent.save_model(
-                self.agent_manager.agent.modelname)
+                scheduler = self.agent_manager.scheduler
+                if scheduler.ingestion_allowed():
+                    try:
+                        # no waiting for episodes while there are steps to perform
+                        data = self.agent_manager.update_queue.get(
+                            block=scheduler.pending_updates == 0, timeout=1)
+                        self.agent_manager.ingest(data)
+                        self.tf_log()
+                    except queue.Empty:
+                        if self.training_finished and scheduler.pending_updates == 0:
+                            self.is_running = False
+                            break
+
+                if scheduler.pending_updates:
+                    self.agent_manager.train_step()
+
+            modelname = self.agent_manager.agent.modelname
+            if modelname is not None:  # no training was started
+                self.agent_manager.agent.save_model(modelname)
 
         self.thread = Thread(target=run, daemon=True)
         self.thread.start()
@@ -37,17 +45,36 @@ class ModelUpdaterThread:
     def stop(self):
         self.training_finished = True
 
+    def wait_until_stopped(self):
+        """
+        Ends the running training and waits until its queue is drained, its owed
+        steps performed and its model saved, so that nothing trains the agent afterwards.
+        """
+        if self.thread is None:
+            return
+        self.training_finished = True
+        self.thread.join()
+
     def check_and_restart_thread(self):
+        self.training_finished = False
         if not self.is_running:
             self.start()
 
+    def on_training_started(self, modelname: str):
+        self.tf_logger.set_tensorflow_logger(TRAINING, modelname)
+        self.tf_logger.step_count = 0
+
     def tf_log(self):
+        if self.tf_logger.summary_writer is None:  # episodes sent without starting a training
+            self.tf_logger.set_tensorflow_logger(
+                TRAINING, self.agent_manager.agent.modelname)
         metrics = {
             "Queue size": self.agent_manager.update_queue.qsize(),
             "Buffer size": len(self.agent_manager.agent.buffer),
             "Gradient norm": self.agent_manager.agent.current_grad_norm,
             "Loss": self.agent_manager.agent.current_loss,
-            "Fail/success proportion inside experience pool": self.agent_manager.nb_failed_ep_count / self.agent_manager.nb_suceeded_ep_count
+            "Fail/success proportion inside experience pool": self.agent_manager.nb_failed_ep_count / self.agent_manager.nb_suceeded_ep_count,
+            **self.agent_manager.scheduler.throughput()
         }
         self.tf_logger.log(metrics)
         self.tf_logger.step_count += 1
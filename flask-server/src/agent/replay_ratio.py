@@ -0,0 +1,76 @@
+import time
+from ..settings import REPLAY_MAX_PENDING_UPDATES, REPLAY_RATIO
+
+
+class ReplayRatioScheduler:
+    """
+    Decides how many gradient steps the learner owes for the transitions it ingested.
+
+    Each inserted transition earns `replay_ratio` gradient steps (a fraction of
+    a step when the ratio is below one, the remainder being carried over to the
+    next episodes). With `replay_ratio=None`, an episode earns exactly one step
+    whatever its length, as the legacy update did.
+
+    Ingestion is throttled while the learner owes `max_pending_updates` steps
+    or more: the episodes stay in the update queue until it has caught up.
+
+    Attributes:
+        replay_ratio (float): The gradient steps per inserted transition, or None.
+        nb_inserted (int): The transitions inserted since the training started.
+        nb_updates (int): The gradient steps performed since the training started.
+        nb_samples (int): The experiences sampled by these steps.
+    """
+
+    def __init__(self, replay_ratio: float = REPLAY_RATIO, max_pending_updates: int = REPLAY_MAX_PENDING_UPDATES):
+        self.replay_ratio = replay_ratio
+        self.max_pending_updates = max_pending_updates
+        self.credit = 0.0
+        self.nb_inserted = 0
+        self.nb_updates = 0
+        self.nb_samples = 0
+
+        self.last_report_time = time.perf_counter()
+        self.last_report_updates = 0
+        self.last_report_samples = 0
+
+    @property
+    def pending_updates(self) -> int:
+        return int(self.credit)
+
+    def ingestion_allowed(self) -> bool:
+        return self.pending_updates < self.max_pending_updates
+
+    def record_insertion(self, nb_transitions: int) -> None:
+        self.nb_inserted += nb_transitions
+        if self.replay_ratio is None:
+            self.credit += 1
+        else:
+            self.credit += nb_transitions * self.replay_ratio
+
+    def record_update(self, batch_size: int) -> None:
+        self.credit = max(self.credit - 1, 0.0)
+        self.nb_updates += 1
+        self.nb_samples += batch_size
+
+    def drop_pending_updates(self) -> None:
+        """
+        Forgets the owed steps, when the replay memory is too small to sample a batch.
+        """
+        self.credit = 0.0
+
+    def throughput(self) -> dict:
+        """
+        Returns the updates and samples per second since the previous call, and
+        the achieved replay ratio since the training started.
+        """
+        now = time.perf_counter()
+        elapsed = max(now - self.last_report_time, 1e-9)
+        metrics = {
+            "Updates per second": (self.nb_updates - self.last_report_updates) / elapsed,
+            "Samples per second": (self.nb_samples - self.last_report_samples) / elapsed,
+            "Achieved replay ratio": self.nb_updates / max(self.nb_inserted, 1),
+        }
+        self.last_report_time = now
+        self.last_report_updates = self.nb_updates
+        self.last_report_samples = self.nb_samples
+        return metrics
@@ -0,0 +1,153 @@
+import logging
+import time
+from threading import Lock
+from .agent_manager import DQNAgentManager
+from .action_batcher import ActionMicroBatcher
+from .learner_process import PROCESS, LearnerProcess
+from .model_updater_thread import ModelUpdaterThread
+from ..logger.client_profile import ClientProfileLogger
+from ..settings import LEARNER_MODE, MAX_SESSIONS, MICRO_BATCHING, SESSION_IDLE_TIMEOUT
+
+app_logger = logging.getLogger('app_logger')
+
+
+class TooManySessions(Exception):
+    """
+    Raised when a training session is started while MAX_SESSIONS sessions are active.
+    """
+
+
+class TrainingSession:
+    """
+    Everything the server owns for one training run: its agent (model and replay
+    memory), its learner (updater thread or learner process, with its TensorBoard
+    writer), its action micro-batcher and the TensorBoard writer of its client profiles.
+
+    Attributes:
+        modelname (str): The name of the trained model, which identifies the session.
+        last_activity (float): The time of the last request, to evict idle sessions.
+    """
+
+    def __init__(self, modelname: str, learner_mode: str = LEARNER_MODE, micro_batching: bool = MICRO_BATCHING):
+        self.modelname = modelname
+        if learner_mode == PROCESS:
+            self.agent_manager = DQNAgentManager(replay_memory=False)
+            self.model_updater = LearnerProcess(self.agent_manager)
+        else:
+            self.agent_manager = DQNAgentManager()
+            self.model_updater = ModelUpdaterThread(self.agent_manager)
+        self.action_batcher = ActionMicroBatcher(
+            self.agent_manager) if micro_batching else None
+        self.client_profile_logger = ClientProfileLogger(modelname)
+        self.last_activity = time.monotonic()
+
+    def start_training(self, modelname: str):
+        """
+        Starts a training: the agent built with the session is reset in place (initial
+        weights, empty replay memory) and the learner opens a new TensorBoard run.
+
+        A previous training still draining its queue is ended first, its model saved:
+        the learner must not train the agent while it is reset.
+        """
+        self.model_updater.wait_until_stopped()
+        self.agent_manager.reset_agent(modelname)
+        self.model_updater.on_training_started(modelname)
+        self.model_updater.check_and_restart_thread()
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    def close(self):
+        """
+        Ends the training (the learner saves the model once its queue is empty) and releases the threads.
+        """
+        self.model_updater.stop()
+        if self.action_batcher is not None:
+            self.action_batcher.stop()
+        if isinstance(self.model_updater, LearnerProcess):
+            # the learner must save the model before it is stopped
+            self.model_updater.wait_until_stopped()
+            self.model_updater.shutdown()
+
+
+class SessionManager:
+    """
+    Thread-safe registry of the training sessions of the server, keyed by model name.
+
+    The default session serves the clients that do not name a session, as the
+    single agent of the server used to. Named sessions are created by
+    `start`, and are evicted after `idle_timeout` seconds without requests
+    (checked when a session is started): their model is saved and their
+    threads stopped.
+    """
+
+    def __init__(self, default_session: TrainingSession, idle_timeout: float = SESSION_IDLE_TIMEOUT,
+                 max_sessions: int = MAX_SESSIONS):
+        self.default_session = default_session
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.lock = Lock()
+        self.sessions: dict[str, TrainingSession] = {}
+
+    def start(self, modelname: str) -> TrainingSession:
+        """
+        Starts the training of `modelname` in its own session, reusing the
+        session (and its TensorFlow graphs) if the model name is already known.
+
+        Raises:
+            TooManySessions: If `max_sessions` sessions are already active.
+        """
+        with self.lock:
+            evicted_sessions = self.pop_idle_sessions()
+            session = self.sessions.get(modelname)
+            is_full = session is None and len(self.sessions) >= self.max_sessions
+        for evicted_session in evicted_sessions:
+            evicted_session.close()
+        if is_full:
+            raise TooManySessions(
+                f"{self.max_sessions} training sessions are already active")
+
+        if session is None:
+            # built outside of the lock: the other sessions keep serving during the warm-up
+            new_session = TrainingSession(modelname)
+            with self.lock:
+                session = self.sessions.setdefault(modelname, new_session)
+            if session is not new_session:
+                new_session.close()
+
+        session.start_training(modelname)
+        session.touch()
+        return session
+
+    def get(self, modelname: str = None) -> TrainingSession:
+        """
+        Returns the session of `modelname`, or the default session if None.
+
+        Raises:
+            KeyError: If no session has this name.
+        """
+        if modelname is None:
+            return self.default_session
+        with self.lock:
+            if modelname not in self.sessions:
+                raise KeyError(f"Unknown session {modelname}")
+            session = self.sessions[modelname]
+        session.touch()
+        return session
+
+    def pop_idle_sessions(self) -> list:
+        """
+        Removes the idle sessions from the registry and returns them, to be closed
+        without holding the lock.
+        """
+        now = time.monotonic()
+        idle_sessions = []
+        for modelname in [modelname for modelname, session in self.sessions.items()
+                          if now - session.last_activity > self.idle_timeout]:
+            app_logger.info(f"Evicting idle session {modelname}")
+            idle_sessions.append(self.sessions.pop(modelname))
+        return idle_sessions
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.sessions)
@@ -1,34 +1,74 @@
 import logging
+import math
 import sys
-from flask import request, jsonify, Flask
+import numpy as np
+from flask import g, request, jsonify, Flask, Response
 from ..logger.logging import setup_loggers
-from ..agent.agent_manager import DQNAgentManager
+from ..agent.agent_manager import DQNAgentManager, UpdateQueueFull
+from ..agent.session_manager import SessionManager, TooManySessions, TrainingSession
 from ..utils.game_states import RANDOM, TESTING, TRAINING
-from ..agent.model_updater_thread import ModelUpdaterThread
+from ..utils.replay_buffer import to_flat_array
+from ..settings import UPDATE_RETRY_AFTER
+from ..utils.wire_format import FRAME_CONTENT_TYPE, JSON_CONTENT_TYPE, decode_frame, encode_frame, \
+    experiences_to_arrays, unpack_experiences
 
 
 setup_loggers()
 logger = logging.getLogger('app_logger')
 
+# names the training session of a request, the default session if absent
+SESSION_HEADER = "X-Model-Name"
+
 
 class RouteConfigurator:
-    def __init__(self, app: Flask, agent_manager: DQNAgentManager, model_updater: ModelUpdaterThread):
+    def __init__(self, app: Flask, session_manager: SessionManager):
         self.app: Flask = app
-        self.agent_manager = agent_manager
-        self.thread = model_updater
+        self.sessions = session_manager
         self.configure_routes()
-        self.thread.check_and_restart_thread()
+        self.sessions.default_session.model_updater.check_and_restart_thread()
+
+    @property
+    def session(self) -> TrainingSession:
+        return g.session
+
+    @property
+    def agent_manager(self) -> DQNAgentManager:
+        return g.session.agent_manager
+
+    @property
+    def thread(self):
+        return g.session.model_updater
+
+    @property
+    def action_batcher(self):
+        return g.session.action_batcher
 
     def configure_routes(self):
 
+        @self.app.before_request
+        def resolve_session():
+            if request.endpoint in ('start_training', 'is_model_saved'):
+                return None
+            try:
+                g.session = self.sessions.get(
+                    request.headers.get(SESSION_HEADER))
+            except KeyError as error:
+                return jsonify({"error": str(error)}), 404
+            return None
+
         @self.app.route('/start_training', methods=['POST'])
         def start_training():
             modelname = request.json.get('modelname')
-            self.thread.check_and_restart_thread()
             logger.info(f"Starting training with {modelname}")
-            self.agent_manager.reset_agent(modelname)
-            self.thread.tf_logger.step_count = 0
-            return jsonify({"message": "Started"}), 200
+            if request.headers.get(SESSION_HEADER) is None:
+                self.sessions.default_session.start_training(modelname)
+                return jsonify({"message": "Started"}), 200
+
+            try:
+                self.sessions.start(request.headers[SESSION_HEADER])
+            except TooManySessions as error:
+                return jsonify({"error": str(error)}), 503
+            return jsonify({"message": "Started", "sessions": len(self.sessions)}), 200
 
         @self.app.route('/end_training', methods=['GET'])
         def end_training():
@@ -40,9 +80,13 @@ class RouteConfigurator:
         @self.app.route('/get_action', methods=['POST'])
         def get_action():
             logger.info("Action requested")
-            data = request.json
+            if request.mimetype == FRAME_CONTENT_TYPE:
+                data, arrays = decode_frame(request.get_data())
+                state = arrays['state']
+            else:
+                data = request.json
+                state = data['state']
 
-            state = data['state']
             mode = data['mode']
             epsilon = data['epsilon']
             modelname = data['modelname']
@@ -50,8 +94,12 @@ class RouteConfigurator:
             agent = self.agent_manager.agent
 
             if mode == TRAINING:
-                action = agent.choose_action_for_training(
-                    state, epsilon)
+                if self.action_batcher is not None:
+                    action = self.action_batcher.choose_action_for_training(
+                        state, epsilon)
+                else:
+                    action = agent.choose_action_for_training(
+                        state, epsilon)
             elif mode == TESTING:
                 action = agent.choose_action_with_model(
                     state, modelname)
@@ -62,42 +110,144 @@ class RouteConfigurator:
 
             return jsonify({"action": action}), 200
 
+        @self.app.route('/get_actions', methods=['POST'])
+        def get_actions():
+            if request.mimetype == FRAME_CONTENT_TYPE:
+                data, arrays = decode_frame(request.get_data())
+                states = arrays['states']
+            else:
+                data = request.json
+                states = data['states']
+
+            mode = data['mode']
+            epsilon = data['epsilon']  # one value, or one per state
+            modelname = data['modelname']
+
+            agent = self.agent_manager.agent
+
+            if mode == TRAINING:
+                actions = agent.choose_actions_for_training(states, epsilon)
+            elif mode == TESTING:
+                actions = agent.choose_actions_with_model(states, modelname)
+            elif mode == RANDOM:
+                actions = [agent.choose_random_action() for _ in states]
+            else:
+                return jsonify({"error": "Invalid mode"}), 400
+
+            if request.accept_mimetypes.best_match([JSON_CONTENT_TYPE, FRAME_CONTENT_TYPE]) == FRAME_CONTENT_TYPE:
+                frame = encode_frame(
+                    {}, {"actions": np.array(actions, dtype="<i4")})
+                return Response(frame, status=200, mimetype=FRAME_CONTENT_TYPE)
+            return jsonify({"actions": actions}), 200
+
+        @self.app.route('/action_metrics', methods=['GET'])
+        def get_action_metrics():
+            if self.action_batcher is None:
+                return jsonify({"micro_batching": False}), 200
+            metrics = self.action_batcher.metrics.summary()
+            metrics["micro_batching"] = True
+            return jsonify(metrics), 200
+
         @self.app.route('/update_model', methods=['POST'])
         def update_model():
-            experiences_data = request.json
+            if request.mimetype == FRAME_CONTENT_TYPE:
+                _, arrays = decode_frame(request.get_data())
+                experiences = unpack_experiences(arrays)
+            else:
+                experiences = [(to_flat_array(exp["state"]), exp["action"], exp["reward"],
+                                to_flat_array(exp["next_state"]), exp["done"], exp["total_reward"])
+                               for exp in request.json]
+
+            try:
+                self.agent_manager.commit_episode(experiences)
+            except UpdateQueueFull as error:
+                return queue_full_response(error)
+
+            return jsonify({"message": "Data received and queued for processing",
+                            "capacity": self.agent_manager.capacity()}), 200
+
+        def queue_full_response(error: UpdateQueueFull):
+            response = jsonify({"error": str(error), "capacity": 0,
+                                "retry_after": UPDATE_RETRY_AFTER})
+            response.status_code = 429
+            response.headers["Retry-After"] = str(
+                math.ceil(UPDATE_RETRY_AFTER))
+            return response
 
-            experiences = []
-            episode_failed = True
-            for exp in experiences_data:
-                experiences.append((exp["state"], exp["action"], exp["reward"],
-                                   exp["next_state"], exp["done"], exp["total_reward"]))
+        def read_experience_chunk():
+            if request.mimetype == FRAME_CONTENT_TYPE:
+                _, arrays = decode_frame(request.get_data())
+                return arrays
+            experiences = request.get_json(silent=True)
+            return experiences_to_arrays(experiences) if experiences else None
 
-                force_update = False
-                if (exp['done'] == True and exp['next_state'][0][3] == 1.0):
-                    episode_failed = False
-                    if exp['state'][1] == 1:
-                        force_update = True
-                    break
-                elif exp['done'] == True and exp['next_state'][0][0] == 1.0:
-                    episode_failed = True
-                    break
+        @self.app.route('/stream/open', methods=['POST'])
+        def open_stream():
+            stream_id = self.agent_manager.experience_streams.open()
+            return jsonify({"stream_id": stream_id}), 200
 
-            self.agent_manager.update_experience_replay(
-                experiences, episode_failed, force_update)
+        @self.app.route('/stream/<stream_id>/append', methods=['POST'])
+        def append_to_stream(stream_id):
+            chunk = read_experience_chunk()
+            try:
+                if chunk is not None:
+                    self.agent_manager.experience_streams.append(
+                        stream_id, chunk)
+            except KeyError as error:
+                return jsonify({"error": str(error)}), 404
+            return jsonify({"message": "Chunk appended"}), 200
 
-            return jsonify({"message": "Data received and queued for processing"}), 200
+        @self.app.route('/stream/<stream_id>/commit', methods=['POST'])
+        def commit_stream(stream_id):
+            # the last transitions of the episode may come with the commit
+            chunk = read_experience_chunk()
+            streams = self.agent_manager.experience_streams
+            try:
+                experiences = streams.get(stream_id).experiences(chunk)
+            except KeyError as error:
+                return jsonify({"error": str(error)}), 404
+
+            # the stream is only closed once the episode is queued, so that a refused
+            # commit can be sent again as is
+            try:
+                self.agent_manager.commit_episode(experiences)
+            except UpdateQueueFull as error:
+                return queue_full_response(error)
+            try:
+                streams.close(stream_id)
+            except KeyError:
+                pass  # evicted meanwhile, the episode is queued anyway
+            return jsonify({"message": "Episode committed",
+                            "capacity": self.agent_manager.capacity()}), 200
+
+        @self.app.route('/stream/<stream_id>/discard', methods=['POST'])
+        def discard_stream(stream_id):
+            try:
+                self.agent_manager.experience_streams.close(stream_id)
+            except KeyError as error:
+                return jsonify({"error": str(error)}), 404
+            return jsonify({"message": "Stream discarded"}), 200
+
+        @self.app.route('/log_client_profile', methods=['POST'])
+        def log_client_profile():
+            data = request.json
+            self.session.client_profile_logger.log(
+                data['stages'], data.get('mode', TRAINING))
+            return jsonify({"message": "Profile logged"}), 200
 
         @self.app.route('/queue_size', methods=['GET'])
         def get_queue_size():
             queue_size = self.agent_manager.update_queue.qsize()
-            return jsonify({"queue_size": queue_size}), 200
+            return jsonify({"queue_size": queue_size, "capacity": self.agent_manager.capacity()}), 200
 
         @self.app.route('/is_model_saved', methods=['POST'])
         def is_model_saved():
             data = request.json
 
             modelname = data['modelname']
-            is_model_saved = self.agent_manager.agent.is_model_saved(modelname)
+            # the saved models are shared by every session
+            is_model_saved = self.sessions.default_session.agent_manager.agent.is_model_saved(
+                modelname)
             return jsonify({"is_model_saved": is_model_saved}), 200
 
         @self.app.route('/save_model', methods=['POST'])
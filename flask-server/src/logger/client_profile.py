@@ -0,0 +1,36 @@
+from threading import Lock
+from .tensorflow_logging import TensorFlowLogger
+
+CLIENT_PROFILE = "CLIENT_PROFILE"
+LOGGED_STATISTICS = ("share", "mean_ms", "p50_ms", "p95_ms", "p99_ms")
+
+
+class ClientProfileLogger:
+    """
+    Writes to TensorBoard the time the clients spend per stage of their episode loop.
+
+    The TensorBoard writer is only created with the first report, in a run named
+    after `name` if given, and each report (from any client process) is one
+    TensorBoard step.
+    """
+
+    def __init__(self, name: str = None):
+        self.name = name
+        self.lock = Lock()
+        self.tf_logger = None
+
+    def log(self, stages: dict, mode: str = "TRAINING") -> None:
+        """
+        Args:
+            stages (dict): The statistics of each stage, as sent by the client StageProfiler.
+            mode (str): The mode of the reporting episodes.
+        """
+        metrics = {f"Client profile {mode}/{stage} {statistic}": statistics[statistic]
+                   for stage, statistics in stages.items()
+                   for statistic in LOGGED_STATISTICS if statistic in statistics}
+        with self.lock:
+            if self.tf_logger is None:
+                self.tf_logger = TensorFlowLogger()
+                self.tf_logger.set_tensorflow_logger(CLIENT_PROFILE, self.name)
+            self.tf_logger.log(metrics)
+            self.tf_logger.step_count += 1
@@ -9,11 +9,15 @@ class TensorFlowLogger():
     def __init__(self, mode: str = 'UNSET') -> None:
         self.mode = mode
         self.step_count = 0
+        self.summary_writer = None
 
-    def set_tensorflow_logger(self, mode: str):
+    def set_tensorflow_logger(self, mode: str, name: str = None):
+        """
+        Opens a new TensorBoard run, named after the time, the model name if any and the mode.
+        """
         self.mode = mode
         current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        log_dir_name = f"{current_time}_{self.mode}"
+        log_dir_name = f"{current_time}_{name}_{self.mode}" if name else f"{current_time}_{self.mode}"
 
         if not os.path.exists(TENSORFLOW_LOG_PATH):
             os.makedirs(TENSORFLOW_LOG_PATH)
@@ -1,13 +1,15 @@
 from flask import Flask
 from .app.routes import RouteConfigurator
-from .agent.agent_manager import DQNAgentManager
-from .agent.model_updater_thread import ModelUpdaterThread
+from .agent.session_manager import SessionManager, TrainingSession
 
 app = Flask(__name__)
-agent_manager = DQNAgentManager()
-model_updater = ModelUpdaterThread(agent_manager)
-route_configurator = RouteConfigurator(
-    app, agent_manager, model_updater)
+# serves the clients that do not name their session, as the single agent of the server used to
+default_session = TrainingSession(None)
+agent_manager = default_session.agent_manager
+model_updater = default_session.model_updater
+action_batcher = default_session.action_batcher
+session_manager = SessionManager(default_session)
+route_configurator = RouteConfigurator(app, session_manager)
 
 if __name__ == "__main__":
     app.run(debug=True)
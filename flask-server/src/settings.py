@@ -6,8 +6,57 @@ ACTION_POSSIBILITIES = 24
 STATE_SIZE = 200
 
 BATCH_SIZE = 350
+# True: one gradient step per minibatch, False: legacy one step per experience
+BATCHED_UPDATE = True
+
+# Bootstrapping: a target network lagging behind the model stabilizes the targets
+TARGET_NETWORK = False
+TARGET_UPDATE = "HARD"  # "HARD": copy the model every TARGET_UPDATE_PERIOD updates, "SOFT": Polyak averaging
+TARGET_UPDATE_PERIOD = 200  # updates between two hard copies
+TARGET_TAU = 0.005  # share of the model blended into the target network at each soft update
+DOUBLE_DQN = False  # the model picks the next actions, the target network evaluates them (implies TARGET_NETWORK)
+
+# Replay ratio: gradient steps per transition inserted in the replay memory
+REPLAY_RATIO = None  # e.g. 0.05 with episodes of 100 transitions: 5 steps per episode, None: one step per episode
+REPLAY_MAX_PENDING_UPDATES = 32  # owed steps above which the learner stops ingesting episodes
 
 BUFFER_MAX_LEN = 150000
+# True: preallocated float32 ring buffer, False: deque of nested lists
+ARRAY_REPLAY_BUFFER = True
+
+# Prioritized experience replay (replaces the fail/success episode balancing)
+PRIORITIZED_REPLAY = False
+PER_ALPHA = 0.6
+PER_BETA = 0.4
+PER_BETA_INCREMENT = 0.0001  # per sampled batch, up to 1
+PER_EPSILON = 1e-5
+
+# TensorFlow execution
+COMPILE_TF_FUNCTIONS = True  # graph-compile action selection and training steps
+XLA_JIT_COMPILE = False  # additionally compile them with XLA
+
+# Action serving: merge concurrent /get_action training requests into one model call
+MICRO_BATCHING = True
+MICRO_BATCH_WINDOW = 0.002  # seconds a batch may wait for the other active clients to join it
+MICRO_BATCH_MAX_SIZE = 64
+
+# Learner: "THREAD" trains inside the Flask process, "PROCESS" in a spawned learner process
+LEARNER_MODE = "THREAD"
+TRANSITION_RING_SIZE = 20000  # transitions of the shared memory ring feeding the learner process
+WEIGHTS_PUBLISH_EVERY = 10  # learner updates between two weight snapshots sent to the serving model
+WEIGHTS_POLL_INTERVAL = 0.05  # seconds between two checks for a new weight snapshot
+
+# Flow control: the update queue is bounded, a full queue answers 429 with a retry delay
+UPDATE_QUEUE_MAX_SIZE = 64  # episodes waiting for the learner
+UPDATE_RETRY_AFTER = 0.5  # seconds a client waits before sending a refused episode again
+
+# Sessions: trainings started by clients naming their model (X-Model-Name header) run side by side
+MAX_SESSIONS = 4  # named training sessions alive at the same time
+SESSION_IDLE_TIMEOUT = 600  # seconds without requests after which a session is evicted
+
+# Streaming experience upload: transitions sent in chunks while the episode runs
+STREAM_EPISODE_TAIL = 100  # transitions kept per episode, as the client buffer does
+STREAM_IDLE_TIMEOUT = 300  # seconds after which an abandoned stream is discarded
 
 # Directorioes
 MODELS_PATH = "../data/models"
@@ -19,3 +19,7 @@ UP_LEFT = 7
 TRAINING = "TRAINING"
 TESTING = "TESTING"
 RANDOM = 'RANDOM'
+
+# FLAT STATE LAYOUT
+# the agent state is one-hot encoded at indices 0 to 3, see AGENT STATE
+COLLECTION_PROGRESS_INDEX = 4
@@ -1,5 +1,8 @@
 from collections import deque
 import random
+import numpy as np
+from .common import flatten_list
+from .sum_tree import SumTree
 
 
 class ReplayBuffer:
@@ -51,6 +54,31 @@ class ReplayBuffer:
         """
         return random.sample(self.buffer, batch_size)
 
+    def sample_batch(self, batch_size: int):
+        """
+        Sample a batch of experiences and stack each field into an array.
+
+        Args:
+            batch_size (int): The number of experiences to sample.
+
+        Returns:
+            tuple: (states, actions, rewards, next_states, dones, total_rewards),
+                   states being float32 arrays of shape (batch_size, state_size).
+        """
+        minibatch = self.sample(batch_size)
+
+        states = np.array([flatten_list(exp[0])
+                          for exp in minibatch], dtype=np.float32)
+        actions = np.array([exp[1] for exp in minibatch], dtype=np.int32)
+        rewards = np.array([exp[2] for exp in minibatch], dtype=np.float32)
+        next_states = np.array([flatten_list(exp[3])
+                               for exp in minibatch], dtype=np.float32)
+        dones = np.array([exp[4] for exp in minibatch], dtype=np.float32)
+        total_rewards = np.array([exp[5]
+                                 for exp in minibatch], dtype=np.float32)
+
+        return states, actions, rewards, next_states, dones, total_rewards
+
     def __len__(self):
         """
         Get the current size of the replay buffer.
@@ -59,3 +87,258 @@ class ReplayBuffer:
             int: The number of experiences currently in the buffer.
         """
         return len(self.buffer)
+
+
+class ArrayReplayBuffer:
+    """
+    A FIFO replay buffer backed by preallocated contiguous arrays.
+
+    Experiences are flattened once when they are added and written in place
+    at the current ring position, overwriting the oldest one once the buffer
+    is full. Sampling draws indices and gathers ready-to-feed float32 batches.
+
+    Attributes:
+        buffer_size (int): The maximum number of experiences the buffer can hold.
+        state_size (int): The number of features of a flattened state.
+    """
+
+    def __init__(self, buffer_size: int, state_size: int):
+        """
+        Initialize the replay buffer and allocate all of its memory.
+
+        Args:
+            buffer_size (int): Maximum size of the buffer.
+            state_size (int): Number of features of a flattened state.
+        """
+        self.buffer_size = buffer_size
+        self.state_size = state_size
+
+        self.states = np.zeros((buffer_size, state_size), dtype=np.float32)
+        self.next_states = np.zeros(
+            (buffer_size, state_size), dtype=np.float32)
+        self.actions = np.zeros(buffer_size, dtype=np.int32)
+        self.rewards = np.zeros(buffer_size, dtype=np.float32)
+        self.dones = np.zeros(buffer_size, dtype=np.float32)
+        self.total_rewards = np.zeros(buffer_size, dtype=np.float32)
+
+        self.position = 0
+        self.size = 0
+        self.rng = np.random.default_rng()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Get the exact memory footprint of the stored arrays.
+
+        Returns:
+            int: The number of bytes allocated by the buffer arrays.
+        """
+        return sum(array.nbytes for array in (self.states, self.next_states, self.actions,
+                                              self.rewards, self.dones, self.total_rewards))
+
+    def iterate(self):
+        """
+        Iterate over the experiences in the buffer, from the oldest to the newest.
+
+        Yields:
+            tuple: Each experience in the buffer.
+        """
+        start = self.position if self.size == self.buffer_size else 0
+        for offset in range(self.size):
+            yield self.get(self.position_at(start + offset))
+
+    def position_at(self, index: int) -> int:
+        return index % self.buffer_size
+
+    def get(self, index: int):
+        """
+        Get the experience stored at a given slot.
+
+        Args:
+            index (int): The slot of the experience.
+
+        Returns:
+            tuple: (state, action, reward, next_state, done, total_reward).
+        """
+        return (self.states[index], int(self.actions[index]), float(self.rewards[index]),
+                self.next_states[index], bool(self.dones[index]), float(self.total_rewards[index]))
+
+    def add(self, experience) -> int:
+        """
+        Add a new experience to the buffer, overwriting the oldest one when full.
+
+        Args:
+            experience (tuple): A tuple representing an experience
+                                (state, action, reward, next_state, done, total_reward).
+                                States may be nested lists or flat arrays.
+
+        Returns:
+            int: The slot where the experience was written.
+        """
+        state, action, reward, next_state, done, total_reward = experience
+        index = self.position
+
+        self.states[index] = to_flat_array(state)
+        self.next_states[index] = to_flat_array(next_state)
+        self.actions[index] = action
+        self.rewards[index] = reward
+        self.dones[index] = done
+        self.total_rewards[index] = total_reward
+
+        self.position = self.position_at(index + 1)
+        self.size = min(self.size + 1, self.buffer_size)
+
+        return index
+
+    def sample_indices(self, batch_size: int):
+        """
+        Draw distinct slots uniformly among the stored experiences.
+
+        Args:
+            batch_size (int): The number of slots to draw.
+
+        Returns:
+            np.ndarray: The sampled slots.
+        """
+        return self.rng.choice(self.size, size=batch_size, replace=False)
+
+    def gather(self, indices):
+        """
+        Gather the experiences stored at the given slots into arrays.
+
+        Args:
+            indices (np.ndarray): The slots to gather.
+
+        Returns:
+            tuple: (states, actions, rewards, next_states, dones, total_rewards).
+        """
+        return (self.states[indices], self.actions[indices], self.rewards[indices],
+                self.next_states[indices], self.dones[indices], self.total_rewards[indices])
+
+    def sample(self, batch_size: int):
+        """
+        Sample a batch of experiences from the buffer.
+
+        Args:
+            batch_size (int): The number of experiences to sample.
+
+        Returns:
+            list: A list of sampled experiences.
+        """
+        return [self.get(index) for index in self.sample_indices(batch_size)]
+
+    def sample_batch(self, batch_size: int):
+        """
+        Sample a batch of experiences as ready-to-feed arrays.
+
+        Args:
+            batch_size (int): The number of experiences to sample.
+
+        Returns:
+            tuple: (states, actions, rewards, next_states, dones, total_rewards),
+                   states being float32 arrays of shape (batch_size, state_size).
+        """
+        return self.gather(self.sample_indices(batch_size))
+
+    def __len__(self):
+        """
+        Get the current size of the replay buffer.
+
+        Returns:
+            int: The number of experiences currently in the buffer.
+        """
+        return self.size
+
+
+def to_flat_array(state) -> np.ndarray:
+    """
+    Converts a state, nested list or array, into a flat float32 array.
+    """
+    if isinstance(state, np.ndarray):
+        return state.astype(np.float32, copy=False).ravel()
+    return np.asarray(flatten_list(state), dtype=np.float32)
+
+
+class PrioritizedReplayBuffer(ArrayReplayBuffer):
+    """
+    An array replay buffer sampling experiences proportionally to their priority.
+
+    Priorities are the absolute TD errors of the last update that used each
+    experience, raised to the power alpha and indexed by a sum-tree. New
+    experiences get the highest priority seen so far so they are replayed at
+    least once. Importance-sampling weights correct the bias of the
+    non-uniform sampling, with beta annealed towards 1.
+
+    Attributes:
+        alpha (float): How much prioritization is used (0 is uniform sampling).
+        beta (float): How much of the sampling bias is corrected.
+        beta_increment (float): Beta increase after each sampled batch.
+        epsilon (float): Added to TD errors so no priority is zero.
+    """
+
+    def __init__(self, buffer_size: int, state_size: int, alpha: float = 0.6, beta: float = 0.4,
+                 beta_increment: float = 0.0001, epsilon: float = 1e-5):
+        super().__init__(buffer_size, state_size)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.max_priority = 1.0
+        self.tree = SumTree(buffer_size)
+
+    @property
+    def nbytes(self) -> int:
+        return super().nbytes + self.tree.tree.nbytes
+
+    def add(self, experience) -> int:
+        index = super().add(experience)
+        self.tree.update([index], [self.max_priority ** self.alpha])
+        return index
+
+    def sample_indices(self, batch_size: int):
+        """
+        Draw one slot in each of `batch_size` equal segments of the total priority.
+
+        Args:
+            batch_size (int): The number of slots to draw.
+
+        Returns:
+            np.ndarray: The sampled slots.
+        """
+        segment = self.tree.total / batch_size
+        values = (np.arange(batch_size) +
+                  self.rng.random(batch_size)) * segment
+        return np.minimum(self.tree.find(values), self.size - 1)
+
+    def sample_prioritized_batch(self, batch_size: int):
+        """
+        Sample a batch of experiences along with their importance-sampling weights.
+
+        Args:
+            batch_size (int): The number of experiences to sample.
+
+        Returns:
+            tuple: The batch arrays (as in `sample_batch`), the sampled slots, to be
+                   given back to `update_priorities`, and the float32 weights.
+        """
+        indices = self.sample_indices(batch_size)
+
+        probabilities = self.tree.get(indices) / self.tree.total
+        weights = (self.size * probabilities) ** -self.beta
+        weights = (weights / weights.max()).astype(np.float32)
+
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        return self.gather(indices), indices, weights
+
+    def update_priorities(self, indices, td_errors) -> None:
+        """
+        Update the priorities of sampled experiences from their new TD errors.
+
+        Args:
+            indices (np.ndarray): The slots returned by `sample_prioritized_batch`.
+            td_errors (np.ndarray): The TD errors computed for these experiences.
+        """
+        priorities = np.abs(td_errors) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
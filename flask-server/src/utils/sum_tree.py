@@ -0,0 +1,89 @@
+import numpy as np
+
+
+class SumTree:
+    """
+    A binary tree whose leaves hold priorities and whose inner nodes hold the sum
+    of their children, so the root is the total priority.
+
+    The tree is stored in a flat array: the root is at index 1, the children of
+    node i are at 2i and 2i + 1, and the leaves start at `tree_capacity`.
+    Updates and proportional lookups walk one level at a time, each level being
+    handled for a whole batch of indices at once, which makes both O(log n).
+
+    Attributes:
+        capacity (int): The number of leaves that can be used.
+        tree_capacity (int): The capacity rounded up to a power of two.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Initialize a tree whose leaves all have a zero priority.
+
+        Args:
+            capacity (int): The number of leaves.
+        """
+        self.capacity = capacity
+        self.tree_capacity = 1 << max(capacity - 1, 1).bit_length()
+        self.tree = np.zeros(2 * self.tree_capacity, dtype=np.float64)
+
+    @property
+    def total(self) -> float:
+        """
+        Get the sum of every priority.
+
+        Returns:
+            float: The value of the root.
+        """
+        return float(self.tree[1])
+
+    def get(self, indices) -> np.ndarray:
+        """
+        Get the priorities of the given leaves.
+
+        Args:
+            indices (np.ndarray): The leaf indices.
+
+        Returns:
+            np.ndarray: Their priorities.
+        """
+        return self.tree[np.asarray(indices) + self.tree_capacity]
+
+    def update(self, indices, priorities) -> None:
+        """
+        Set the priorities of the given leaves and refresh the sums above them.
+
+        Args:
+            indices (np.ndarray): The leaf indices.
+            priorities (np.ndarray): Their new priorities.
+        """
+        nodes = np.asarray(indices, dtype=np.int64) + self.tree_capacity
+        self.tree[nodes] = priorities
+
+        nodes = np.unique(nodes >> 1)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes >> 1)
+
+    def find(self, values) -> np.ndarray:
+        """
+        Find, for each value, the leaf where the prefix sum of the priorities reaches it.
+
+        Args:
+            values (np.ndarray): Values drawn within [0, total).
+
+        Returns:
+            np.ndarray: The leaf indices, each leaf being found with a
+                        probability proportional to its priority.
+        """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+
+        while nodes[0] < self.tree_capacity:
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values >= left_sum
+            values = np.where(go_right, values - left_sum, values)
+            nodes = np.where(go_right, left + 1, left)
+
+        return np.minimum(nodes - self.tree_capacity, self.capacity - 1)
@@ -0,0 +1,10 @@
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# the client modules import each other from client/src, the server is the `src` package of flask-server
+sys.path.insert(0, os.path.join(ROOT, 'client', 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'flask-server'))
@@ -0,0 +1,237 @@
+"""
+Frozen references of the geometry kernels of the world, and generators of
+random inputs for them, shared by tests/test_geometry_kernels.py (parity) and
+benchmarks/geometry_kernels.py (timings).
+
+The reference versions below are frozen copies of the original scalar
+kernels: they must not be edited. Any faster implementation of a kernel must
+compute the same results, compared for exact equality, as the agent learns
+from the features of the world bit for bit.
+
+The random inputs mix in the edge cases of the geometry: zero-length
+segments, segments tangent to a circle or ending on it, points on the border
+of the surface, integer and fractional coordinates.
+"""
+import math
+import random
+
+from world.surface import Disk, Surface
+from world.world import World
+
+COLLECTIBLE_RADIUS = 35
+MAX_COVERAGE = 0.2  # share of the surface covered by the collectibles of a random world
+
+
+# ---------------------------------------------------------------------------
+# Reference kernels: frozen copies of the original scalar implementations.
+# ---------------------------------------------------------------------------
+
+def reference_line_circle_intersection(starting_point, ending_point, collectible_pos, collectible_radius):
+    dx = ending_point[0] - starting_point[0]
+    dy = ending_point[1] - starting_point[1]
+
+    fx = starting_point[0] - collectible_pos[0]
+    fy = starting_point[1] - collectible_pos[1]
+
+    a = dx**2 + dy**2
+
+    if a == 0:
+        distance = math.sqrt(fx**2 + fy**2)
+        if distance <= collectible_radius:
+            return starting_point, 0
+        else:
+            return None, float('inf')
+
+    b = 2 * (fx * dx + fy * dy)
+    c = fx**2 + fy**2 - collectible_radius**2
+
+    discriminant = b**2 - 4 * a * c
+
+    intersection_points = []
+    if discriminant >= 0:
+        discriminant_sqrt = math.sqrt(discriminant)
+        t1 = (-b + discriminant_sqrt) / (2 * a)
+        t2 = (-b - discriminant_sqrt) / (2 * a)
+
+        if 0 <= t1 <= 1:
+            intersection_points.append(
+                (starting_point[0] + t1 * dx, starting_point[1] + t1 * dy))
+        if 0 <= t2 <= 1:
+            intersection_points.append(
+                (starting_point[0] + t2 * dx, starting_point[1] + t2 * dy))
+
+    if not intersection_points:
+        return None, float('inf')
+
+    nearest_point = min(intersection_points,
+                        key=lambda point: (point[0] - starting_point[0])**2 + (point[1] - starting_point[1])**2)
+    min_distance = math.sqrt(
+        (nearest_point[0] - starting_point[0])**2 + (nearest_point[1] - starting_point[1])**2)
+
+    return nearest_point, min_distance
+
+
+def reference_find_nearest_intersection_point_to_surface(center, radius, point_coords, point_angle):
+    angle_rad = math.radians(point_angle)
+
+    dx, dy = math.cos(angle_rad), math.sin(angle_rad)
+
+    cx, cy = center
+    x0, y0 = point_coords
+
+    a = dx**2 + dy**2
+    b = 2 * (dx * (x0 - cx) + dy * (y0 - cy))
+    c = (x0 - cx)**2 + (y0 - cy)**2 - radius**2
+
+    discriminant = b**2 - 4 * a * c
+
+    if discriminant < 0:
+        return None
+    else:
+        t1 = (-b + math.sqrt(discriminant)) / (2 * a)
+        t2 = (-b - math.sqrt(discriminant)) / (2 * a)
+
+        t = t1 if t1 >= 0 else t2
+
+        intersection_point = (x0 + t * dx, y0 + t * dy)
+
+        return intersection_point
+
+
+def reference_find_nearest_intersection(collectibles, exit_door, surface_radius, starting_point, ending_point):
+    nearest_collectible = None
+    nearest_intersection_point = None
+    min_distance = float('inf')
+
+    collectibles_and_exit_door = collectibles + [exit_door]
+
+    for item in collectibles_and_exit_door:
+        collectible_pos, collectible_radius = (item.x_pos,
+                                               item.y_pos), item.shape.radius
+
+        (intersection_point, distance) = reference_line_circle_intersection(
+            starting_point, ending_point, collectible_pos, collectible_radius)
+
+        if intersection_point is not None and distance < min_distance:
+            min_distance = int(distance)
+            nearest_collectible = item
+            nearest_intersection_point = intersection_point
+
+    return (nearest_collectible, min_distance, nearest_intersection_point) if nearest_collectible else (None, surface_radius * 2, None)
+
+
+def reference_get_seen_position(distance_to_center, angle, agent_center_pos):
+    x_center_pos, z_center_pos = agent_center_pos
+
+    angle_rad = math.radians(angle)
+
+    head_x_pos = x_center_pos + \
+        distance_to_center * math.cos(angle_rad)
+    head_y_pos = z_center_pos + \
+        distance_to_center * math.sin(angle_rad)
+
+    return (head_x_pos, head_y_pos)
+
+
+def reference_is_inside(surface_pos, radius, x, y):
+    adjusted_x = x - surface_pos[0]
+    adjusted_z = y - surface_pos[1]
+
+    return adjusted_x**2 + adjusted_z**2 <= radius**2
+
+
+# ---------------------------------------------------------------------------
+# Random inputs
+# ---------------------------------------------------------------------------
+
+def random_coordinate(rng: random.Random, low: float, high: float):
+    # the world mixes integer positions (placement) and float ones (moves, intersections)
+    return rng.randint(int(low), int(high)) if rng.random() < 0.5 else rng.uniform(low, high)
+
+
+def random_point(rng: random.Random, low: float = -300, high: float = 300) -> tuple:
+    return (random_coordinate(rng, low, high), random_coordinate(rng, low, high))
+
+
+def random_line_circle_case(rng: random.Random) -> tuple:
+    center = random_point(rng)
+    radius = rng.choice([COLLECTIBLE_RADIUS, rng.randint(1, 100), rng.uniform(0.5, 100)])
+    kind = rng.randrange(6)
+    if kind == 0:  # zero-length segment, inside or outside of the circle
+        start = (center[0] + rng.randint(-2 * math.ceil(radius), 2 * math.ceil(radius)), center[1])
+        return start, start, center, radius
+    if kind == 1:  # tangent to the circle
+        half_length = rng.randint(1, 200)
+        side = rng.choice([-1, 1])
+        return ((center[0] - half_length, center[1] + side * radius),
+                (center[0] + half_length, center[1] + side * radius), center, radius)
+    if kind == 2:  # ending on the circle
+        angle = rng.randrange(0, 360, 15)
+        end = reference_get_seen_position(radius, angle, center)
+        return random_point(rng), end, center, radius
+    if kind == 3:  # starting inside the circle
+        start = reference_get_seen_position(
+            rng.uniform(0, radius), rng.uniform(0, 360), center)
+        return start, random_point(rng), center, radius
+    return random_point(rng), random_point(rng), center, radius
+
+
+def random_surface_case(rng: random.Random) -> tuple:
+    center = random_point(rng, 0, 800)
+    radius = rng.choice([250, rng.randint(1, 500)])
+    # the heads sense from inside of the surface, but the kernel is defined everywhere
+    distance = rng.choice([0, radius, rng.uniform(0, radius), rng.uniform(radius, 2 * radius)])
+    point = reference_get_seen_position(distance, rng.uniform(0, 360), center)
+    if rng.random() < 0.5:
+        point = (round(point[0]), round(point[1]))
+    angle = rng.randrange(0, 360, 15) if rng.random() < 0.5 else rng.uniform(-360, 720)
+    return center, radius, point, angle
+
+
+def random_seen_position_case(rng: random.Random) -> tuple:
+    distance_to_center = rng.choice([40, rng.randint(0, 200), rng.uniform(0, 200)])
+    angle = rng.randrange(0, 360, 15) if rng.random() < 0.5 else rng.randint(-720, 720)
+    return distance_to_center, angle, random_point(rng, 0, 800)
+
+
+def random_is_inside_case(rng: random.Random) -> tuple:
+    surface_pos = random_point(rng, 0, 800)
+    radius = rng.choice([250, 5 * rng.randint(1, 100)])
+    if rng.random() < 0.3:
+        # on the border: a scaled 3-4-5 right triangle
+        sign_x, sign_y = rng.choice([-1, 1]), rng.choice([-1, 1])
+        x, y = (surface_pos[0] + sign_x * radius * 3 // 5,
+                surface_pos[1] + sign_y * radius * 4 // 5)
+    else:
+        x, y = random_point(rng, -radius * 1.5, radius * 1.5)
+        x, y = x + surface_pos[0], y + surface_pos[1]
+    return surface_pos, radius, x, y
+
+
+def surface_radius_for(nb_collectibles: int) -> int:
+    return max(250, math.ceil(COLLECTIBLE_RADIUS * math.sqrt(max(nb_collectibles, 1) / MAX_COVERAGE)))
+
+
+def random_world(rng: random.Random, nb_collectibles: int) -> World:
+    radius = surface_radius_for(nb_collectibles)
+    # the world draws its positions from the random module
+    random.seed(rng.random())
+    return World(Surface(Disk(radius), radius + 150, radius + 150), num_collectibles=nb_collectibles)
+
+
+def random_rays(rng: random.Random, world: World, nb_rays: int) -> list[tuple]:
+    """
+    Draws rays as the heads cast them: from a point of the surface to its border.
+    """
+    center = (world.surface.x_pos, world.surface.y_pos)
+    radius = world.surface.shape.radius
+    rays = []
+    for _ in range(nb_rays):
+        start = reference_get_seen_position(
+            radius * math.sqrt(rng.random()), rng.uniform(0, 360), center)
+        if rng.random() < 0.5:
+            start = (int(start[0]), int(start[1]))
+        angle = rng.randrange(0, 360, 15)
+        rays.append((start, reference_find_nearest_intersection_point_to_surface(
+            center, radius, start, angle)))
+    return rays
@@ -0,0 +1,81 @@
+"""
+The geometry kernels of the world must compute exactly what their frozen
+references (tests/geometry_reference.py) compute, on random inputs with the
+edge cases of the geometry mixed in.
+"""
+import random
+
+import pytest
+
+from geometry_reference import random_is_inside_case, random_line_circle_case, random_rays, \
+    random_seen_position_case, random_surface_case, random_world, reference_find_nearest_intersection, \
+    reference_find_nearest_intersection_point_to_surface, reference_get_seen_position, reference_is_inside, \
+    reference_line_circle_intersection
+from world.head import Head
+from world.surface import Disk, Surface
+from world.world import World
+
+NB_CASES = 2000  # random inputs checked per kernel
+NB_RAYS = 100  # rays cast in each random world
+MAX_REPORTED_MISMATCHES = 5
+
+
+def assert_same_results(cases: list, reference, current):
+    mismatches = []
+    for case in cases:
+        expected, actual = reference(*case), current(*case)
+        if expected != actual:
+            mismatches.append((case, expected, actual))
+    assert not mismatches, f"{len(mismatches)}/{len(cases)} mismatching cases, " \
+                           f"(case, expected, actual): {mismatches[:MAX_REPORTED_MISMATCHES]}"
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_line_circle_intersection(seed):
+    rng = random.Random(seed)
+    assert_same_results([random_line_circle_case(rng) for _ in range(NB_CASES)],
+                        reference_line_circle_intersection, World()._line_circle_intersection)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_find_nearest_intersection_point_to_surface(seed):
+    rng = random.Random(seed)
+    assert_same_results([random_surface_case(rng) for _ in range(NB_CASES)],
+                        reference_find_nearest_intersection_point_to_surface,
+                        World.find_nearest_intersection_point_to_surface)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_get_seen_position(seed):
+    rng = random.Random(seed)
+    assert_same_results([random_seen_position_case(rng) for _ in range(NB_CASES)],
+                        reference_get_seen_position,
+                        lambda distance_to_center, angle, center: Head(distance_to_center, angle).get_seen_position(center))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_is_inside(seed):
+    rng = random.Random(seed)
+    assert_same_results([random_is_inside_case(rng) for _ in range(NB_CASES)],
+                        reference_is_inside,
+                        lambda surface_pos, radius, x, y: Surface(Disk(radius), *surface_pos).is_inside(x, y))
+
+
+# below and above SPATIAL_INDEX_MIN_COLLECTIBLES: both the linear scan and the grid are checked
+@pytest.mark.parametrize("nb_collectibles", [1, 4, 16, 64, 256])
+@pytest.mark.parametrize("seed", range(3))
+def test_find_nearest_intersection(seed, nb_collectibles):
+    rng = random.Random(seed)
+    world = random_world(rng, nb_collectibles)
+
+    # the collectibles are compared by identity
+    def reference(start, end):
+        nearest, distance, point = reference_find_nearest_intersection(
+            world.collectibles, world.exit_door, world.surface.shape.radius, start, end)
+        return id(nearest), distance, point
+
+    def current(start, end):
+        nearest, distance, point = world.find_nearest_intersection(start, end)
+        return id(nearest), distance, point
+
+    assert_same_results(random_rays(rng, world, NB_RAYS), reference, current)
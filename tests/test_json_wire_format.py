@@ -0,0 +1,62 @@
+"""
+With USE_BINARY_WIRE_FORMAT off, the requests carrying states must be valid
+JSON, the flat states of the encoder included.
+"""
+import json
+import random
+
+import numpy as np
+import pytest
+import requests
+
+import api.requests as api
+from episodes.game_state import GameState
+from world.world import World
+
+
+class RecordingClient:
+    """
+    Prepares each request as the requests library sends it, and answers a fixed action.
+    """
+
+    def __init__(self):
+        self.bodies = []
+
+    def post(self, path, **kwargs):
+        prepared = requests.Request("POST", api.API_URL + path, **kwargs).prepare()
+        self.bodies.append(json.loads(prepared.body))
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({"action": 3, "actions": [3, 3]}).encode()
+        return response
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = RecordingClient()
+    monkeypatch.setattr(api, "USE_BINARY_WIRE_FORMAT", False)
+    monkeypatch.setattr(api, "get_client", lambda: client)
+    return client
+
+
+@pytest.fixture
+def flat_state():
+    random.seed(0)
+    state = GameState(World()).get_state()
+    assert isinstance(state, np.ndarray)
+    return state
+
+
+def test_get_action_posts_a_flat_state_as_json(client, flat_state):
+    assert api.get_action(flat_state, "TRAINING", 0.5) == 3
+    assert client.bodies[0]["state"] == flat_state.tolist()
+
+
+def test_get_actions_posts_flat_states_as_json(client, flat_state):
+    assert api.get_actions([flat_state, flat_state], "TRAINING", np.array([0.5, 0.1])) == [3, 3]
+    assert client.bodies[0]["states"] == [flat_state.tolist()] * 2
+
+
+def test_experiences_are_posted_as_json(client, flat_state):
+    api.post_experiences("/update_model", [(flat_state, 1, 0.5, flat_state, False, 0.5)])
+    assert client.bodies[0][0]["next_state"] == flat_state.tolist()
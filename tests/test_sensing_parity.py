@@ -0,0 +1,50 @@
+"""
+The vectorized sensing of the heads must compute the same features as the
+scalar reference path, bit for bit: the agent learns from them.
+"""
+import random
+
+import pytest
+
+from geometry_reference import surface_radius_for
+from world.sensing import VectorizedSensing
+from world.surface import Disk, Surface
+from world.world import World
+
+NB_STEPS = 20  # moves of the random walk of the agent in each world
+
+
+def random_world(seed: int, nb_collectibles: int) -> World:
+    radius = surface_radius_for(nb_collectibles)
+    # the world draws its positions from the random module
+    random.seed(seed)
+    return World(Surface(Disk(radius), radius + 150, radius + 150), num_collectibles=nb_collectibles)
+
+
+def heads_sensing(world: World) -> list[tuple]:
+    return [(head.is_within_surface, head.intersection_with_circle_pos, head.sensing_color)
+            for head in world.agent.heads]
+
+
+@pytest.mark.parametrize("nb_collectibles", [1, 4, 16, 64])
+@pytest.mark.parametrize("seed", range(5))
+def test_vectorized_sensing_matches_scalar_path(seed, nb_collectibles):
+    world = random_world(seed, nb_collectibles)
+    sensing = VectorizedSensing(world.agent.heads)
+    moves = random.Random(seed)
+
+    for _ in range(NB_STEPS):
+        position = world.get_agent_position()
+
+        scalar_status = [world.evaluate_next_position_status(idx)
+                         for idx in range(len(world.agent.heads))]
+        assert sensing.evaluate_next_positions_status(world).tolist() == scalar_status, position
+
+        scalar_sensing = world.get_agent_direction_sensing_scalar()
+        scalar_heads = heads_sensing(world)
+        assert sensing.get_agent_direction_sensing(world) == scalar_sensing, position
+        assert heads_sensing(world) == scalar_heads, position
+
+        world.move_agent(moves.randrange(len(world.agent.heads)))
+        if not world.is_within_surface(world.get_agent_position()):
+            break
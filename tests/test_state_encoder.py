@@ -0,0 +1,61 @@
+"""
+The flat state written by the StateEncoder must be the flattened nested state,
+bit for bit, at every step of an episode.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from episodes.episode import Episode
+from episodes.game_state import GameState
+from utils.game_states import TRAINING
+from utils.wire_format import to_flat_array
+from world.surface import Disk, Surface
+from world.world import World
+
+NB_ACTIONS = 24
+MAX_STEPS = 60  # steps of the random episode played in each world
+
+
+def random_episode(seed: int, nb_collectibles: int, radius: int) -> Episode:
+    # the world draws its positions from the random module
+    random.seed(seed)
+    episode = Episode(seed, None, 1.0, TRAINING)
+    episode.world = World(Surface(Disk(radius), radius + 150, radius + 150), num_collectibles=nb_collectibles)
+    episode.game_state = GameState(episode.world)
+    episode.timer.start()
+    return episode
+
+
+def assert_encoding_matches_nested_state(game_state: GameState):
+    expected = to_flat_array(game_state.get_nested_state())
+    encoded = game_state.encoder.encode(game_state)
+    assert encoded.dtype == np.float32
+    assert encoded.shape == expected.shape
+    mismatches = np.flatnonzero(encoded != expected)
+    assert mismatches.size == 0, [(idx, expected[idx], encoded[idx]) for idx in mismatches[:5]]
+
+
+@pytest.mark.parametrize("nb_collectibles, radius", [(1, 250), (4, 250), (16, 400), (64, 700)])
+@pytest.mark.parametrize("seed", range(5))
+def test_encoder_matches_nested_state(seed, nb_collectibles, radius):
+    episode = random_episode(seed, nb_collectibles, radius)
+    actions = random.Random(seed)
+    assert_encoding_matches_nested_state(episode.game_state)
+
+    done = False
+    while not done and episode.step_index < MAX_STEPS:
+        _, _, done = episode.step(actions.randrange(NB_ACTIONS))
+        assert_encoding_matches_nested_state(episode.game_state)
+    episode.timer.end()
+
+
+def test_states_are_owned_by_the_caller():
+    episode = random_episode(0, 4, 250)
+    state = episode.game_state.get_state()
+    snapshot = state.copy()
+    next_state, _, _ = episode.step(0)
+    assert next_state is not state
+    assert np.array_equal(state, snapshot)
+    episode.timer.end()